@@ -0,0 +1,632 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Benchmarks
+Mede os caminhos críticos do updater, logger e API contra serviços locais
+(servidor de manifests/pacotes sintéticos e Supervisor falso), sem rede externa.
+
+Uso:
+    python3 benchmarks/hct_bench.py
+    python3 benchmarks/hct_bench.py --zip-mb 50 --log-mb 10,30,60 --output bench.json
+    python3 benchmarks/hct_bench.py --only download,logs --quick
+
+O resultado é JSON (stdout ou --output) para acompanhar regressões entre versões.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import string
+import zipfile
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+from pathlib import Path
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BIN_DIR = Path(__file__).resolve().parent.parent / 'rootfs' / 'usr' / 'bin'
+TOKEN = "bench-token"
+MANIFEST_TYPES = ['core', 'hcc', 'molsmart']
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Dados sintéticos
+# ═══════════════════════════════════════════════════════════════════════════
+
+def make_zip(path: Path, size_mb: float, files: int = 200) -> str:
+    """Cria ZIP com ~size_mb de dados pouco compressíveis; retorna SHA-256."""
+    rng = random.Random(42)
+    per_file = max(1, int(size_mb * 1024 * 1024 / files))
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(files):
+            data = rng.randbytes(per_file // 2) + bytes(per_file - per_file // 2)
+            zf.writestr(f"hc-tools/packages/pkg_{i // 20}/file_{i}.yaml", data)
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def make_log_file(path: Path, size_mb: float) -> int:
+    """Cria log JSON estruturado de ~size_mb; retorna quantidade de linhas."""
+    rng = random.Random(7)
+    target = int(size_mb * 1024 * 1024)
+    components = ['hct-updater', 'hct-daemon', 'hct-api', 'hct-molsmart']
+    actions = ['fetch_manifest', 'download_package', 'check_updates', 'apply_update', 'sync']
+    lines = 0
+    written = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        while written < target:
+            entry = json.dumps({
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "level": "INFO",
+                "component": rng.choice(components),
+                "action": rng.choice(actions),
+                "details": {"attempt": rng.randint(1, 3), "note": ''.join(rng.choices(string.ascii_letters, k=40))},
+                "status": "info"
+            }) + "\n"
+            f.write(entry)
+            written += len(entry)
+            lines += 1
+    return lines
+
+
+def make_config_tree(root: Path, files: int = 500, size_kb: int = 8):
+    """Cria /config sintético (hc-tools + arquivos sensíveis)."""
+    rng = random.Random(3)
+    for i in range(files):
+        target = root / 'hc-tools' / f"dir_{i % 25}" / f"file_{i}.yaml"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(rng.randbytes(size_kb * 512) + bytes(size_kb * 512))
+    for name in ('configuration.yaml', 'automations.yaml', 'scripts.yaml', 'scenes.yaml'):
+        (root / name).write_text("# bench\n" * 200)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Servidores locais (manifests/pacotes e Supervisor falso)
+# ═══════════════════════════════════════════════════════════════════════════
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serve manifests, pacotes, token do HA e as APIs de notificações e backups do Supervisor."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    state = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _range(self, size: int) -> tuple:
+        """(início, fim) pedidos em `Range: bytes=...` (um intervalo, como um CDN)."""
+        spec = (self.headers.get('Range') or '').replace('bytes=', '')
+        if spec.startswith('-'):
+            return max(0, size - int(spec[1:])), size - 1
+        if '-' in spec:
+            first, last = spec.split('-')
+            return int(first), min(size - 1, int(last)) if last else size - 1
+        return 0, size - 1
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+
+        if path.startswith(f"/api/manifests/{TOKEN}/"):
+            manifest_type = path.rsplit('/', 1)[-1].replace('_manifest.json', '')
+            manifest = self.state['manifests'].get(manifest_type)
+            if manifest is None:
+                self._send(404, b'{}')
+            else:
+                self._send(200, json.dumps(manifest).encode())
+            return
+
+        if path == '/api/package.zip':
+            package = self.state['package']
+            size = package.stat().st_size
+            start, end = self._range(size)
+            self.send_response(206 if (start, end) != (0, size - 1) else 200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Length', str(end - start + 1))
+            if self.headers.get('Range'):
+                self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            with open(package, 'rb') as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 256 * 1024))
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            return
+
+        if path == '/api/homecore/token':
+            self._send(200, json.dumps({"token": TOKEN, "api_url": "local", "sync_interval": 3600}).encode())
+            return
+
+        if path == '/backups' or (path.startswith('/backups/') and path.endswith('/info')):
+            backups = self.state.setdefault('backups', {})
+            listed = [{
+                "slug": slug,
+                "name": options.get("name"),
+                "date": slug,
+                "type": "partial",
+                "size_bytes": self.state.get('backup_size', 3 * 1024 * 1024),
+                "content": {"homeassistant": bool(options.get("homeassistant"))}
+            } for slug, options in backups.items()]
+            if path == '/backups':
+                self._supervisor({"backups": listed})
+                return
+            info = [b for b in listed if b["slug"] == path.split('/')[2]]
+            if info:
+                self._supervisor(info[0])
+            else:
+                self._send(404, json.dumps({"result": "error", "message": "Backup não existe"}).encode())
+            return
+
+        if path.startswith('/jobs/'):
+            job = self.state.setdefault('jobs', {}).get(path.rsplit('/', 1)[-1])
+            if job is None:
+                self._send(404, json.dumps({"result": "error", "message": "Job não existe"}).encode())
+                return
+            # Job termina após alguns polls, como um backup real em segundo plano
+            job["polls"] += 1
+            done = job["polls"] >= self.state.get('job_polls', 2)
+            # job_error: o job termina com erro (ex.: sem espaço em /backup)
+            errors = [{"message": self.state['job_error']}] if done and self.state.get('job_error') else []
+            self._supervisor({
+                "uuid": path.rsplit('/', 1)[-1],
+                "name": job["name"],
+                "reference": job["reference"] if done and not errors else None,
+                "progress": 100 if done else 50,
+                "done": done,
+                "errors": errors
+            })
+            return
+
+        self._send(404, b'{}')
+
+    def _supervisor(self, data: dict):
+        self._send(200, json.dumps({"result": "ok", "data": data}).encode())
+
+    def _job(self, name: str, reference: str):
+        jobs = self.state.setdefault('jobs', {})
+        job_id = f"job{len(jobs) + 1}"
+        jobs[job_id] = {"name": name, "reference": reference, "polls": 0}
+        self._supervisor({"job_id": job_id})
+
+    def do_DELETE(self):
+        slug = self.path.rsplit('/', 1)[-1]
+        if self.path.startswith('/backups/') and self.state.setdefault('backups', {}).pop(slug, None):
+            self._supervisor({})
+            return
+        self._send(404, json.dumps({"result": "error", "message": "Backup não existe"}).encode())
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.path.startswith('/core/api/services/persistent_notification/create'):
+            self.state['notifications'] = self.state.get('notifications', 0) + 1
+            self._send(200, b'[]')
+            return
+
+        backups = self.state.setdefault('backups', {})
+        if self.path == '/backups/new/partial':
+            options = json.loads(body or b'{}')
+            self.state['backup_seq'] = self.state.get('backup_seq', 0) + 1
+            slug = f"bench{self.state['backup_seq']:04d}"
+            if not self.state.get('job_error'):
+                backups[slug] = options
+            self._job("backup_manager_partial_backup", slug)
+            return
+
+        if self.path.startswith('/backups/') and self.path.endswith('/restore/partial'):
+            slug = self.path.split('/')[2]
+            if slug not in backups:
+                self._send(404, json.dumps({"result": "error", "message": "Backup não existe"}).encode())
+                return
+            self.state.setdefault('restores', []).append(slug)
+            self._job("backup_manager_partial_restore", slug)
+            return
+
+        self._send(404, b'{}')
+
+
+def start_server(state: dict) -> tuple:
+    handler = type('Handler', (StandInHandler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Medição
+# ═══════════════════════════════════════════════════════════════════════════
+
+def measure(name: str, func, iterations: int, setup=None, **extra) -> dict:
+    """Executa func `iterations` vezes e retorna estatísticas (segundos)."""
+    samples = []
+    for _ in range(iterations):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        func(arg) if setup else func()
+        samples.append(time.perf_counter() - started)
+
+    samples.sort()
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "mean_s": statistics.fmean(samples),
+        "median_s": statistics.median(samples),
+        "min_s": samples[0],
+        "max_s": samples[-1],
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+    result.update(extra)
+    return result
+
+
+def expect(condition: bool, message: str, **details):
+    """Verificação de comportamento: interrompe o benchmark se falhar."""
+    if not condition:
+        raise AssertionError(f"{message}: {json.dumps(details, default=str)}" if details else message)
+
+
+class BenchSuite:
+    """Conjunto de benchmarks; cada método bench_* retorna lista de resultados."""
+
+    def __init__(self, args, workdir: Path):
+        self.args = args
+        self.workdir = workdir
+        self.iterations = 3 if args.quick else args.iterations
+        self.state = {'manifests': {}, 'notifications': 0}
+
+        self.package = workdir / 'package.zip'
+        self.checksum = make_zip(self.package, args.zip_mb)
+        self.state['package'] = self.package
+
+        self.server, self.base_url = start_server(self.state)
+
+        for manifest_type in MANIFEST_TYPES:
+            self.state['manifests'][manifest_type] = {
+                "name": manifest_type,
+                "version": "2.0.0",
+                "download_url": f"{self.base_url}/api/package.zip",
+                "checksum": f"sha256:{self.checksum}"
+            }
+
+        self.config_dir = workdir / 'config'
+        make_config_tree(self.config_dir)
+
+        os.environ.update({
+            'HCT_CONFIG_DIR': str(self.config_dir),
+            'HCT_DATA_DIR': str(workdir / 'data'),
+            'HCT_API_BASE': f"{self.base_url}/api",
+            'HCT_SUPERVISOR_URL': self.base_url,
+            'HCT_HOMEASSISTANT_URL': self.base_url,
+            'SUPERVISOR_TOKEN': 'bench',
+            'HCT_LOG_LEVEL': 'ERROR',
+            'HCT_BACKUP_BEFORE_UPDATE': 'true',
+            # Medir sempre o caminho pela rede (sem cache de pacotes)
+            'HCT_PACKAGE_CACHE_MB': '0',
+        })
+
+        sys.path.insert(0, str(BIN_DIR))
+        from hct_updater import HCTUpdater
+        self.updater = HCTUpdater(TOKEN)
+        self.updater.retry_delay = 0
+
+    def close(self):
+        self.server.shutdown()
+
+    def bench_manifest_check(self):
+        return [measure("manifest_check", self.updater.check_updates, self.iterations * 3)]
+
+    def bench_download(self):
+        size = self.package.stat().st_size
+
+        def run():
+            path = self.updater.download_file(f"{self.base_url}/api/package.zip")
+            self.updater.discard_package(path)
+
+        result = measure("download", run, self.iterations, bytes=size)
+        result["throughput_mb_s"] = size / 1024 / 1024 / result["median_s"]
+        return [result]
+
+    def bench_verify_checksum(self):
+        # Sem hash em cache: mede a leitura completa do arquivo
+        return [measure("verify_checksum", lambda: self.updater.verify_checksum(self.package, self.checksum),
+                        self.iterations, bytes=self.package.stat().st_size)]
+
+    def bench_extract(self):
+        def run():
+            temp_dir, _ = self.updater.extract_package(self.package)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return [measure("extract", run, self.iterations, bytes=self.package.stat().st_size)]
+
+    def clear_backups(self):
+        """Remove backups anteriores (não acumular cópias entre iterações)."""
+        shutil.rmtree(self.updater.backups_dir, ignore_errors=True)
+        self.updater.backups_dir.mkdir(parents=True, exist_ok=True)
+
+    def bench_backup_rollback(self):
+        backups = []
+        backup_result = measure("create_backup", lambda _: backups.append(self.updater.create_backup()),
+                                self.iterations, setup=self.clear_backups)
+        rollback_result = measure("rollback", lambda: self.updater.rollback(backups[-1]), self.iterations)
+        return [backup_result, rollback_result]
+
+    def bench_snapshot_supervisor(self):
+        # Backup parcial e restauração pelo Supervisor falso (job + polling)
+        from hct_snapshot import SnapshotManager
+        manager = SnapshotManager(self.updater, backend='supervisor')
+        supervisor = manager.preferred
+        supervisor.poll_interval = 0.01
+        supervisor.state_file.unlink(missing_ok=True)
+        self.state.update(job_polls=3, backups={}, jobs={}, restores=[])
+
+        snapshots = []
+        create_result = measure("snapshot_supervisor_create", lambda: snapshots.append(manager.create("bench")),
+                                self.iterations)
+        # Criar -> polling do job -> concluído, com o slug informado pelo job
+        jobs = self.state['jobs']
+        expect(all(s is not None and s.backend == 'supervisor' for s in snapshots),
+               "Backup não criado pelo Supervisor", snapshots=[str(s) for s in snapshots])
+        expect(all(job["polls"] == 3 for job in jobs.values()), "Job não acompanhado até o fim",
+               polls=[job["polls"] for job in jobs.values()])
+
+        # Retenção: só os `keep` mais recentes; o mais antigo é apagado
+        while len(snapshots) <= supervisor.keep:
+            snapshots.append(manager.create("bench"))
+        kept = [entry['ref'] for entry in supervisor.load_state()]
+        expect(sorted(self.state['backups']) == sorted(kept) == sorted(s.ref for s in snapshots[-supervisor.keep:]),
+               "Retenção de backups incorreta", backups=sorted(self.state['backups']), kept=kept)
+        expect(snapshots[0].ref not in self.state['backups'], "Backup mais antigo não apagado", slug=snapshots[0].ref)
+
+        restored = []
+        restore_result = measure("snapshot_supervisor_restore", lambda: restored.append(manager.restore(snapshots[-1])),
+                                 self.iterations)
+        expect(all(restored) and self.state['restores'] == [snapshots[-1].ref] * self.iterations,
+               "Restauração não feita pelo Supervisor", restored=restored, restores=self.state['restores'])
+
+        # Job com erro: cai na cópia de arquivos
+        self.state['job_error'] = "Espaço insuficiente em /backup"
+        try:
+            fallback = manager.create("bench")
+        finally:
+            self.state.pop('job_error')
+        expect(fallback is not None and fallback.backend == 'files' and Path(fallback.ref).is_dir(),
+               "Sem alternativa de arquivos após erro no job", snapshot=str(fallback))
+        shutil.rmtree(fallback.ref, ignore_errors=True)
+
+        create_result["backend"] = snapshots[-1].backend
+        create_result["kept"] = len(self.state['backups'])
+        restore_result["restores"] = len(self.state['restores'])
+        return [create_result, restore_result]
+
+    def bench_full_update(self):
+        def run(_):
+            updates = self.updater.check_updates()
+            if updates:
+                self.updater.update(updates[0])
+
+        return [measure("full_update_cycle", run, max(1, self.iterations // 2), setup=self.clear_backups)]
+
+    def bench_update_plan(self):
+        # Índice do ZIP via HTTP Range + comparação com /config
+        update_info = {
+            "type": "core",
+            "current": "1.0.0",
+            "available": "2.0.0",
+            "manifest": self.state['manifests']['core']
+        }
+        result = measure("update_plan", lambda: self.updater.plan_update(update_info, fetch=False), self.iterations)
+        result["plan"] = {k: v for k, v in self.updater.plan_update(update_info, fetch=False).items()
+                          if k in ("package", "bytes", "estimate_s", "fits")}
+        return [result]
+
+    def bench_integrity(self):
+        # Atualização limpa seguida de verificação: nenhuma divergência
+        from hct_integrity import IntegrityScanner
+        manifest = self.state['manifests']['hcc']
+        scanner = IntegrityScanner(self.config_dir, self.workdir / 'data' / 'integrity_index.json')
+        scanner.scan()
+
+        reports = []
+        for version in ("2.0.0", "2.0.1"):
+            expect(self.updater.apply_update(self.package, dict(manifest, version=version)), "apply_update falhou")
+            scanner.load()
+            reports.append(scanner.scan())
+        for report in reports:
+            expect(report["counts"]["modified"] == 0 and report["counts"]["missing"] == 0,
+                   "Divergência após atualização limpa", counts=report["counts"], modified=report["modified"])
+
+        result = measure("integrity_scan", scanner.scan, self.iterations)
+        result["files"] = reports[-1]["files"]
+        result["counts"] = reports[-1]["counts"]
+        return [result]
+
+    def bench_log_dedup(self):
+        # Rajada de novas tentativas de download (porta fechada): um aviso + um resumo
+        import socket
+        import hct_updater
+        from hct_logger import HCTLogger
+
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            closed_url = f"http://127.0.0.1:{s.getsockname()[1]}/package.zip"
+
+        retries = 10
+        log_dir = self.workdir / 'logs_dedup'
+        original_logger, original_retries = hct_updater.logger, self.updater.max_retries
+        bench_logger = HCTLogger("bench-dedup", log_dir=str(log_dir), console=False, level='WARNING')
+        hct_updater.logger = bench_logger
+        self.updater.max_retries = retries
+        try:
+            result = measure("log_dedup_retry_burst", lambda: self.updater.download_file(closed_url), 1,
+                             attempts=retries)
+            # Mesma mensagem com detalhes diferentes: falhas distintas, nada agrupado
+            for manifest_type in MANIFEST_TYPES * 2:
+                bench_logger.warning("hct-updater", "check_updates", "Erro ao buscar manifest", {"type": manifest_type})
+            bench_logger.writer.flush()
+        finally:
+            hct_updater.logger, self.updater.max_retries = original_logger, original_retries
+
+        logged = bench_logger.get_recent_logs(limit=0)
+        records = [r for r in logged if r["action"] == "download_package" and r["level"] == "WARNING"]
+        manifests = [r for r in logged if r["action"] == "check_updates"]
+        expect(len(records) == 2 and records[-1].get("repeated") == retries - 1,
+               "Rajada de tentativas não agrupada", repeated=[r.get("repeated") for r in records])
+        expect(len(manifests) == 2 * len(MANIFEST_TYPES)
+               and sorted(r.get("repeated") or 0 for r in manifests) == [0] * 3 + [1] * 3,
+               "Falhas distintas agrupadas", manifests=[(r["details"].get("type"), r.get("repeated")) for r in manifests])
+        result["records"] = len(records)
+        result["repeated"] = [r.get("repeated") for r in records]
+        return [result]
+
+    def bench_logs(self):
+        from hct_logger import HCTLogger
+        results = []
+
+        for size_mb in self.args.log_mb:
+            log_dir = self.workdir / f"logs_{size_mb}"
+            lines = make_log_file(log_dir / f"bench-read-{size_mb}.json.log", size_mb)
+            reader = HCTLogger(f"bench-read-{size_mb}", log_dir=str(log_dir))
+            for limit in (20, 100, 1000):
+                results.append(measure(
+                    f"logs_read_{size_mb}mb_limit{limit}",
+                    lambda: reader.get_recent_logs(limit=limit),
+                    self.iterations,
+                    file_mb=size_mb,
+                    lines=lines,
+                    limit=limit
+                ))
+
+        writer_dir = self.workdir / 'logs_write'
+        writer = HCTLogger("bench-write", log_dir=str(writer_dir), console=False, level='INFO')
+
+        count = 2000 if self.args.quick else 10000
+
+        def write_batch():
+            for i in range(count):
+                writer.info("hct-bench", "write", "Registro sintético", {"i": i})
+
+        result = measure("logs_write", write_batch, self.iterations, records=count)
+        result["records_per_s"] = count / result["median_s"]
+        results.append(result)
+        return results
+
+    def bench_api(self):
+        try:
+            import hct_api
+        except ImportError as e:
+            return [{"name": "api", "skipped": f"Flask indisponível: {e}"}]
+
+        import hct_handlers
+        from hct_logger import HCTLogger
+
+        log_dir = self.workdir / 'logs_api'
+        make_log_file(log_dir / 'bench-api.json.log', self.args.log_mb[0])
+        hct_handlers.logger = HCTLogger("bench-api", log_dir=str(log_dir))
+        hct_api.init_api(TOKEN, self.updater)
+        client = hct_api.app.test_client()
+
+        requests_count = 50 if self.args.quick else 200
+        results = []
+        for route in ('/api/status', '/api/manifests', '/api/logs?limit=100', '/'):
+            def run(route=route):
+                for _ in range(requests_count):
+                    client.get(route)
+
+            result = measure(f"api_{route.strip('/').split('?')[0].replace('/', '_') or 'dashboard'}",
+                             run, self.iterations, requests=requests_count, route=route)
+            result["requests_per_s"] = requests_count / result["median_s"]
+            results.append(result)
+        return results
+
+    def bench_daemon_cycle(self):
+        try:
+            from hct_daemon import HCTDaemon
+        except ImportError as e:
+            return [{"name": "daemon_cycle", "skipped": f"Dependência indisponível: {e}"}]
+
+        daemon = HCTDaemon()
+        daemon.updater = self.updater
+        daemon.auto_update = False
+        before = self.state['notifications']
+        result = measure("daemon_check_cycle", daemon.check_and_update, self.iterations)
+        result["notifications_sent"] = self.state['notifications'] - before
+        return [result]
+
+
+BENCHMARKS = [
+    'manifest_check', 'download', 'verify_checksum', 'extract',
+    'backup_rollback', 'snapshot_supervisor', 'full_update', 'update_plan', 'integrity', 'log_dedup', 'logs', 'api',
+    'daemon_cycle'
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do HomeCore Tools")
+    parser.add_argument('--zip-mb', type=float, default=20, help="Tamanho do pacote sintético (MB)")
+    parser.add_argument('--log-mb', default="10,30,60", help="Tamanhos dos logs sintéticos (MB), separados por vírgula")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="Menos iterações e dados menores")
+    parser.add_argument('--only', default="", help=f"Subconjunto: {','.join(BENCHMARKS)}")
+    parser.add_argument('--output', default=None, help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    args.log_mb = [float(v) for v in args.log_mb.split(',') if v.strip()]
+    if args.quick:
+        args.zip_mb = min(args.zip_mb, 5)
+        args.log_mb = [min(v, 10) for v in args.log_mb[:1]]
+
+    selected = [name for name in args.only.split(',') if name] or BENCHMARKS
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Benchmarks desconhecidos: {', '.join(sorted(unknown))}")
+
+    workdir = Path(tempfile.mkdtemp(prefix='hct_bench_'))
+    report = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "params": {"zip_mb": args.zip_mb, "log_mb": args.log_mb, "iterations": args.iterations, "quick": args.quick},
+        "results": []
+    }
+
+    suite = BenchSuite(args, workdir)
+    try:
+        for name in selected:
+            print(f"[bench] {name}...", file=sys.stderr)
+            report["results"].extend(getattr(suite, f"bench_{name}")())
+    finally:
+        suite.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,185 +6,191 @@ Interface web para monitoramento e controle via Ingress
 
 import os
 import sys
-import json
+import time
 import logging
-from pathlib import Path
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, request, g, Response, send_file
 
 # Importar módulos HCT
 sys.path.insert(0, '/usr/bin')
-from hct_logger import get_logger
 from hct_updater import HCTUpdater
-
-logger = get_logger("hct-api")
+from hct_metrics import registry as metrics
+import hct_handlers as handlers
+from hct_handlers import state, logger, REQUEST_SECONDS
 
 app = Flask(__name__)
 
-# Estado global
-state = {
-    "token": None,
-    "updater": None,
-    "last_check": None,
-    "updates_available": []
-}
-
-
-# HTML do Dashboard
-DASHBOARD_HTML = """
-<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <title>HomeCore Tools</title>
-    <style>
-        body {
-            margin: 0;
-            height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            flex-direction: column;
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-            background: #f5f5f5;
-            color: #333;
-        }
-        .title {
-            font-size: 32px;
-            font-weight: 600;
-        }
-        .subtitle {
-            margin-top: 10px;
-            font-size: 14px;
-            opacity: 0.6;
-        }
-    </style>
-</head>
-<body>
-    <div class="title">HomeCore Tools</div>
-    <div class="subtitle">Funcionalidades exclusivas em breve</div>
-</body>
-</html>
-"""
+
+def respond(result):
+    """Serializa (payload, status) retornado pelos handlers (gzip se negociado)."""
+    payload, status = result
+    return send_bytes(handlers.encode_json(payload), status, handlers.JSON_CONTENT_TYPE)
+
+
+def send_bytes(body: bytes, status: int, content_type: str):
+    body, headers = handlers.compress(body, request.headers.get('Accept-Encoding'))
+    return Response(body, status, headers, content_type=content_type)
+
+
+def send_stream(chunks, content_type: str):
+    """Resposta em streaming, comprimida bloco a bloco se o cliente aceitar gzip."""
+    headers = {'Vary': 'Accept-Encoding'}
+    if handlers.accepts_gzip(request.headers.get('Accept-Encoding')):
+        chunks = handlers.gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(chunks, 200, headers, content_type=content_type)
+
+
+if metrics.enabled:
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Usar o padrão da rota (não a URL) para limitar a cardinalidade
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=request.method, route=route, status=response.status_code)
+        return response
 
 
 @app.route('/')
 def dashboard():
-    """Página principal do dashboard."""
-    return render_template_string(DASHBOARD_HTML)
+    """Página principal do dashboard (pré-comprimida, com ETag)."""
+    body, status, headers = handlers.DASHBOARD.respond(
+        request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match'))
+    return Response(body, status, headers)
 
 
 @app.route('/api/status')
 def api_status():
     """Retorna status atual do sistema."""
-    return jsonify({
-        "token": state["token"] is not None,
-        "last_check": state.get("last_check"),
-        "auto_update": os.environ.get('HCT_AUTO_UPDATE', 'true').lower() == 'true',
-        "check_interval": int(os.environ.get('HCT_CHECK_INTERVAL', '3600')),
-        "log_level": os.environ.get('HCT_LOG_LEVEL', 'INFO')
-    })
+    return respond(handlers.status_payload())
 
 
 @app.route('/api/manifests')
 def api_manifests():
     """Retorna manifests e atualizações disponíveis."""
-    return jsonify({
-        "updates": state.get("updates_available", [])
-    })
+    return respond(handlers.manifests_payload())
 
 
 @app.route('/api/logs')
 def api_logs():
-    """Retorna logs recentes."""
-    limit = request.args.get('limit', 100, type=int)
-    
-    try:
-        logs = logger.get_recent_logs(limit=limit)
-        return jsonify({"logs": logs})
-    except Exception as e:
-        logger.error("hct-api", "api_logs", "Erro ao obter logs", exception=e)
-        return jsonify({"error": str(e)}), 500
+    """Retorna logs recentes (JSON em streaming)."""
+    chunks, error = handlers.logs_stream(request.args.get('limit', 100, type=int))
+    if error:
+        return respond(error)
+    return send_stream(chunks, handlers.JSON_CONTENT_TYPE)
+
+
+@app.route('/api/molsmart/inventory')
+def api_molsmart_inventory():
+    """Retorna inventário de placas MolSmart e histórico de mudanças."""
+    return respond(handlers.inventory_payload())
+
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Exporta métricas no formato texto do Prometheus."""
+    return send_bytes(metrics.render().encode('utf-8'), 200, handlers.METRICS_CONTENT_TYPE)
+
+
+@app.route('/api/integrity')
+def api_integrity():
+    """Retorna o último relatório de integridade."""
+    return respond(handlers.integrity_payload())
+
+
+@app.route('/api/integrity/scan', methods=['POST'])
+def api_integrity_scan():
+    """Verifica integridade dos arquivos instalados."""
+    return respond(handlers.integrity_scan_payload())
+
+
+@app.route('/api/integrity/repair', methods=['POST'])
+def api_integrity_repair():
+    """Repara arquivos divergentes (opcional: {"files": [...]})."""
+    body = request.get_json(silent=True)
+    files = body.get('files') if isinstance(body, dict) else None
+    return respond(handlers.integrity_repair_payload(files))
 
 
 @app.route('/api/update/check', methods=['POST'])
 def api_update_check():
     """Verifica atualizações disponíveis."""
-    if not state.get("updater"):
-        return jsonify({"success": False, "error": "Updater não inicializado"}), 500
-    
-    try:
-        logger.info("hct-api", "update_check", "Verificando atualizações via API")
-        updates = state["updater"].check_updates()
-        state["updates_available"] = updates
-        state["last_check"] = json.dumps({"time": "now"})
-        
-        return jsonify({
-            "success": True,
-            "updates": updates
-        })
-    except Exception as e:
-        logger.error("hct-api", "update_check", "Erro ao verificar atualizações", exception=e)
-        return jsonify({"success": False, "error": str(e)}), 500
+    return respond(handlers.check_payload())
 
 
 @app.route('/api/update/apply', methods=['POST'])
 def api_update_apply():
     """Aplica atualizações disponíveis."""
-    if not state.get("updater"):
-        return jsonify({"success": False, "error": "Updater não inicializado"}), 500
-    
-    updates = state.get("updates_available", [])
-    
-    if not updates:
-        return jsonify({"success": False, "error": "Nenhuma atualização disponível"}), 400
-    
-    try:
-        logger.info("hct-api", "update_apply", f"Aplicando {len(updates)} atualização(ões) via API")
-        
-        success_count = 0
-        failed_count = 0
-        
-        for update in updates:
-            if state["updater"].update(update):
-                success_count += 1
-            else:
-                failed_count += 1
-        
-        # Limpar lista de atualizações
-        state["updates_available"] = []
-        
-        return jsonify({
-            "success": True,
-            "success_count": success_count,
-            "failed_count": failed_count
-        })
-    except Exception as e:
-        logger.error("hct-api", "update_apply", "Erro ao aplicar atualizações", exception=e)
-        return jsonify({"success": False, "error": str(e)}), 500
+    return respond(handlers.apply_payload())
+
+
+@app.route('/api/update/staged')
+def api_update_staged():
+    """Retorna pacotes pré-baixados prontos para aplicar."""
+    return respond(handlers.staged_payload())
+
+
+@app.route('/api/update/plan')
+def api_update_plan():
+    """Retorna o plano (dry-run) das atualizações pendentes."""
+    return respond(handlers.plan_payload(request.args.get('fetch', '1') != '0'))
+
+
+@app.route('/api/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def api_admin_profile():
+    """Consulta (GET), arma (POST) ou desarma (DELETE) o profiling."""
+    denied = handlers.admin_denied(request.remote_addr)
+    if denied:
+        return respond(denied)
+    if request.method == 'POST':
+        return respond(handlers.profile_arm_payload(request.get_json(silent=True)))
+    if request.method == 'DELETE':
+        return respond(handlers.profile_disarm_payload())
+    return respond(handlers.profile_status_payload())
+
+
+@app.route('/api/admin/profile/<result_id>')
+def api_admin_profile_result(result_id):
+    """Resultado de profiling: resumo JSON ou arquivo pstats (?format=pstats)."""
+    denied = handlers.admin_denied(request.remote_addr)
+    if denied:
+        return respond(denied)
+    fmt = request.args.get('format', 'json')
+    path, error = handlers.profile_result(result_id, fmt)
+    if error:
+        return respond(error)
+    if fmt == 'pstats':
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f"{result_id}.pstats")
+    with open(path, 'rb') as f:
+        return send_bytes(f.read(), 200, handlers.JSON_CONTENT_TYPE)
 
 
 def init_api(token: str, updater: HCTUpdater):
     """Inicializa a API com token e updater."""
-    state["token"] = token
-    state["updater"] = updater
-    logger.info("hct-api", "init", "API inicializada")
+    handlers.init_state(token, updater)
 
 def run_api(host: str = '0.0.0.0', port: int = 8099):
     """Executa servidor Flask com wsgiref (silencioso)."""
     logger.info("hct-api", "startup", f"Iniciando servidor web em {host}:{port}")
-    
+
     # Usar wsgiref ao invés do servidor Flask padrão
     # wsgiref não imprime logs de inicialização
     from wsgiref.simple_server import make_server
-    import os
-    
+
     # Redirecionar stderr para evitar qualquer log
     sys.stderr = open(os.devnull, 'w')
-    
+
     # Desabilitar loggers do Flask
     logging.getLogger('werkzeug').disabled = True
     app.logger.disabled = True
-    
+
     # Criar e iniciar servidor wsgiref (100% silencioso)
     server = make_server(host, port, app)
     server.serve_forever()
@@ -192,4 +198,4 @@ def run_api(host: str = '0.0.0.0', port: int = 8099):
 if __name__ == "__main__":
     # Teste standalone
     logger.info("hct-api", "test", "Modo de teste - API sem updater")
-    run_api()
\ No newline at end of file
+    run_api()
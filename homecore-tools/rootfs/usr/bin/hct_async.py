@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Runtime Assíncrono
+Daemon em um único event loop: agendador, cliente HTTP (aiohttp) e API de Ingress
+
+Ativado com a opção `runtime: asyncio` (HCT_RUNTIME). Trabalho bloqueante em
+disco (backup, extração, cópia, leitura de logs) roda em um executor limitado
+(HCT_EXECUTOR_WORKERS, padrão 2), sem uma thread por requisição.
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+from hct_daemon import HCTDaemon
+from hct_startup import profile
+from hct_http import USER_AGENT
+from hct_metrics import registry as metrics, OPERATION_SECONDS, OPERATION_TOTAL
+from hct_profiling import profiler
+import hct_handlers as handlers
+
+logger = get_logger("hct-daemon")
+
+
+def json_response(request: web.Request, result) -> web.Response:
+    """Serializa (payload, status) retornado pelos handlers (gzip se negociado)."""
+    payload, status = result
+    return bytes_response(request, handlers.encode_json(payload), status, handlers.JSON_CONTENT_TYPE)
+
+
+def bytes_response(request: web.Request, body: bytes, status: int, content_type: str) -> web.Response:
+    body, headers = handlers.compress(body, request.headers.get('Accept-Encoding'))
+    headers['Content-Type'] = content_type
+    return web.Response(body=body, status=status, headers=headers)
+
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler):
+    """Latência por rota (padrão da rota, não a URL)."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unmatched"
+        handlers.REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method, route=route, status=status)
+
+
+class AsyncHCTDaemon(HCTDaemon):
+    """Daemon HCT sobre asyncio: uma thread de event loop + executor limitado."""
+
+    def __init__(self):
+        super().__init__()
+        self.executor_workers = max(1, int(os.environ.get('HCT_EXECUTOR_WORKERS', '2')))
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.stop_event: Optional[asyncio.Event] = None
+        self.update_lock: Optional[asyncio.Lock] = None
+
+    # ─── Infraestrutura ───────────────────────────────────────────────────
+
+    def request_shutdown(self):
+        """Handler de SIGTERM/SIGINT no event loop."""
+        logger.info("hct-daemon", "shutdown", "Recebido sinal de shutdown")
+        self.running = False
+        self.stop_event.set()
+
+    async def run_blocking(self, func: Callable, *args):
+        """Executa função bloqueante no executor limitado."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def wait_stop(self, seconds: float) -> bool:
+        """Aguarda `seconds` ou shutdown; retorna True se shutdown foi pedido."""
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # ─── Cliente HTTP ─────────────────────────────────────────────────────
+
+    async def get_homecore_token_async(self) -> Optional[str]:
+        """Obtém token da integração HomeCore via API HTTP."""
+        if not self.supervisor_token:
+            logger.error("hct-daemon", "get_token", "SUPERVISOR_TOKEN não disponível")
+            return None
+
+        logger.info("hct-daemon", "get_token", "Obtendo token da integração HomeCore")
+
+        url = f"{self.homeassistant_url}/api/homecore/token"
+        try:
+            async with self.session.get(
+                url,
+                headers={'Content-Type': 'application/json'},
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status == 404:
+                    logger.error("hct-daemon", "get_token", "Integração HomeCore não instalada ou não configurada")
+                    return None
+                if response.status != 200:
+                    logger.error("hct-daemon", "get_token", f"HTTP {response.status}")
+                    return None
+
+                data = await response.json(content_type=None)
+                token = data.get('token')
+
+                if not token:
+                    logger.error("hct-daemon", "get_token", "Token não encontrado na resposta da API")
+                    return None
+
+                logger.success("hct-daemon", "get_token", "Token obtido com sucesso via API HTTP")
+                logger.debug("hct-daemon", "get_token", f"API URL: {data.get('api_url')}")
+                logger.debug("hct-daemon", "get_token", f"Sync interval: {data.get('sync_interval')}s")
+                return token
+
+        except aiohttp.ClientError as e:
+            logger.error("hct-daemon", "get_token", "Erro de rede ao obter token", exception=e)
+            return None
+        except Exception as e:
+            logger.error("hct-daemon", "get_token", "Erro ao obter token", exception=e)
+            return None
+
+    async def send_notification_async(self, title: str, message: str, notification_id: str = None):
+        """Envia notificação persistente para o Home Assistant."""
+        if not self.notify_on_update:
+            return
+
+        if not self.supervisor_token:
+            logger.warning("hct-daemon", "send_notification", "SUPERVISOR_TOKEN não disponível")
+            return
+
+        logger.info("hct-daemon", "send_notification", f"Enviando notificação: {title}")
+
+        data = {"title": title, "message": message}
+        if notification_id:
+            data["notification_id"] = notification_id
+
+        try:
+            async with self.session.post(
+                f"{self.supervisor_url}/core/api/services/persistent_notification/create",
+                json=data,
+                headers={'Authorization': f'Bearer {self.supervisor_token}'},
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                await response.read()
+                if response.status in [200, 201]:
+                    logger.success("hct-daemon", "send_notification", "Notificação enviada")
+                else:
+                    logger.warning("hct-daemon", "send_notification", f"HTTP {response.status}")
+
+        except Exception as e:
+            logger.error("hct-daemon", "send_notification", "Erro ao enviar notificação", exception=e)
+
+    async def fetch_remote_manifest_async(self, manifest_type: str) -> Optional[Dict[str, Any]]:
+        """Equivalente assíncrono de HCTUpdater.fetch_remote_manifest."""
+        url = self.updater.manifest_url(manifest_type)
+        data = None
+
+        logger.info("hct-updater", "fetch_manifest", f"Buscando manifest {manifest_type}", {
+            "url": url,
+            "type": manifest_type
+        })
+
+        with OPERATION_SECONDS.time(operation="fetch_manifest"):
+            try:
+                async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    if response.status == 200:
+                        data = await response.json(content_type=None)
+                        self.updater.store_remote_manifest(manifest_type, data)
+                    elif response.status == 404:
+                        logger.info("hct-updater", "fetch_manifest", f"Manifest {manifest_type} não disponível")
+                    else:
+                        logger.warning("hct-updater", "fetch_manifest", f"HTTP {response.status}", {
+                            "type": manifest_type
+                        })
+            except Exception as e:
+                logger.error("hct-updater", "fetch_manifest", "Erro ao buscar manifest", exception=e)
+
+        OPERATION_TOTAL.inc(operation="fetch_manifest", result="success" if data else "failure")
+        return data
+
+    async def check_updates_async(self) -> list:
+        """Busca todos os manifests em paralelo e compara com os instalados."""
+        logger.info("hct-updater", "check_updates", "Verificando atualizações disponíveis")
+
+        types = self.updater.manifest_types
+        remotes = await asyncio.gather(*(self.fetch_remote_manifest_async(t) for t in types))
+
+        updates = []
+        for manifest_type, remote in zip(types, remotes):
+            update_info = self.updater.evaluate_update(manifest_type, remote)
+            if update_info:
+                updates.append(update_info)
+
+        if not updates:
+            logger.info("hct-updater", "check_updates", "Nenhuma atualização disponível")
+
+        return updates
+
+    # ─── Agendador ────────────────────────────────────────────────────────
+
+    async def check_and_update_async(self):
+        """Verifica e aplica atualizações se disponíveis."""
+        if not self.updater:
+            logger.warning("hct-daemon", "check_and_update", "Updater não inicializado")
+            return
+
+        logger.info("hct-daemon", "check_and_update", "Verificando atualizações")
+        self.deferred = False
+
+        # Profiling armado para o ciclo: cobre as atualizações no executor
+        # (o event loop é compartilhado e não entra no cProfile)
+        profiling = profiler.begin("check_and_update")
+
+        try:
+            updates = await self.check_updates_async()
+
+            if not updates:
+                logger.info("hct-daemon", "check_and_update", "Nenhuma atualização disponível")
+                return
+
+            await self.send_notification_async(
+                "Atualizações HomeCore Disponíveis",
+                self.available_message(updates),
+                "homecore_updates_available"
+            )
+
+            if self.defer_outside_window():
+                return
+
+            if not self.auto_update:
+                logger.info("hct-daemon", "check_and_update", "Auto-update desabilitado, atualizações não aplicadas")
+                # Pré-download em thread própria (baixa prioridade), fora do executor
+                self.updater.prefetcher.start(updates)
+                return
+
+            logger.info("hct-daemon", "check_and_update", f"Aplicando {len(updates)} atualização(ões)")
+
+            success_count = 0
+            failed_updates = []
+
+            # Atualizações mexem no mesmo /config: uma por vez, fora do event loop
+            async with self.update_lock:
+                for update in updates:
+                    logger.info("hct-daemon", "check_and_update", f"Atualizando {update['type']}")
+
+                    if await self.run_blocking(self.updater.update, update):
+                        success_count += 1
+                    else:
+                        failed_updates.append(update['type'])
+
+            if success_count > 0:
+                await self.send_notification_async(
+                    "Atualizações HomeCore Aplicadas",
+                    self.applied_message(success_count, failed_updates),
+                    "homecore_updates_applied"
+                )
+
+            logger.success("hct-daemon", "check_and_update", "Processo de atualização concluído", {
+                "success": success_count,
+                "failed": len(failed_updates)
+            })
+
+        except Exception as e:
+            logger.error("hct-daemon", "check_and_update", "Erro durante verificação/atualização", exception=e)
+
+        finally:
+            if profiling:
+                # Snapshot do tracemalloc e gravação em /data fora do event loop
+                await self.run_blocking(profiler.end, profiling)
+
+    async def scheduler(self):
+        """Verificação inicial e depois a cada check_interval (até shutdown)."""
+        logger.info("hct-daemon", "startup", "Executando verificação inicial")
+        with profile.phase("first_check"):
+            await self.check_and_update_async()
+        profile.report(logger, runtime=self.runtime, executor_workers=self.executor_workers)
+
+        while not await self.wait_stop(self.next_check_delay()):
+            await self.check_and_update_async()
+
+    def next_check_delay(self) -> float:
+        """Intervalo normal, ou até a abertura da janela se houver atualizações adiadas."""
+        if self.deferred:
+            return max(1.0, min(self.check_interval, self.maintenance_window.seconds_until_open()))
+        return self.check_interval
+
+    # ─── API de Ingress ───────────────────────────────────────────────────
+
+    def build_app(self) -> web.Application:
+        """Aplicação aiohttp com as mesmas rotas e respostas do hct_api (Flask)."""
+        app = web.Application(middlewares=[metrics_middleware] if metrics.enabled else [])
+        app.router.add_get('/', self.handle_dashboard)
+        app.router.add_get('/api/status', self.handle_status)
+        app.router.add_get('/api/manifests', self.handle_manifests)
+        app.router.add_get('/api/logs', self.handle_logs)
+        app.router.add_get('/api/molsmart/inventory', self.handle_inventory)
+        app.router.add_get('/api/metrics', self.handle_metrics)
+        app.router.add_get('/api/integrity', self.handle_integrity)
+        app.router.add_post('/api/integrity/scan', self.handle_integrity_scan)
+        app.router.add_post('/api/integrity/repair', self.handle_integrity_repair)
+        app.router.add_post('/api/update/check', self.handle_update_check)
+        app.router.add_post('/api/update/apply', self.handle_update_apply)
+        app.router.add_get('/api/update/staged', self.handle_update_staged)
+        app.router.add_get('/api/update/plan', self.handle_update_plan)
+        app.router.add_get('/api/admin/profile', self.handle_admin_profile)
+        app.router.add_post('/api/admin/profile', self.handle_admin_profile)
+        app.router.add_delete('/api/admin/profile', self.handle_admin_profile)
+        app.router.add_get('/api/admin/profile/{result_id}', self.handle_admin_profile_result)
+        return app
+
+    async def handle_dashboard(self, request: web.Request) -> web.Response:
+        body, status, headers = handlers.DASHBOARD.respond(
+            request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match'))
+        return web.Response(body=body, status=status, headers=headers)
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        return json_response(request, handlers.status_payload())
+
+    async def handle_manifests(self, request: web.Request) -> web.Response:
+        return json_response(request, handlers.manifests_payload())
+
+    async def handle_logs(self, request: web.Request) -> web.Response:
+        try:
+            limit = int(request.query.get('limit', 100))
+        except ValueError:
+            limit = 100
+        chunks, error = await self.run_blocking(handlers.logs_stream, limit)
+        if error:
+            return json_response(request, error)
+
+        headers = {'Content-Type': handlers.JSON_CONTENT_TYPE, 'Vary': 'Accept-Encoding'}
+        if handlers.accepts_gzip(request.headers.get('Accept-Encoding')):
+            chunks = handlers.gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+
+        response = web.StreamResponse(headers=headers)
+        await response.prepare(request)
+        for chunk in chunks:
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+    async def handle_inventory(self, request: web.Request) -> web.Response:
+        return json_response(request, await self.run_blocking(handlers.inventory_payload))
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return bytes_response(request, metrics.render().encode('utf-8'), 200, handlers.METRICS_CONTENT_TYPE)
+
+    async def handle_update_staged(self, request: web.Request) -> web.Response:
+        return json_response(request, await self.run_blocking(handlers.staged_payload))
+
+    async def handle_update_plan(self, request: web.Request) -> web.Response:
+        fetch = request.query.get('fetch', '1') != '0'
+        return json_response(request, await self.run_blocking(handlers.plan_payload, fetch))
+
+    async def handle_admin_profile(self, request: web.Request) -> web.Response:
+        denied = handlers.admin_denied(request.remote)
+        if denied:
+            return json_response(request, denied)
+        if request.method == 'POST':
+            try:
+                body = await request.json()
+            except ValueError:
+                body = {}
+            return json_response(request, handlers.profile_arm_payload(body))
+        if request.method == 'DELETE':
+            return json_response(request, await self.run_blocking(handlers.profile_disarm_payload))
+        return json_response(request, handlers.profile_status_payload())
+
+    async def handle_admin_profile_result(self, request: web.Request) -> web.StreamResponse:
+        denied = handlers.admin_denied(request.remote)
+        if denied:
+            return json_response(request, denied)
+        result_id = request.match_info['result_id']
+        fmt = request.query.get('format', 'json')
+        path, error = handlers.profile_result(result_id, fmt)
+        if error:
+            return json_response(request, error)
+        if fmt == 'pstats':
+            return web.FileResponse(path, headers={
+                'Content-Type': 'application/octet-stream',
+                'Content-Disposition': f'attachment; filename="{result_id}.pstats"'
+            })
+        with open(path, 'rb') as f:
+            return bytes_response(request, f.read(), 200, handlers.JSON_CONTENT_TYPE)
+
+    async def handle_integrity(self, request: web.Request) -> web.Response:
+        return json_response(request, await self.run_blocking(handlers.integrity_payload))
+
+    async def handle_integrity_scan(self, request: web.Request) -> web.Response:
+        return json_response(request, await self.run_blocking(handlers.integrity_scan_payload))
+
+    async def handle_integrity_repair(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+        files = body.get('files') if isinstance(body, dict) else None
+        # Reparo grava em /config: serializado com as atualizações
+        async with self.update_lock:
+            return json_response(request, await self.run_blocking(handlers.integrity_repair_payload, files))
+
+    async def handle_update_check(self, request: web.Request) -> web.Response:
+        missing = handlers.updater_missing()
+        if missing:
+            return json_response(request, missing)
+
+        try:
+            logger.info("hct-api", "update_check", "Verificando atualizações via API")
+            return json_response(request, handlers.record_check(await self.check_updates_async()))
+        except Exception as e:
+            return json_response(request, handlers.check_error(e))
+
+    async def handle_update_apply(self, request: web.Request) -> web.Response:
+        async with self.update_lock:
+            return json_response(request, await self.run_blocking(handlers.apply_payload))
+
+    # ─── Ciclo de vida ────────────────────────────────────────────────────
+
+    async def run_async(self):
+        """Loop principal do daemon (event loop único)."""
+        loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        self.update_lock = asyncio.Lock()
+
+        # Sinais só podem ser tratados pelo loop na thread principal
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, self.request_shutdown)
+
+        self.executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix="hct-worker")
+        loop.set_default_executor(self.executor)
+        self.session = aiohttp.ClientSession(
+            headers={'User-Agent': USER_AGENT},
+            connector=aiohttp.TCPConnector(limit=8)
+        )
+        runner = None
+
+        logger.info("hct-daemon", "startup", "HomeCore Tools Daemon iniciado", {
+            "log_level": self.log_level,
+            "check_interval": self.check_interval,
+            "auto_update": self.auto_update,
+            "runtime": self.runtime,
+            "executor_workers": self.executor_workers
+        })
+
+        try:
+            with profile.phase("token"):
+                self.token = await self.get_homecore_token_async()
+
+            if not self.token:
+                logger.error("hct-daemon", "startup", "Não foi possível obter token da integração HomeCore")
+                logger.error("hct-daemon", "startup", "Certifique-se de que a integração HomeCore está instalada e configurada")
+
+                await self.send_notification_async(
+                    "HomeCore Tools - Erro",
+                    "Não foi possível obter token da integração HomeCore. "
+                    "Certifique-se de que a integração está instalada e configurada.",
+                    "homecore_tools_error"
+                )
+
+                # Aguardar 5 minutos (ou shutdown) antes de tentar novamente
+                if await self.wait_stop(300):
+                    return
+
+                self.token = await self.get_homecore_token_async()
+
+                if not self.token:
+                    logger.error("hct-daemon", "startup", "Falha ao obter token após retry, encerrando")
+                    return
+
+            with profile.phase("updater_init"):
+                with profile.importing("hct_updater"):
+                    from hct_updater import HCTUpdater
+                self.updater = HCTUpdater(self.token)
+            logger.info("hct-daemon", "startup", "Updater inicializado")
+
+            # Downloads e extrações interrompidos por crash/reinício
+            with profile.phase("staging_cleanup"):
+                await self.run_blocking(self.updater.staging.prepare)
+
+            with profile.phase("api_start"):
+                handlers.init_state(self.token, self.updater)
+                runner = web.AppRunner(self.build_app(), access_log=None)
+                await runner.setup()
+                await web.TCPSite(runner, self.api_host, self.api_port).start()
+            logger.info("hct-daemon", "startup", f"Servidor web iniciado na porta {self.api_port}")
+
+            with profile.phase("startup_notification"):
+                await self.send_notification_async(
+                    "HomeCore Tools Iniciado",
+                    self.started_message(),
+                    "homecore_tools_started"
+                )
+
+            await self.scheduler()
+
+        finally:
+            if runner is not None:
+                await runner.cleanup()
+            await self.session.close()
+            self.executor.shutdown(wait=True)
+            logger.info("hct-daemon", "shutdown", "Daemon encerrado")
+
+    def run(self):
+        asyncio.run(self.run_async())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Cache de Pacotes
+Cache endereçado por conteúdo (SHA-256) dos pacotes baixados, com despejo LRU
+sob um limite de tamanho
+
+Pacotes são encontrados pelo checksum do manifest ou, sem checksum, pela URL
+com revalidação por ETag (If-None-Match). Reaplicações, reparos e novas
+tentativas após falha usam o cache em vez da rede.
+
+Local: HCT_PACKAGE_CACHE_DIR, ou $HCT_SHARE_DIR/homecore-tools/packages (se
+/share for gravável), ou $HCT_DATA_DIR/package_cache. Limite em
+HCT_PACKAGE_CACHE_MB (0 desabilita).
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+
+logger = get_logger("hct-cache")
+
+DEFAULT_SIZE_MB = 256
+
+
+def default_cache_dir() -> Path:
+    configured = os.environ.get('HCT_PACKAGE_CACHE_DIR')
+    if configured:
+        return Path(configured)
+    share = Path(os.environ.get('HCT_SHARE_DIR', '/share'))
+    if share.is_dir() and os.access(share, os.W_OK):
+        return share / 'homecore-tools' / 'packages'
+    return Path(os.environ.get('HCT_DATA_DIR', '/data')) / 'package_cache'
+
+
+def url_key(url: str) -> str:
+    """Chave da URL (a query pode conter o token do cliente; não é gravada)."""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def normalize_checksum(checksum: str) -> str:
+    return checksum.replace('sha256:', '').strip().lower()
+
+
+class PackageCache:
+    """Objetos <sha256>.pkg + índice JSON (tamanho, último uso, URLs/ETags)."""
+
+    def __init__(self, root: Path = None, max_bytes: int = None):
+        self.root = Path(root) if root else default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('HCT_PACKAGE_CACHE_MB', DEFAULT_SIZE_MB)) * 1024 * 1024
+        self.max_bytes = max_bytes
+        self.index_path = self.root / 'index.json'
+        self._lock = threading.Lock()
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        self.urls: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional['PackageCache']:
+        """Cache configurado, ou None se desabilitado (limite 0)."""
+        cache = cls()
+        return cache if cache.max_bytes > 0 else None
+
+    # ─── Índice ───────────────────────────────────────────────────────────
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            self.objects = data.get('objects', {})
+            self.urls = data.get('urls', {})
+        except (OSError, ValueError):
+            self.objects, self.urls = {}, {}
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({"objects": self.objects, "urls": self.urls}, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / f"{digest}.pkg"
+
+    def _forget(self, digest: str):
+        self.objects.pop(digest, None)
+        for key in [k for k, u in self.urls.items() if u.get('sha256') == digest]:
+            del self.urls[key]
+        path = self._path(digest)
+        if path.exists():
+            path.unlink()
+
+    def _intact(self, digest: str) -> bool:
+        """Objeto existe e tem o tamanho registrado (senão é removido do índice)."""
+        entry = self.objects.get(digest)
+        if not entry:
+            return False
+        try:
+            if self._path(digest).stat().st_size == entry['size']:
+                return True
+        except OSError:
+            pass
+        self._forget(digest)
+        return False
+
+    def usage(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.root),
+                "entries": len(self.objects),
+                "bytes": sum(e['size'] for e in self.objects.values()),
+                "max_bytes": self.max_bytes
+            }
+
+    # ─── Consulta ─────────────────────────────────────────────────────────
+
+    def lookup(self, checksum: str) -> Optional[str]:
+        """SHA-256 do objeto em cache para o checksum esperado, ou None."""
+        digest = normalize_checksum(checksum)
+        with self._lock:
+            if not self._intact(digest):
+                return None
+            self.objects[digest]['last_used'] = time.time()
+            self._save()
+        return digest
+
+    def lookup_url(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrada {sha256, etag} de uma URL em cache (para If-None-Match), ou None."""
+        with self._lock:
+            entry = self.urls.get(url_key(url))
+            if not entry or not self._intact(entry['sha256']):
+                return None
+            return dict(entry)
+
+    def touch(self, digest: str):
+        with self._lock:
+            if digest in self.objects:
+                self.objects[digest]['last_used'] = time.time()
+                self._save()
+
+    def copy_to(self, digest: str, target: Path) -> str:
+        """
+        Copia o objeto para `target` e devolve o SHA-256 calculado na cópia.
+        Sempre uma cópia (não hardlink): o diretório do cache pode ser alterado
+        por outros add-ons e o arquivo verificado é o que será aplicado.
+        """
+        sha256_hash = hashlib.sha256()
+        with open(self._path(digest), 'rb') as src, open(target, 'wb') as dst:
+            for block in iter(lambda: src.read(1024 * 1024), b""):
+                sha256_hash.update(block)
+                dst.write(block)
+        return sha256_hash.hexdigest()
+
+    def invalidate(self, digest: str):
+        """Remove um objeto cujo conteúdo não confere com o SHA-256 do índice."""
+        with self._lock:
+            self._forget(digest)
+            self._save()
+        logger.warning("hct-cache", "invalidate", "Pacote em cache corrompido removido", {
+            "sha256": digest
+        })
+
+    # ─── Armazenamento ────────────────────────────────────────────────────
+
+    def store(self, path: Path, digest: str, url: str = None, etag: str = None):
+        """Guarda o arquivo (SHA-256 já calculado no download) e aplica o limite."""
+        size = Path(path).stat().st_size
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            target = self._path(digest)
+            if not self._intact(digest):
+                self.root.mkdir(parents=True, exist_ok=True)
+                tmp_target = target.with_suffix('.tmp')
+                try:
+                    os.link(path, tmp_target)
+                except OSError:
+                    shutil.copyfile(path, tmp_target)
+                os.replace(tmp_target, target)
+
+            self.objects[digest] = {"size": size, "last_used": time.time()}
+            if url and etag:
+                self.urls[url_key(url)] = {"sha256": digest, "etag": etag}
+            self._evict()
+            self._save()
+
+        logger.debug("hct-cache", "store", "Pacote armazenado em cache", {
+            "sha256": digest,
+            "size": size
+        })
+
+    def _evict(self):
+        """Remove os objetos menos usados recentemente até caber no limite."""
+        total = sum(e['size'] for e in self.objects.values())
+        for digest, entry in sorted(self.objects.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            self._forget(digest)
+            logger.info("hct-cache", "evict", "Pacote removido do cache (LRU)", {
+                "sha256": digest,
+                "size": entry['size']
+            })
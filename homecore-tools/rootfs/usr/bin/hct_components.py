@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Componentes de Atualização
+Handlers plugáveis do HCTUpdater (core, hcc, api, hacs, mushroom), portados
+dos scripts em /tools para rodar em um único processo Python
+"""
+
+import os
+import sys
+import json
+import shutil
+import tarfile
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+# Importar módulos HCT
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+from hct_http import HTTPStatusError
+
+logger = get_logger("hct-components")
+
+SYNC_ENDPOINT = "https://homecore.com.br/api/sync/beacon.php"
+GITHUB_API = "https://api.github.com"
+
+
+def same_version(a: Optional[str], b: Optional[str]) -> bool:
+    """Compara versões ignorando o prefixo "v" das tags (v5.0.8 == 5.0.8)."""
+    return bool(a and b) and a.strip().lstrip('vV') == b.strip().lstrip('vV')
+
+
+class ComponentHandler:
+    """
+    Base dos handlers de componente.
+
+    Subclasses implementam resolve_release() e apply(); o fluxo comum
+    (comparação de versão, backup, download com checksum, extração e
+    limpeza) fica em run() e usa a infraestrutura do HCTUpdater.
+    """
+
+    name = ""
+    title = ""
+    requires_token = True
+    artifact_suffix = '.zip'
+
+    def __init__(self, updater):
+        self.updater = updater
+
+    @property
+    def config_dir(self) -> Path:
+        return self.updater.config_dir
+
+    @classmethod
+    def token_files(cls, config_dir: Path) -> List[Path]:
+        """Arquivos onde o token pode estar salvo (além de HOMECORE_TOKEN)."""
+        return []
+
+    @classmethod
+    def find_token(cls, config_dir: Path, explicit: str = None) -> Optional[str]:
+        """Resolve token: argumento, variáveis de ambiente e arquivos conhecidos."""
+        for candidate in (explicit, os.environ.get('HOMECORE_TOKEN'), os.environ.get('HOMECORE_DEVICE_KEY')):
+            if candidate and candidate.strip():
+                return candidate.strip()
+
+        for token_file in cls.token_files(config_dir):
+            try:
+                token = token_file.read_text().strip()
+            except OSError:
+                continue
+            if token:
+                return token
+
+        return None
+
+    def auth_headers(self) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {self.updater.token}'}
+
+    def resolve_release(self) -> Optional[Dict[str, Any]]:
+        """
+        Descobre a release disponível.
+
+        Retorna {"url", "version", "checksum", "headers"} ou None quando não há
+        atualização. Erros devem ser propagados como exceção.
+        """
+        raise NotImplementedError
+
+    def installed_version(self) -> Optional[str]:
+        """Versão instalada (None se desconhecida)."""
+        return None
+
+    def backup(self) -> None:
+        """Backup anterior à aplicação (opcional)."""
+
+    def apply(self, source_dir: Path, release: Dict[str, Any]) -> None:
+        """Copia o conteúdo extraído para o destino."""
+        raise NotImplementedError
+
+    def install(self, package_path: Path, release: Dict[str, Any]) -> None:
+        """Instala o artefato baixado (padrão: ZIP extraído em processo)."""
+        temp_dir, staging_dir = self.updater.extract_package(package_path)
+        try:
+            self.apply(staging_dir, release)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @staticmethod
+    def timestamp() -> str:
+        return datetime.now().strftime("%Y%m%dT%H%M%S")
+
+    def run(self) -> str:
+        """Executa o fluxo completo. Retorna "updated", "no_update" ou "failed"."""
+        logger.info("hct-components", self.name, f"Iniciando atualização: {self.title}")
+
+        try:
+            release = self.resolve_release()
+            if not release:
+                logger.info("hct-components", self.name, "Nenhuma atualização disponível")
+                return "no_update"
+
+            version = release.get('version')
+            installed = self.installed_version()
+            if same_version(version, installed):
+                logger.info("hct-components", self.name, f"Versão {version} já instalada")
+                return "no_update"
+
+            self.backup()
+
+            package_path = self.updater.download_file(
+                release['url'],
+                headers=release.get('headers'),
+                suffix=self.artifact_suffix,
+                raise_not_found=True,
+                checksum=release.get('checksum')
+            )
+            if not package_path:
+                logger.error("hct-components", self.name, "Falha no download")
+                return "failed"
+
+            try:
+                checksum = release.get('checksum')
+                if checksum and not self.updater.verify_checksum(package_path, checksum):
+                    return "failed"
+
+                self.install(package_path, release)
+            finally:
+                self.updater.discard_package(package_path)
+
+            logger.success("hct-components", self.name, f"{self.title} atualizado com sucesso", {
+                "version": version,
+                "previous": installed
+            })
+            return "updated"
+
+        except HTTPStatusError as e:
+            if e.code == 404:
+                logger.info("hct-components", self.name, "Artefato não disponível (HTTP 404); sem atualização")
+                return "no_update"
+            logger.error("hct-components", self.name, f"Erro HTTP {e.code}", exception=e)
+            return "failed"
+
+        except Exception as e:
+            logger.error("hct-components", self.name, "Erro durante atualização", exception=e)
+            return "failed"
+
+
+class CoreComponent(ComponentHandler):
+    """Núcleo HomeCore (antigo tools/core_update.sh)."""
+
+    name = "core"
+    title = "HomeCore Core"
+    base_url = "https://homecore.com.br/api/update/core"
+
+    @property
+    def root(self) -> Path:
+        # Mesmo padrão do script: HOMECORE_CONFIG_DIR ou /config/custom_components
+        return Path(os.environ.get('HOMECORE_CONFIG_DIR', str(self.config_dir / 'custom_components')))
+
+    @classmethod
+    def token_files(cls, config_dir: Path) -> List[Path]:
+        root = Path(os.environ.get('HOMECORE_CONFIG_DIR', str(config_dir / 'custom_components')))
+        return [root / 'homecore' / 'token']
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.root / 'homecore' / 'core_manifest.json'
+
+    def resolve_release(self) -> Optional[Dict[str, Any]]:
+        endpoint = os.environ.get('HOMECORE_SYNC_ENDPOINT', SYNC_ENDPOINT)
+        try:
+            data = self.updater.http.get_json(f"{endpoint}?action=client_version",
+                                              headers=self.auth_headers(), timeout=30)
+        except Exception as e:
+            logger.info("hct-components", self.name, "Sem resposta do endpoint client_version; assumindo sem atualização", {
+                "error": str(e)
+            })
+            return None
+
+        if not isinstance(data, dict):
+            return None
+
+        artifact = data.get('core_artifact_url') or data.get('core_artifact') or ""
+        checksum = data.get('core_checksum') or ""
+        version = data.get('core_version') or ""
+
+        for item in data.get('releases') or []:
+            if isinstance(item, dict) and item.get('kind') == 'core':
+                artifact = item.get('artifact_url') or item.get('url') or artifact
+                checksum = item.get('checksum') or checksum
+                version = item.get('version') or version
+                break
+
+        if not artifact:
+            return None
+
+        if not artifact.startswith('http'):
+            if artifact.startswith('./'):
+                artifact = artifact[2:]
+            artifact = f"{self.base_url.rstrip('/')}/{artifact}"
+
+        return {
+            "url": artifact,
+            "checksum": checksum,
+            "version": str(version) if version else None,
+            "headers": self.auth_headers()
+        }
+
+    def installed_version(self) -> Optional[str]:
+        local = self.updater.load_json_file(self.manifest_file)
+        version = local.get('version') if local else None
+        return str(version) if version is not None else None
+
+    def backup(self) -> None:
+        backup_root = self.root / 'homecore' / 'backups' / f"core_{self.timestamp()}"
+        backup_root.mkdir(parents=True, exist_ok=True)
+
+        packages_dir = self.root / 'packages'
+        if packages_dir.is_dir():
+            shutil.copytree(packages_dir, backup_root / 'packages', symlinks=True)
+
+        www_homecore = self.root / 'www' / 'homecore'
+        if www_homecore.is_dir():
+            shutil.copytree(www_homecore, backup_root / 'www' / 'homecore', symlinks=True)
+
+        if self.manifest_file.is_file():
+            shutil.copy2(self.manifest_file, backup_root / 'core_manifest.json')
+
+        logger.info("hct-components", self.name, "Backup criado", {"backup_dir": str(backup_root)})
+
+    def apply(self, source_dir: Path, release: Dict[str, Any]) -> None:
+        if (source_dir / 'packages').is_dir():
+            self.updater.merge_tree(source_dir / 'packages', self.root / 'packages')
+
+        if (source_dir / 'www').is_dir():
+            self.updater.merge_tree(source_dir / 'www', self.root / 'www')
+
+        if (source_dir / 'core_manifest.json').is_file():
+            self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source_dir / 'core_manifest.json', self.manifest_file)
+
+
+class HCCComponent(ComponentHandler):
+    """Configuração do cliente HomeCore (antigo tools/hcc_update.sh)."""
+
+    name = "hcc"
+    title = "HomeCore Client"
+
+    def resolve_release(self) -> Optional[Dict[str, Any]]:
+        # Sempre a versão mais recente; HTTP 404 significa "sem atualização"
+        return {
+            "url": f"{self.updater.api_base}/hcc_update.php?client_id={self.updater.token}",
+            "version": None,
+            "checksum": None,
+            "headers": None
+        }
+
+    def backup(self) -> None:
+        source = self.config_dir / 'hc-tools'
+        if not source.is_dir():
+            return
+
+        target = self.config_dir / f"hc-tools_backup_{self.timestamp()}"
+        try:
+            shutil.copytree(source, target, symlinks=True)
+            logger.info("hct-components", self.name, "Backup criado", {"backup_dir": str(target)})
+        except (shutil.Error, OSError) as e:
+            logger.warning("hct-components", self.name, "Falha ao criar backup, continuando sem backup", {
+                "error": str(e)
+            })
+
+    def apply(self, source_dir: Path, release: Dict[str, Any]) -> None:
+        self.updater.merge_tree(source_dir, self.config_dir)
+        self.updater.record_integrity(source_dir, self.config_dir, self.name, {
+            "kind": "component",
+            "name": self.name
+        })
+
+
+class APIComponent(ComponentHandler):
+    """Integração custom_components/homecore (antigo tools/api_update.sh)."""
+
+    name = "api"
+    title = "HomeCore API"
+
+    @property
+    def target_dir(self) -> Path:
+        return Path(os.environ.get('TARGET_DIR', str(self.config_dir / 'custom_components' / 'homecore')))
+
+    @property
+    def backup_dir(self) -> Path:
+        return Path(os.environ.get('BACKUP_DIR', str(self.config_dir / 'homecore' / 'backups' / 'api')))
+
+    @classmethod
+    def token_files(cls, config_dir: Path) -> List[Path]:
+        return [Path(os.environ.get('HOMECORE_TOKEN_FILE', str(config_dir / 'homecore' / 'token')))]
+
+    def resolve_release(self) -> Optional[Dict[str, Any]]:
+        endpoint = os.environ.get('HOMECORE_SYNC_ENDPOINT', SYNC_ENDPOINT)
+        data = self.updater.http.get_json(f"{endpoint}?action=api_version",
+                                          headers=self.auth_headers(), timeout=30)
+
+        artifact = data.get('artifact_url') if isinstance(data, dict) else None
+        if not artifact:
+            raise ValueError("Endpoint não retornou artifact_url")
+
+        return {
+            "url": artifact,
+            "checksum": data.get('checksum') or None,
+            "version": data.get('api_version') or None,
+            "headers": self.auth_headers()
+        }
+
+    def backup(self) -> None:
+        if not self.target_dir.is_dir():
+            return
+
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        backup_file = self.backup_dir / f"homecore-api-{datetime.now().strftime('%Y%m%d%H%M%S')}.tar.gz"
+        with tarfile.open(backup_file, 'w:gz') as tar:
+            tar.add(self.target_dir, arcname=self.target_dir.name)
+
+        logger.info("hct-components", self.name, "Backup criado", {"backup_file": str(backup_file)})
+
+    def install(self, package_path: Path, release: Dict[str, Any]) -> None:
+        temp_dir, staging_dir = self.updater.extract_package(package_path)
+        try:
+            source_dir = temp_dir
+            for candidate in (temp_dir / 'custom_components' / 'homecore',
+                              staging_dir / 'custom_components' / 'homecore'):
+                if candidate.is_dir():
+                    source_dir = candidate
+                    break
+            self.apply(source_dir, release)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def apply(self, source_dir: Path, release: Dict[str, Any]) -> None:
+        if self.target_dir.exists():
+            shutil.rmtree(self.target_dir)
+        self.target_dir.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copytree(source_dir, self.target_dir, symlinks=True)
+
+
+class GitHubReleaseComponent(ComponentHandler):
+    """
+    Componente de terceiros publicado como asset de release no GitHub.
+
+    A última release é consultada com If-None-Match (ETag guardado em
+    $HCT_DATA_DIR/github_releases.json; respostas 304 não contam no limite
+    da API) e comparada com a versão instalada antes de qualquer download.
+    O asset passa pelo cache de pacotes do HCTUpdater.
+    """
+
+    requires_token = False
+    repo = ""
+    asset = ""
+    # Versão fixa via ambiente (ex.: MUSHROOM_VERSION); vazio = última release
+    version_env = ""
+
+    @property
+    def releases_file(self) -> Path:
+        return self.updater.data_dir / 'github_releases.json'
+
+    def load_releases(self) -> Dict[str, Any]:
+        return self.updater.load_json_file(self.releases_file) or {}
+
+    def save_releases(self, releases: Dict[str, Any]):
+        try:
+            self.releases_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.releases_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(releases, f, indent=2)
+            os.replace(tmp_path, self.releases_file)
+        except OSError as e:
+            logger.warning("hct-components", self.name, "Falha ao salvar cache de releases", {"error": str(e)})
+
+    def latest_release(self) -> Optional[Dict[str, Any]]:
+        """{"version", "url", "checksum"} da última release (None se indisponível)."""
+        releases = self.load_releases()
+        cached = releases.get(self.repo)
+        headers = {'Accept': 'application/vnd.github+json'}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+        try:
+            with self.updater.http.get(f"{GITHUB_API}/repos/{self.repo}/releases/latest",
+                                       headers=headers, timeout=30) as response:
+                if response.status == 304 and cached:
+                    logger.debug("hct-components", self.name, "Release inalterada (HTTP 304)")
+                    return cached['release']
+                data = response.json()
+                etag = response.headers.get('etag')
+        except Exception as e:
+            logger.warning("hct-components", self.name, "Falha ao consultar última release no GitHub", {
+                "repo": self.repo,
+                "error": str(e)
+            })
+            return cached['release'] if cached else None
+
+        asset = next((a for a in data.get('assets') or [] if a.get('name') == self.asset), None)
+        if not asset:
+            logger.warning("hct-components", self.name, f"Release sem o asset {self.asset}", {
+                "tag": data.get('tag_name')
+            })
+            return None
+
+        release = {
+            "version": data.get('tag_name'),
+            "url": asset.get('browser_download_url'),
+            # Assets recentes trazem "digest": "sha256:..."
+            "checksum": asset.get('digest') if str(asset.get('digest', '')).startswith('sha256:') else None
+        }
+        releases[self.repo] = {"etag": etag, "release": release}
+        self.save_releases(releases)
+        return release
+
+    def resolve_release(self) -> Optional[Dict[str, Any]]:
+        pinned = os.environ.get(self.version_env) if self.version_env else None
+        if pinned:
+            return {
+                "url": f"https://github.com/{self.repo}/releases/download/{pinned}/{self.asset}",
+                "version": pinned,
+                "checksum": None,
+                "headers": None
+            }
+
+        release = self.latest_release()
+        if release:
+            return dict(release, headers=None)
+
+        # GitHub indisponível: só instala se ainda não houver nada instalado
+        if self.installed_version():
+            return None
+        return {
+            "url": f"https://github.com/{self.repo}/releases/latest/download/{self.asset}",
+            "version": None,
+            "checksum": None,
+            "headers": None
+        }
+
+    @property
+    def version_file(self) -> Path:
+        raise NotImplementedError
+
+    def installed_version(self) -> Optional[str]:
+        try:
+            return self.version_file.read_text().strip() or None
+        except OSError:
+            return None
+
+    def record_version(self, release: Dict[str, Any]):
+        if release.get('version'):
+            self.version_file.parent.mkdir(parents=True, exist_ok=True)
+            self.version_file.write_text(f"{release['version']}\n")
+
+
+class HACSComponent(GitHubReleaseComponent):
+    """HACS (antigo tools/hacs_update.sh, sem o instalador `curl | bash`)."""
+
+    name = "hacs"
+    title = "HACS"
+    repo = "hacs/integration"
+    asset = "hacs.zip"
+
+    @property
+    def target_dir(self) -> Path:
+        return self.config_dir / 'custom_components' / 'hacs'
+
+    @property
+    def version_file(self) -> Path:
+        return self.target_dir / 'manifest.json'
+
+    def installed_version(self) -> Optional[str]:
+        # O manifest.json da integração traz a versão da release
+        manifest = self.updater.load_json_file(self.version_file)
+        version = manifest.get('version') if manifest else None
+        return str(version) if version else None
+
+    def install(self, package_path: Path, release: Dict[str, Any]) -> None:
+        temp_dir, staging_dir = self.updater.extract_package(package_path)
+        try:
+            if (staging_dir / 'hacs' / '__init__.py').is_file():
+                source_dir = staging_dir / 'hacs'
+            elif (staging_dir / '__init__.py').is_file():
+                source_dir = staging_dir
+            else:
+                raise ValueError("Estrutura do pacote do HACS não reconhecida")
+            self.apply(source_dir, release)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def apply(self, source_dir: Path, release: Dict[str, Any]) -> None:
+        # Substituição completa, como o instalador oficial (remove arquivos obsoletos)
+        if self.target_dir.exists():
+            shutil.rmtree(self.target_dir)
+        self.target_dir.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copytree(source_dir, self.target_dir, symlinks=True)
+
+
+class MushroomComponent(GitHubReleaseComponent):
+    """Lovelace Mushroom (antigo tools/mushroom_update.sh)."""
+
+    name = "mushroom"
+    title = "Lovelace Mushroom"
+    artifact_suffix = '.js'
+    repo = "piitaya/lovelace-mushroom"
+    asset = "mushroom.js"
+    version_env = "MUSHROOM_VERSION"
+
+    @property
+    def target_file(self) -> Path:
+        return self.config_dir / 'www' / 'lovelace-mushroom' / 'mushroom.js'
+
+    @property
+    def version_file(self) -> Path:
+        return self.target_file.parent / '.version'
+
+    def install(self, package_path: Path, release: Dict[str, Any]) -> None:
+        self.target_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_target = self.target_file.with_suffix('.tmp')
+        shutil.copyfile(package_path, tmp_target)
+        os.replace(tmp_target, self.target_file)
+        self.record_version(release)
+
+
+DEFAULT_COMPONENTS = [CoreComponent, HCCComponent, APIComponent, HACSComponent, MushroomComponent]
@@ -8,19 +8,27 @@ import os
 import sys
 import json
 import time
-import asyncio
 import signal
 import threading
-from pathlib import Path
-from typing import Optional
-from urllib.request import Request, urlopen
-from urllib.error import URLError
+from typing import Optional, TYPE_CHECKING
 
 # Importar módulos HCT
+# Updater, API (Flask) e runtime asyncio são importados sob demanda, após
+# obter o token; aqui fica só o necessário para os primeiros logs e requisições
 sys.path.insert(0, '/usr/bin')
-from hct_logger import get_logger
-from hct_updater import HCTUpdater
-from hct_api import init_api, run_api
+from hct_startup import profile
+
+with profile.importing("hct_logger"):
+    from hct_logger import get_logger
+with profile.importing("hct_http"):
+    from hct_http import get_http_client, HTTPStatusError
+with profile.importing("hct_schedule"):
+    from hct_schedule import MaintenanceWindow
+with profile.importing("hct_profiling"):
+    from hct_profiling import profiled
+
+if TYPE_CHECKING:
+    from hct_updater import HCTUpdater
 
 logger = get_logger("hct-daemon")
 
@@ -31,7 +39,7 @@ class HCTDaemon:
     def __init__(self):
         self.running = True
         self.token: Optional[str] = None
-        self.updater: Optional[HCTUpdater] = None
+        self.updater: Optional['HCTUpdater'] = None
         
         # Configurações do add-on
         self.log_level = os.environ.get('HCT_LOG_LEVEL', 'INFO')
@@ -40,8 +48,24 @@ class HCTDaemon:
         self.backup_before_update = os.environ.get('HCT_BACKUP_BEFORE_UPDATE', 'true').lower() == 'true'
         self.notify_on_update = os.environ.get('HCT_NOTIFY_ON_UPDATE', 'true').lower() == 'true'
         
-        # Supervisor token
+        # Janela de manutenção para download/backup/aplicação automáticos
+        try:
+            self.maintenance_window = MaintenanceWindow.from_env()
+        except ValueError as e:
+            logger.error("hct-daemon", "startup", "Janela de manutenção inválida, ignorando restrição", exception=e)
+            self.maintenance_window = MaintenanceWindow()
+        # Atualizações encontradas fora da janela: nova verificação quando abrir
+        self.deferred = False
+        
+        # Runtime: "threaded" (loop com sleep + Flask em thread) ou "asyncio" (hct_async)
+        self.runtime = os.environ.get('HCT_RUNTIME', 'threaded').lower()
+        self.api_host = '0.0.0.0'
+        self.api_port = 8099
+        
+        # Supervisor token e endpoints
         self.supervisor_token = os.environ.get('SUPERVISOR_TOKEN')
+        self.supervisor_url = os.environ.get('HCT_SUPERVISOR_URL', 'http://supervisor')
+        self.homeassistant_url = os.environ.get('HCT_HOMEASSISTANT_URL', 'http://homeassistant:8123')
         
         # Registrar handlers de sinal
         signal.signal(signal.SIGTERM, self.handle_shutdown)
@@ -62,33 +86,28 @@ class HCTDaemon:
         
         try:
             # Usar novo endpoint HTTP da integração
-            url = "http://homeassistant:8123/api/homecore/token"
-            request = Request(url)
-            request.add_header('Content-Type', 'application/json')
+            url = f"{self.homeassistant_url}/api/homecore/token"
+            data = get_http_client().get_json(url, headers={'Content-Type': 'application/json'}, timeout=10)
+            token = data.get('token')
             
-            with urlopen(request, timeout=10) as response:
-                if response.status == 200:
-                    data = json.loads(response.read().decode('utf-8'))
-                    token = data.get('token')
-                    
-                    if token:
-                        logger.success("hct-daemon", "get_token", "Token obtido com sucesso via API HTTP")
-                        # Logar informações adicionais (sem expor token)
-                        logger.debug("hct-daemon", "get_token", f"API URL: {data.get('api_url')}")
-                        logger.debug("hct-daemon", "get_token", f"Sync interval: {data.get('sync_interval')}s")
-                        return token
-                    else:
-                        logger.error("hct-daemon", "get_token", "Token não encontrado na resposta da API")
-                        return None
-                else:
-                    logger.error("hct-daemon", "get_token", f"HTTP {response.status}")
-                    return None
+            if token:
+                logger.success("hct-daemon", "get_token", "Token obtido com sucesso via API HTTP")
+                # Logar informações adicionais (sem expor token)
+                logger.debug("hct-daemon", "get_token", f"API URL: {data.get('api_url')}")
+                logger.debug("hct-daemon", "get_token", f"Sync interval: {data.get('sync_interval')}s")
+                return token
+            else:
+                logger.error("hct-daemon", "get_token", "Token não encontrado na resposta da API")
+                return None
         
-        except URLError as e:
-            if hasattr(e, 'code') and e.code == 404:
+        except HTTPStatusError as e:
+            if e.code == 404:
                 logger.error("hct-daemon", "get_token", "Integração HomeCore não instalada ou não configurada")
             else:
-                logger.error("hct-daemon", "get_token", "Erro de rede ao obter token", exception=e)
+                logger.error("hct-daemon", "get_token", f"HTTP {e.code}")
+            return None
+        except OSError as e:
+            logger.error("hct-daemon", "get_token", "Erro de rede ao obter token", exception=e)
             return None
         except Exception as e:
             logger.error("hct-daemon", "get_token", "Erro ao obter token", exception=e)
@@ -106,10 +125,11 @@ class HCTDaemon:
         logger.info("hct-daemon", "send_notification", f"Enviando notificação: {title}")
         
         try:
-            url = "http://supervisor/core/api/services/persistent_notification/create"
-            request = Request(url, method='POST')
-            request.add_header('Authorization', f'Bearer {self.supervisor_token}')
-            request.add_header('Content-Type', 'application/json')
+            url = f"{self.supervisor_url}/core/api/services/persistent_notification/create"
+            headers = {
+                'Authorization': f'Bearer {self.supervisor_token}',
+                'Content-Type': 'application/json'
+            }
             
             data = {
                 "title": title,
@@ -119,9 +139,10 @@ class HCTDaemon:
             if notification_id:
                 data["notification_id"] = notification_id
             
-            request.data = json.dumps(data).encode('utf-8')
+            body = json.dumps(data).encode('utf-8')
             
-            with urlopen(request, timeout=10) as response:
+            with get_http_client().request('POST', url, headers=headers, data=body, timeout=10) as response:
+                response.read()
                 if response.status in [200, 201]:
                     logger.success("hct-daemon", "send_notification", "Notificação enviada")
                 else:
@@ -130,6 +151,48 @@ class HCTDaemon:
         except Exception as e:
             logger.error("hct-daemon", "send_notification", "Erro ao enviar notificação", exception=e)
     
+    @staticmethod
+    def available_message(updates: list) -> str:
+        """Texto da notificação de atualizações disponíveis."""
+        update_list = "\n".join([
+            f"- {u['type']}: {u['current']} → {u['available']}"
+            for u in updates
+        ])
+        return f"Foram encontradas {len(updates)} atualização(ões):\n\n{update_list}"
+    
+    @staticmethod
+    def applied_message(success_count: int, failed_updates: list) -> str:
+        """Texto da notificação de atualizações aplicadas."""
+        message = f"{success_count} atualização(ões) aplicada(s) com sucesso."
+        
+        if failed_updates:
+            message += f"\n\nFalhas: {', '.join(failed_updates)}"
+        
+        message += "\n\n⚠️ Reinicie o Home Assistant para aplicar as configurações."
+        return message
+    
+    def started_message(self) -> str:
+        """Texto da notificação de inicialização."""
+        return (
+            f"O sistema de atualização automática está ativo.\n\n"
+            f"Verificações a cada {self.check_interval // 60} minutos.\n"
+            f"Auto-update: {'Habilitado' if self.auto_update else 'Desabilitado'}"
+        )
+    
+    def defer_outside_window(self) -> bool:
+        """
+        Adia o trabalho pesado (download, backup, aplicação) fora da janela de
+        manutenção. Retorna True se adiou; o agendador verifica de novo na abertura.
+        """
+        self.deferred = not self.maintenance_window.is_open()
+        if self.deferred:
+            logger.info("hct-daemon", "check_and_update", "Fora da janela de manutenção, atualizações adiadas", {
+                "window": str(self.maintenance_window),
+                "opens_in_s": round(self.maintenance_window.seconds_until_open())
+            })
+        return self.deferred
+    
+    @profiled("check_and_update")
     def check_and_update(self):
         """Verifica e aplica atualizações se disponíveis."""
         if not self.updater:
@@ -137,6 +200,7 @@ class HCTDaemon:
             return
         
         logger.info("hct-daemon", "check_and_update", "Verificando atualizações")
+        self.deferred = False
         
         try:
             # Verificar atualizações disponíveis
@@ -147,17 +211,15 @@ class HCTDaemon:
                 return
             
             # Notificar sobre atualizações disponíveis
-            update_list = "\n".join([
-                f"- {u['type']}: {u['current']} → {u['available']}"
-                for u in updates
-            ])
-            
             self.send_notification(
                 "Atualizações HomeCore Disponíveis",
-                f"Foram encontradas {len(updates)} atualização(ões):\n\n{update_list}",
+                self.available_message(updates),
                 "homecore_updates_available"
             )
             
+            if self.defer_outside_window():
+                return
+            
             # Aplicar atualizações se auto_update estiver habilitado
             if self.auto_update:
                 logger.info("hct-daemon", "check_and_update", f"Aplicando {len(updates)} atualização(ões)")
@@ -175,16 +237,9 @@ class HCTDaemon:
                 
                 # Notificar resultado
                 if success_count > 0:
-                    message = f"{success_count} atualização(ões) aplicada(s) com sucesso."
-                    
-                    if failed_updates:
-                        message += f"\n\nFalhas: {', '.join(failed_updates)}"
-                    
-                    message += "\n\n⚠️ Reinicie o Home Assistant para aplicar as configurações."
-                    
                     self.send_notification(
                         "Atualizações HomeCore Aplicadas",
-                        message,
+                        self.applied_message(success_count, failed_updates),
                         "homecore_updates_applied"
                     )
                 
@@ -194,6 +249,8 @@ class HCTDaemon:
                 })
             else:
                 logger.info("hct-daemon", "check_and_update", "Auto-update desabilitado, atualizações não aplicadas")
+                # Deixar pacotes baixados e verificados para a aplicação manual
+                self.updater.prefetcher.start(updates)
         
         except Exception as e:
             logger.error("hct-daemon", "check_and_update", "Erro durante verificação/atualização", exception=e)
@@ -203,11 +260,14 @@ class HCTDaemon:
         logger.info("hct-daemon", "startup", "HomeCore Tools Daemon iniciado", {
             "log_level": self.log_level,
             "check_interval": self.check_interval,
-            "auto_update": self.auto_update
+            "auto_update": self.auto_update,
+            "maintenance_window": str(self.maintenance_window),
+            "runtime": self.runtime
         })
         
         # Obter token da integração
-        self.token = self.get_homecore_token()
+        with profile.phase("token"):
+            self.token = self.get_homecore_token()
         
         if not self.token:
             logger.error("hct-daemon", "startup", "Não foi possível obter token da integração HomeCore")
@@ -231,30 +291,41 @@ class HCTDaemon:
                 return
         
         # Inicializar updater
-        self.updater = HCTUpdater(self.token)
+        with profile.phase("updater_init"):
+            with profile.importing("hct_updater"):
+                from hct_updater import HCTUpdater
+            self.updater = HCTUpdater(self.token)
         logger.info("hct-daemon", "startup", "Updater inicializado")
         
+        # Downloads e extrações interrompidos por crash/reinício
+        with profile.phase("staging_cleanup"):
+            self.updater.staging.prepare()
+        
         # Inicializar e iniciar servidor web (API/Dashboard)
         logger.info("hct-daemon", "startup", "Iniciando servidor web...")
-        init_api(self.token, self.updater)
-        
-        # Iniciar Flask em thread separada
-        api_thread = threading.Thread(target=run_api, args=('0.0.0.0', 8099), daemon=True)
-        api_thread.start()
-        logger.info("hct-daemon", "startup", "Servidor web iniciado na porta 8099")
+        with profile.phase("api_start"):
+            with profile.importing("hct_api"):
+                from hct_api import init_api, run_api
+            init_api(self.token, self.updater)
+            
+            # Iniciar Flask em thread separada
+            api_thread = threading.Thread(target=run_api, args=(self.api_host, self.api_port), daemon=True)
+            api_thread.start()
+        logger.info("hct-daemon", "startup", f"Servidor web iniciado na porta {self.api_port}")
         
         # Enviar notificação de inicialização
-        self.send_notification(
-            "HomeCore Tools Iniciado",
-            f"O sistema de atualização automática está ativo.\n\n"
-            f"Verificações a cada {self.check_interval // 60} minutos.\n"
-            f"Auto-update: {'Habilitado' if self.auto_update else 'Desabilitado'}",
-            "homecore_tools_started"
-        )
+        with profile.phase("startup_notification"):
+            self.send_notification(
+                "HomeCore Tools Iniciado",
+                self.started_message(),
+                "homecore_tools_started"
+            )
         
         # Primeira verificação imediata
         logger.info("hct-daemon", "startup", "Executando verificação inicial")
-        self.check_and_update()
+        with profile.phase("first_check"):
+            self.check_and_update()
+        profile.report(logger, runtime=self.runtime)
         
         # Loop principal
         last_check = time.time()
@@ -264,7 +335,10 @@ class HCTDaemon:
                 # Verificar se é hora de checar atualizações
                 current_time = time.time()
                 
-                if current_time - last_check >= self.check_interval:
+                # Fora do intervalo: verificar também quando a janela de manutenção abrir
+                window_opened = self.deferred and self.maintenance_window.is_open()
+                
+                if current_time - last_check >= self.check_interval or window_opened:
                     self.check_and_update()
                     last_check = current_time
                 
@@ -280,7 +354,15 @@ class HCTDaemon:
 
 def main():
     """Função principal."""
-    daemon = HCTDaemon()
+    if '--startup-profile' in sys.argv[1:]:
+        os.environ['HCT_STARTUP_PROFILE'] = 'true'
+    
+    if os.environ.get('HCT_RUNTIME', 'threaded').lower() == 'asyncio':
+        with profile.importing("hct_async"):
+            from hct_async import AsyncHCTDaemon
+        daemon = AsyncHCTDaemon()
+    else:
+        daemon = HCTDaemon()
     
     try:
         daemon.run()
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Handlers da API
+Lógica das rotas /api/* independente do servidor web (Flask ou aiohttp)
+
+Cada função retorna (payload, status_http); os servidores só serializam.
+Manter os formatos de resposta aqui garante o mesmo JSON nos dois runtimes.
+"""
+
+import os
+import sys
+import json
+import zlib
+import gzip
+import hashlib
+import functools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+from hct_metrics import registry as metrics
+
+logger = get_logger("hct-api")
+
+Payload = Tuple[Dict[str, Any], int]
+
+REQUEST_SECONDS = metrics.histogram(
+    "hct_api_request_duration_seconds", "Latência das requisições da API por rota",
+    ("method", "route", "status"))
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+JSON_CONTENT_TYPE = 'application/json'
+
+# Respostas menores que isso não compensam o gzip
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+# Registros por bloco em respostas JSON em streaming
+STREAM_BATCH = 100
+
+# Mesma serialização do jsonify do Flask (chaves ordenadas, compacto)
+dumps = functools.partial(json.dumps, sort_keys=True, separators=(',', ':'))
+
+# Estado global
+state = {
+    "token": None,
+    "updater": None,
+    "last_check": None,
+    "updates_available": [],
+    "integrity": None
+}
+
+
+# HTML do Dashboard
+DASHBOARD_HTML = """
+<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+    <meta charset="UTF-8">
+    <title>HomeCore Tools</title>
+    <style>
+        body {
+            margin: 0;
+            height: 100vh;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            flex-direction: column;
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
+            background: #f5f5f5;
+            color: #333;
+        }
+        .title {
+            font-size: 32px;
+            font-weight: 600;
+        }
+        .subtitle {
+            margin-top: 10px;
+            font-size: 14px;
+            opacity: 0.6;
+        }
+    </style>
+</head>
+<body>
+    <div class="title">HomeCore Tools</div>
+    <div class="subtitle">Funcionalidades exclusivas em breve</div>
+</body>
+</html>
+"""
+
+
+# ─── Serialização e compressão ────────────────────────────────────────────
+
+def encode_json(payload: Any) -> bytes:
+    """Corpo JSON idêntico ao do jsonify (inclusive a quebra de linha final)."""
+    return (dumps(payload) + "\n").encode('utf-8')
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Accept-Encoding aceita gzip (q > 0)?"""
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip().lower() not in ('gzip', '*'):
+            continue
+        params = params.replace(' ', '')
+        try:
+            return not (params.startswith('q=') and float(params[2:] or 0) == 0)
+        except ValueError:
+            return False
+    return False
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
+    """Comprime o corpo se o cliente aceitar e o tamanho compensar."""
+    headers = {'Vary': 'Accept-Encoding'}
+    if len(body) >= GZIP_MIN_BYTES and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Comprime um corpo em streaming (formato gzip, bloco a bloco)."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def json_array_chunks(key: str, items: Iterable[Any]) -> Iterator[bytes]:
+    """Serializa {key: [items...]} em blocos, sem montar a resposta inteira em memória."""
+    yield ('{' + dumps(key) + ':[').encode('utf-8')
+    batch = []
+    first = True
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= STREAM_BATCH:
+            yield (('' if first else ',') + ','.join(batch)).encode('utf-8')
+            first = False
+            batch = []
+    if batch:
+        yield (('' if first else ',') + ','.join(batch)).encode('utf-8')
+    yield b']}\n'
+
+
+class StaticAsset:
+    """Recurso estático pré-renderizado e pré-comprimido, com ETag."""
+
+    def __init__(self, content: str, content_type: str, cache_control: str = 'no-cache'):
+        self.body = content.encode('utf-8')
+        self.gzipped = gzip.compress(self.body, 9)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+        self.content_type = content_type
+        self.cache_control = cache_control
+
+    def respond(self, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Tuple[bytes, int, Dict[str, str]]:
+        """(corpo, status, headers); 304 sem corpo se o ETag do cliente ainda vale."""
+        headers = {
+            'ETag': self.etag,
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding'
+        }
+        tags = [t.strip().replace('W/', '', 1) for t in (if_none_match or '').split(',')]
+        if self.etag in tags or '*' in tags:
+            return b'', 304, headers
+
+        headers['Content-Type'] = self.content_type
+        if accepts_gzip(accept_encoding):
+            headers['Content-Encoding'] = 'gzip'
+            return self.gzipped, 200, headers
+        return self.body, 200, headers
+
+
+# Sem variáveis de template: renderizado e comprimido uma única vez
+DASHBOARD = StaticAsset(DASHBOARD_HTML, 'text/html; charset=utf-8')
+
+
+def init_state(token: Optional[str], updater) -> None:
+    """Registra token e updater usados pelas rotas."""
+    state["token"] = token
+    state["updater"] = updater
+    logger.info("hct-api", "init", "API inicializada")
+
+
+def status_payload() -> Payload:
+    """Status atual do sistema."""
+    return {
+        "token": state["token"] is not None,
+        "last_check": state.get("last_check"),
+        "auto_update": os.environ.get('HCT_AUTO_UPDATE', 'true').lower() == 'true',
+        "check_interval": int(os.environ.get('HCT_CHECK_INTERVAL', '3600')),
+        "maintenance_window": os.environ.get('HCT_MAINTENANCE_WINDOW', ''),
+        "download_rate_limit": int(os.environ.get('HCT_DOWNLOAD_RATE_LIMIT', '0') or 0),
+        "log_level": os.environ.get('HCT_LOG_LEVEL', 'INFO')
+    }, 200
+
+
+def manifests_payload() -> Payload:
+    """Atualizações disponíveis da última verificação."""
+    return {
+        "updates": state.get("updates_available", [])
+    }, 200
+
+
+def logs_payload(limit: int = 100) -> Payload:
+    """Logs recentes."""
+    try:
+        return {"logs": logger.get_recent_logs(limit=limit)}, 200
+    except Exception as e:
+        logger.error("hct-api", "api_logs", "Erro ao obter logs", exception=e)
+        return {"error": str(e)}, 500
+
+
+def logs_stream(limit: int = 100) -> Tuple[Optional[Iterator[bytes]], Optional[Payload]]:
+    """
+    Logs recentes como blocos JSON ({"logs": [...]}, mesmo formato de
+    logs_payload). A leitura do arquivo acontece aqui; o iterador só serializa.
+    """
+    try:
+        logs = logger.get_recent_logs(limit=limit)
+    except Exception as e:
+        logger.error("hct-api", "api_logs", "Erro ao obter logs", exception=e)
+        return None, ({"error": str(e)}, 500)
+    return json_array_chunks("logs", logs), None
+
+
+def inventory_payload() -> Payload:
+    """Inventário de placas MolSmart e histórico de mudanças."""
+    try:
+        from hct_molsmart import MolSmartInventory
+        return MolSmartInventory().to_dict(), 200
+    except Exception as e:
+        logger.error("hct-api", "molsmart_inventory", "Erro ao ler inventário", exception=e)
+        return {"error": str(e)}, 500
+
+
+def integrity_scanner():
+    """Scanner de integridade compartilhado (índice carregado uma vez)."""
+    if state["integrity"] is None:
+        from hct_integrity import IntegrityScanner
+        updater = state.get("updater")
+        if updater:
+            state["integrity"] = IntegrityScanner(updater.config_dir, updater.data_dir / 'integrity_index.json')
+        else:
+            state["integrity"] = IntegrityScanner()
+    return state["integrity"]
+
+
+def integrity_payload() -> Payload:
+    """Último relatório de integridade (sem varrer o disco)."""
+    try:
+        scanner = integrity_scanner()
+        return {
+            "report": scanner.last_report,
+            "sources": sorted(scanner.sources),
+            "tracked_files": len(scanner.files)
+        }, 200
+    except Exception as e:
+        logger.error("hct-api", "integrity", "Erro ao ler índice de integridade", exception=e)
+        return {"error": str(e)}, 500
+
+
+def integrity_scan_payload() -> Payload:
+    """Executa verificação incremental de integridade."""
+    try:
+        return {"success": True, "report": integrity_scanner().scan()}, 200
+    except Exception as e:
+        logger.error("hct-api", "integrity_scan", "Erro na verificação de integridade", exception=e)
+        return {"success": False, "error": str(e)}, 500
+
+
+def integrity_repair_payload(files: Optional[List[str]] = None) -> Payload:
+    """Repara somente os arquivos divergentes (ou a lista informada)."""
+    missing = updater_missing()
+    if missing:
+        return missing
+
+    try:
+        result = integrity_scanner().repair(state["updater"], files)
+        return dict(result, success=not result["failed"]), 200
+    except Exception as e:
+        logger.error("hct-api", "integrity_repair", "Erro no reparo de integridade", exception=e)
+        return {"success": False, "error": str(e)}, 500
+
+
+def updater_missing() -> Optional[Payload]:
+    """Erro padrão quando o updater ainda não foi inicializado."""
+    if not state.get("updater"):
+        return {"success": False, "error": "Updater não inicializado"}, 500
+    return None
+
+
+def record_check(updates: List[Dict[str, Any]]) -> Payload:
+    """Registra resultado de uma verificação feita pela API."""
+    state["updates_available"] = updates
+    state["last_check"] = json.dumps({"time": "now"})
+    return {
+        "success": True,
+        "updates": updates
+    }, 200
+
+
+def check_error(e: Exception) -> Payload:
+    logger.error("hct-api", "update_check", "Erro ao verificar atualizações", exception=e)
+    return {"success": False, "error": str(e)}, 500
+
+
+def check_payload() -> Payload:
+    """Verifica atualizações disponíveis (bloqueante)."""
+    missing = updater_missing()
+    if missing:
+        return missing
+
+    try:
+        logger.info("hct-api", "update_check", "Verificando atualizações via API")
+        return record_check(state["updater"].check_updates())
+    except Exception as e:
+        return check_error(e)
+
+
+def pending_updates() -> Tuple[List[Dict[str, Any]], Optional[Payload]]:
+    """Atualizações a aplicar, ou o erro a devolver se não houver."""
+    missing = updater_missing()
+    if missing:
+        return [], missing
+
+    updates = state.get("updates_available", [])
+    if not updates:
+        return [], ({"success": False, "error": "Nenhuma atualização disponível"}, 400)
+    return updates, None
+
+
+def staged_payload() -> Payload:
+    """Pacotes pré-baixados e verificados (auto_update desabilitado), cache e staging."""
+    missing = updater_missing()
+    if missing:
+        return missing
+    updater = state["updater"]
+    cache = updater.package_cache
+    return dict(
+        updater.prefetcher.status(),
+        cache=cache.usage() if cache else None,
+        staging=updater.staging.usage()
+    ), 200
+
+
+def plan_payload(fetch: bool = True) -> Payload:
+    """
+    Dry-run das atualizações pendentes. Sem suporte a HTTP Range no servidor,
+    fetch=True baixa o pacote (fica no cache para a aplicação).
+    """
+    missing = updater_missing()
+    if missing:
+        return missing
+    try:
+        plans = [state["updater"].plan_update(u, fetch=fetch) for u in state.get("updates_available", [])]
+        return {"success": True, "plans": plans}, 200
+    except Exception as e:
+        logger.error("hct-api", "update_plan", "Erro ao planejar atualizações", exception=e)
+        return {"success": False, "error": str(e)}, 500
+
+
+def apply_payload() -> Payload:
+    """Aplica atualizações disponíveis (bloqueante: downloads, backup e cópia)."""
+    updates, error = pending_updates()
+    if error:
+        return error
+
+    try:
+        logger.info("hct-api", "update_apply", f"Aplicando {len(updates)} atualização(ões) via API")
+
+        success_count = 0
+        failed_count = 0
+
+        for update in updates:
+            if state["updater"].update(update):
+                success_count += 1
+            else:
+                failed_count += 1
+
+        # Limpar lista de atualizações
+        state["updates_available"] = []
+
+        return {
+            "success": True,
+            "success_count": success_count,
+            "failed_count": failed_count
+        }, 200
+    except Exception as e:
+        logger.error("hct-api", "update_apply", "Erro ao aplicar atualizações", exception=e)
+        return {"success": False, "error": str(e)}, 500
+
+
+# ─── Administração: profiling ─────────────────────────────────────────────
+
+# Proxy de Ingress do Supervisor (painel restrito a administradores) e local
+ADMIN_SOURCES = ('172.30.32.2', '127.0.0.1', '::1')
+
+
+def admin_denied(remote_addr: Optional[str]) -> Optional[Payload]:
+    """Erro 403 se a requisição não veio do Ingress nem da própria máquina."""
+    if remote_addr in ADMIN_SOURCES:
+        return None
+    logger.warning("hct-api", "admin", "Acesso administrativo negado", {"remote": remote_addr})
+    return {"success": False, "error": "Acesso restrito a administradores (Ingress)"}, 403
+
+
+def profile_status_payload() -> Payload:
+    """Profiling armado e resultados salvos."""
+    from hct_profiling import profiler
+    return profiler.status(), 200
+
+
+def profile_arm_payload(body: Any) -> Payload:
+    """Arma o profiler ({"target", "seconds", "memory", "top"})."""
+    from hct_profiling import profiler
+    body = body if isinstance(body, dict) else {}
+    try:
+        armed = profiler.arm(
+            body.get('target', 'check_and_update'),
+            seconds=body.get('seconds'),
+            top=int(body.get('top', 30)),
+            memory=bool(body.get('memory', True))
+        )
+    except (ValueError, TypeError) as e:
+        return {"success": False, "error": str(e)}, 400
+    except RuntimeError as e:
+        return {"success": False, "error": str(e)}, 409
+    return {"success": True, "armed": armed}, 200
+
+
+def profile_disarm_payload() -> Payload:
+    """Desarma; uma sessão em execução é finalizada e salva."""
+    from hct_profiling import profiler
+    return {"success": True, "result": profiler.disarm()}, 200
+
+
+def profile_result(result_id: str, fmt: str = 'json') -> Tuple[Optional[str], Optional[Payload]]:
+    """Caminho do arquivo do resultado (json ou pstats), ou o erro a devolver."""
+    from hct_profiling import profiler
+    path = profiler.result_path(result_id, '.pstats' if fmt == 'pstats' else '.json')
+    if path is None:
+        return None, ({"success": False, "error": "Resultado não encontrado"}, 404)
+    return str(path), None
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Cliente HTTP
+Cliente HTTP com pool de conexões keep-alive, redirects e download em streaming
+"""
+
+import json
+import time
+import hashlib
+import threading
+import http.client
+from typing import Optional, Dict, Any, Callable, Iterator, BinaryIO
+from urllib.parse import urlsplit, urljoin
+
+USER_AGENT = 'HomeCore-Tools/1.0'
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# Erros típicos de conexão keep-alive encerrada pelo servidor
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class HTTPStatusError(Exception):
+    """Resposta HTTP com status de erro (>= 400)."""
+
+    def __init__(self, code: int, url: str, reason: str = ""):
+        super().__init__(f"HTTP {code} {reason}".strip())
+        self.code = code
+        self.url = url
+        self.reason = reason
+
+
+class DownloadCancelled(Exception):
+    """Download interrompido pelo evento `cancel` (ex.: pré-download preterido)."""
+
+
+class TokenBucket:
+    """
+    Limitador de banda (token bucket) compartilhado entre downloads.
+    
+    `rate` em bytes/s; `burst` é o máximo acumulado quando ocioso (padrão:
+    1 s de tráfego). consume() pode deixar o balde negativo, de modo que
+    blocos maiores que o burst também são atendidos na taxa média.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int):
+        """Debita `amount` bytes, aguardando o necessário para respeitar a taxa."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HTTPResponse:
+    """Resposta HTTP; devolve a conexão ao pool quando lida por completo."""
+
+    def __init__(self, client: 'HTTPClient', key: tuple, conn, raw: http.client.HTTPResponse, url: str):
+        self._client = client
+        self._key = key
+        self._conn = conn
+        self._raw = raw
+        self.url = url
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = {k.lower(): v for k, v in raw.getheaders()}
+
+    @property
+    def content_length(self) -> Optional[int]:
+        value = self.headers.get('content-length')
+        return int(value) if value and value.isdigit() else None
+
+    def read(self, amt: int = None) -> bytes:
+        data = self._raw.read(amt)
+        if amt is None:
+            self.close()
+        return data
+
+    def iter_chunks(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Itera o corpo em blocos (sem carregar tudo em memória)."""
+        try:
+            while True:
+                chunk = self._raw.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def json(self) -> Any:
+        return json.loads(self.read().decode('utf-8'))
+
+    def close(self):
+        if self._conn is None:
+            return
+        reusable = self._raw.isclosed() and not self._raw.will_close
+        if not reusable:
+            self._raw.close()
+        self._client._release(self._key, self._conn, reusable)
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HTTPClient:
+    """Cliente HTTP compartilhado, thread-safe, com conexões persistentes por host."""
+
+    def __init__(self, user_agent: str = USER_AGENT, max_idle_per_host: int = 4, verify: bool = True):
+        self.user_agent = user_agent
+        self.max_idle_per_host = max_idle_per_host
+        self.verify = verify
+        self._ssl_context = None
+        self._idle: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key: tuple, timeout: float):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                conn.timeout = timeout
+                return conn, True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=self.ssl_context())
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        return conn, False
+
+    def ssl_context(self):
+        """Contexto TLS criado no primeiro HTTPS (carregar CAs é caro em ARM)."""
+        if self._ssl_context is None:
+            import ssl
+            self._ssl_context = ssl.create_default_context() if self.verify else ssl._create_unverified_context()
+        return self._ssl_context
+    
+    def _release(self, key: tuple, conn, reusable: bool):
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def close(self):
+        """Fecha todas as conexões ociosas do pool."""
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes], timeout: float) -> HTTPResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        for attempt in (1, 2):
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                raw = conn.getresponse()
+                return HTTPResponse(self, key, conn, raw, url)
+            except _STALE_ERRORS:
+                conn.close()
+                # Conexão reaproveitada foi encerrada pelo servidor: tentar uma nova
+                if reused and attempt == 1:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str] = None,
+        data: bytes = None,
+        timeout: float = 30,
+        raise_for_status: bool = True,
+        max_redirects: int = 5
+    ) -> HTTPResponse:
+        """Executa requisição seguindo redirects; levanta HTTPStatusError se status >= 400."""
+        request_headers = {'User-Agent': self.user_agent, 'Accept-Encoding': 'identity'}
+        request_headers.update(headers or {})
+
+        for _ in range(max_redirects + 1):
+            response = self._send(method, url, request_headers, data, timeout)
+
+            location = response.headers.get('location')
+            if response.status in REDIRECT_CODES and location:
+                response.read()
+                next_url = urljoin(url, location)
+                # Não repassar credenciais para outro host (ex.: CDN do GitHub)
+                if urlsplit(next_url).hostname != urlsplit(url).hostname:
+                    request_headers.pop('Authorization', None)
+                if response.status == 303:
+                    method, data = 'GET', None
+                url = next_url
+                continue
+
+            if raise_for_status and response.status >= 400:
+                response.read()
+                raise HTTPStatusError(response.status, url, response.reason)
+            return response
+
+        raise HTTPStatusError(310, url, "Too many redirects")
+
+    def get(self, url: str, headers: Dict[str, str] = None, timeout: float = 30, **kwargs) -> HTTPResponse:
+        return self.request('GET', url, headers=headers, timeout=timeout, **kwargs)
+
+    def get_json(self, url: str, headers: Dict[str, str] = None, timeout: float = 30) -> Any:
+        with self.get(url, headers=headers, timeout=timeout) as response:
+            return response.json()
+
+    def download(
+        self,
+        url: str,
+        fileobj: BinaryIO,
+        headers: Dict[str, str] = None,
+        timeout: float = 300,
+        chunk_size: int = 64 * 1024,
+        progress: Callable[[int], None] = None,
+        limiter: TokenBucket = None,
+        cancel: threading.Event = None
+    ) -> Dict[str, Any]:
+        """
+        Baixa `url` em streaming para `fileobj`, calculando o SHA-256 durante
+        a transferência (evita reler o arquivo para verificar o checksum).
+        
+        `timeout` é de inatividade do socket (cada leitura), não do download
+        inteiro: uma transferência lenta que progride não é interrompida. Com
+        `limiter`, as esperas da limitação ocorrem entre leituras e os blocos
+        são de no máximo ~1 s de tráfego, então não contam para o timeout.
+        Com `cancel` definido, o download para no próximo bloco (DownloadCancelled).
+        """
+        sha256 = hashlib.sha256()
+        size = 0
+        if limiter:
+            chunk_size = max(1024, min(chunk_size, int(limiter.rate)))
+
+        with self.get(url, headers=headers, timeout=timeout) as response:
+            for chunk in response.iter_chunks(chunk_size):
+                if cancel is not None and cancel.is_set():
+                    raise DownloadCancelled(url)
+                if limiter:
+                    limiter.consume(len(chunk))
+                fileobj.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+                if progress:
+                    progress(len(chunk))
+
+            expected = response.content_length
+            headers_out = response.headers
+            status = response.status
+
+        if expected is not None and size != expected:
+            raise IOError(f"Download incompleto: {size} de {expected} bytes")
+
+        return {"status": status, "size": size, "sha256": sha256.hexdigest(), "headers": headers_out}
+
+
+# Cliente compartilhado
+_client_instance = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Obtém instância compartilhada do cliente HTTP."""
+    global _client_instance
+    with _client_lock:
+        if _client_instance is None:
+            _client_instance = HTTPClient()
+        return _client_instance
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Integridade dos Arquivos Instalados
+Índice persistente (caminho, tamanho, mtime, SHA-256) de /config/hc-tools,
+/config/packages e /config/www/homecore, com detecção de divergências e
+reparo seletivo apenas dos arquivos afetados
+
+Só arquivos cujo stat (tamanho/mtime) mudou são lidos novamente; o hash roda
+em paralelo (hashlib libera o GIL) com número limitado de workers.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import zipfile
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+
+logger = get_logger("hct-integrity")
+
+# Raízes monitoradas, relativas a HCT_CONFIG_DIR
+MONITORED_ROOTS = ('hc-tools', 'packages', 'www/homecore')
+# Diretórios com conteúdo volátil (não fazem parte da instalação); manifest_files
+# é estado do próprio updater, regravado a cada atualização
+EXCLUDED_DIRS = {'logs', 'backups', '__pycache__', 'manifest_files'}
+INDEX_VERSION = 1
+REPORT_LIST_LIMIT = 200
+CHUNK_SIZE = 1024 * 1024
+
+_scan_lock = threading.Lock()
+
+
+def utc_timestamp() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def file_sha256(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def default_workers() -> int:
+    return max(1, int(os.environ.get('HCT_INTEGRITY_WORKERS', min(4, os.cpu_count() or 1))))
+
+
+def package_members(zf: zipfile.ZipFile) -> Dict[str, zipfile.ZipInfo]:
+    """
+    Arquivos do pacote por caminho relativo, removendo o diretório raiz único
+    (mesma regra de HCTUpdater.extract_package).
+    """
+    files = [info for info in zf.infolist() if not info.is_dir()]
+    tops = {info.filename.split('/', 1)[0] for info in zf.infolist()}
+    strip = ""
+    if len(tops) == 1 and all('/' in info.filename for info in files):
+        strip = tops.pop() + '/'
+    return {info.filename[len(strip):]: info for info in files if info.filename.startswith(strip)}
+
+
+class IntegrityScanner:
+    """Índice de integridade e scan/reparo incremental."""
+
+    def __init__(self, config_dir: Path = None, index_path: Path = None, workers: int = None):
+        data_dir = Path(os.environ.get('HCT_DATA_DIR', '/data'))
+        self.config_dir = Path(config_dir or os.environ.get('HCT_CONFIG_DIR', '/config'))
+        self.path = Path(index_path) if index_path else data_dir / 'integrity_index.json'
+        self.workers = workers or default_workers()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.load()
+
+    # ─── Persistência ─────────────────────────────────────────────────────
+
+    def load(self):
+        """Carrega índice do disco (vazio se inexistente, corrompido ou de outra versão)."""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return
+            # Entradas fora das raízes monitoradas (índices de versões anteriores)
+            self.files = {rel: entry for rel, entry in data.get('files', {}).items() if self.is_monitored(rel)}
+            self.sources = data.get('sources', {})
+            self.last_report = data.get('last_report')
+        except Exception as e:
+            logger.warning("hct-integrity", "index", "Índice ilegível, iniciando vazio", {
+                "path": str(self.path),
+                "error": str(e)
+            })
+            self.files, self.sources, self.last_report = {}, {}, None
+
+    def save(self):
+        """Grava índice de forma atômica."""
+        data = {
+            "version": INDEX_VERSION,
+            "updated_at": utc_timestamp(),
+            "sources": self.sources,
+            "last_report": self.last_report,
+            "files": self.files
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    # ─── Varredura ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def is_monitored(rel_path: str) -> bool:
+        parts = rel_path.split('/')
+        if any(part in EXCLUDED_DIRS for part in parts[:-1]):
+            return False
+        return any(rel_path.startswith(root + '/') for root in MONITORED_ROOTS)
+
+    def walk(self) -> Iterable[Tuple[str, os.stat_result]]:
+        """Arquivos regulares das raízes monitoradas (caminho relativo, stat)."""
+        for root in MONITORED_ROOTS:
+            stack = [self.config_dir / root]
+            while stack:
+                directory = stack.pop()
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError:
+                    continue
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in EXCLUDED_DIRS:
+                            stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        rel = Path(entry.path).relative_to(self.config_dir).as_posix()
+                        yield rel, entry.stat(follow_symlinks=False)
+
+    def hash_many(self, paths: List[Path]) -> Dict[Path, Optional[str]]:
+        """Calcula SHA-256 em paralelo (None se o arquivo sumiu/ilegível)."""
+        def safe_hash(path):
+            try:
+                return file_sha256(path)
+            except OSError:
+                return None
+
+        if len(paths) <= 1 or self.workers == 1:
+            return {path: safe_hash(path) for path in paths}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hct-hash") as executor:
+            return dict(zip(paths, executor.map(safe_hash, paths)))
+
+    def scan(self) -> Dict[str, Any]:
+        """
+        Compara os arquivos com o índice e devolve o relatório de divergências.
+
+        Arquivos sem baseline (instalados antes do índice existir) são
+        adotados com o hash atual e listados em "new".
+        """
+        with _scan_lock:
+            started = time.perf_counter()
+            seen = set()
+            to_hash: Dict[str, os.stat_result] = {}
+
+            for rel, st in self.walk():
+                seen.add(rel)
+                entry = self.files.get(rel)
+                if entry and entry.get('sha256') and entry.get('size') == st.st_size \
+                        and entry.get('mtime_ns') == st.st_mtime_ns:
+                    continue
+                to_hash[rel] = st
+
+            hashes = self.hash_many([self.config_dir / rel for rel in to_hash])
+
+            new, modified, missing = [], [], []
+            for rel, st in to_hash.items():
+                digest = hashes[self.config_dir / rel]
+                if digest is None:
+                    seen.discard(rel)
+                    continue
+                entry = self.files.get(rel)
+                if entry is None:
+                    entry = self.files[rel] = {"expected": digest, "source": None}
+                    new.append(rel)
+                entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=digest)
+
+            for rel, entry in self.files.items():
+                if rel not in seen:
+                    missing.append(rel)
+                elif entry.get('sha256') != entry.get('expected'):
+                    modified.append(rel)
+
+            report = {
+                "scanned_at": utc_timestamp(),
+                "files": len(seen),
+                "rehashed": len(to_hash),
+                "cached": len(seen) - len(to_hash),
+                "counts": {"modified": len(modified), "missing": len(missing), "new": len(new)},
+                "modified": sorted(modified)[:REPORT_LIST_LIMIT],
+                "missing": sorted(missing)[:REPORT_LIST_LIMIT],
+                "new": sorted(new)[:REPORT_LIST_LIMIT],
+                "repairable": sum(1 for rel in modified + missing if self.files[rel].get('source') in self.sources),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+            self.last_report = report
+            self.save()
+
+        level = logger.warning if modified or missing else logger.info
+        level("hct-integrity", "scan", "Verificação de integridade concluída", {
+            k: report[k] for k in ("files", "rehashed", "counts", "duration_ms")
+        })
+        return report
+
+    # ─── Baseline ─────────────────────────────────────────────────────────
+
+    def record_install(self, source_dir: Path, target_dir: Path, source: str, origin: Dict[str, Any]):
+        """
+        Registra como esperado o conteúdo recém-instalado de source_dir em target_dir.
+
+        `origin` descreve como obter o pacote novamente para reparo:
+        {"kind": "manifest", "manifest": {...}} ou {"kind": "component", "name": "..."}.
+        """
+        source_dir, target_dir = Path(source_dir), Path(target_dir)
+        try:
+            prefix = target_dir.resolve().relative_to(self.config_dir.resolve()).as_posix()
+        except ValueError:
+            return
+        prefix = "" if prefix == "." else prefix + "/"
+
+        staged = {}
+        for path in source_dir.rglob('*'):
+            if path.is_file() and not path.is_symlink():
+                rel = prefix + path.relative_to(source_dir).as_posix()
+                if self.is_monitored(rel):
+                    staged[rel] = path
+        if not staged:
+            return
+
+        hashes = self.hash_many(list(staged.values()))
+        with _scan_lock:
+            for rel, path in staged.items():
+                digest = hashes[path]
+                if digest is None:
+                    continue
+                entry = {"expected": digest, "sha256": digest, "source": source, "package_path": rel[len(prefix):]}
+                try:
+                    st = (self.config_dir / rel).stat()
+                    entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+                except OSError:
+                    entry["sha256"] = None
+                self.files[rel] = entry
+            self.sources[source] = dict(origin, prefix=prefix, recorded_at=utc_timestamp())
+            self.save()
+
+        logger.info("hct-integrity", "record_install", f"Baseline registrada: {source}", {
+            "files": len(staged)
+        })
+
+    # ─── Reparo ───────────────────────────────────────────────────────────
+
+    def broken_files(self) -> Dict[str, List[str]]:
+        """Arquivos divergentes (modificados ou ausentes) agrupados por origem."""
+        groups: Dict[str, List[str]] = {}
+        for rel, entry in self.files.items():
+            path = self.config_dir / rel
+            if path.exists() and entry.get('sha256') == entry.get('expected'):
+                continue
+            groups.setdefault(entry.get('source') or "", []).append(rel)
+        return groups
+
+    def _write_file(self, rel: str, data: bytes, mode: int = 0):
+        target = self.config_dir / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f".{target.name}.hct_repair")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        if mode:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target)
+        st = target.stat()
+        self.files[rel].update(size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=self.files[rel]['expected'])
+
+    def _fetch_package(self, updater, origin: Dict[str, Any]) -> Optional[Path]:
+        if origin.get('kind') == 'manifest':
+            return updater.download_package(origin['manifest'])
+        if origin.get('kind') == 'component':
+            if not updater.components:
+                updater.load_default_components()
+            handler = updater.components.get(origin.get('name'))
+            release = handler.resolve_release() if handler else None
+            if not release:
+                return None
+            return updater.download_file(release['url'], headers=release.get('headers'), suffix=handler.artifact_suffix,
+                                         checksum=release.get('checksum'))
+        return None
+
+    def _repair_per_file(self, updater, files_url: str, files: List[str]) -> Tuple[List[str], List[str]]:
+        """Baixa somente os arquivos quebrados (manifest com `files_url`)."""
+        repaired, failed = [], []
+        for rel in files:
+            entry = self.files[rel]
+            url = f"{files_url.rstrip('/')}/{entry.get('package_path', rel)}"
+            try:
+                with updater.http.get(url, timeout=60) as response:
+                    data = response.read()
+                if hashlib.sha256(data).hexdigest() != entry['expected']:
+                    raise ValueError("hash diferente do instalado")
+                self._write_file(rel, data)
+                repaired.append(rel)
+            except Exception as e:
+                logger.warning("hct-integrity", "repair", f"Falha ao reparar {rel}", {"error": str(e)})
+                failed.append(rel)
+        return repaired, failed
+
+    def _repair_from_package(self, package_path: Path, files: List[str]) -> Tuple[List[str], List[str]]:
+        """Extrai do pacote apenas os membros correspondentes aos arquivos quebrados."""
+        repaired, failed = [], []
+        with zipfile.ZipFile(package_path) as zf:
+            members = package_members(zf)
+            for rel in files:
+                entry = self.files[rel]
+                info = members.get(entry.get('package_path', rel))
+                if info is None:
+                    failed.append(rel)
+                    continue
+                data = zf.read(info)
+                # Pacote de outra versão: não sobrescrever com conteúdo diferente do instalado
+                if hashlib.sha256(data).hexdigest() != entry['expected']:
+                    failed.append(rel)
+                    continue
+                self._write_file(rel, data, (info.external_attr >> 16) & 0o777)
+                repaired.append(rel)
+        return repaired, failed
+
+    def repair(self, updater, files: Iterable[str] = None) -> Dict[str, Any]:
+        """
+        Restaura os arquivos divergentes (ou apenas `files`) a partir da origem
+        registrada na instalação. Baixa por arquivo quando o manifest tem
+        `files_url`; senão baixa o pacote uma vez e extrai só os afetados.
+        """
+        started = time.perf_counter()
+        self.scan()
+        groups = self.broken_files()
+        if files is not None:
+            wanted = set(files)
+            groups = {src: [f for f in rels if f in wanted] for src, rels in groups.items()}
+
+        result = {"repaired": [], "failed": [], "unrepairable": []}
+        for source, rels in groups.items():
+            if not rels:
+                continue
+            origin = self.sources.get(source)
+            if not origin:
+                result["unrepairable"].extend(rels)
+                continue
+
+            logger.info("hct-integrity", "repair", f"Reparando {len(rels)} arquivo(s) de {source}")
+            manifest = origin.get('manifest') or {}
+            if manifest.get('files_url'):
+                repaired, failed = self._repair_per_file(updater, manifest['files_url'], rels)
+            else:
+                package_path = self._fetch_package(updater, origin)
+                if not package_path:
+                    result["failed"].extend(rels)
+                    continue
+                try:
+                    checksum = manifest.get('checksum')
+                    if checksum and not updater.verify_checksum(package_path, checksum):
+                        result["failed"].extend(rels)
+                        continue
+                    repaired, failed = self._repair_from_package(package_path, rels)
+                finally:
+                    updater.discard_package(package_path)
+            result["repaired"].extend(repaired)
+            result["failed"].extend(failed)
+
+        with _scan_lock:
+            self.save()
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        logger.info("hct-integrity", "repair", "Reparo concluído", {
+            "repaired": len(result["repaired"]),
+            "failed": len(result["failed"]),
+            "unrepairable": len(result["unrepairable"])
+        })
+        return result
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Integridade dos arquivos HomeCore instalados")
+    parser.add_argument('command', choices=['scan', 'report', 'repair'])
+    parser.add_argument('--token', default=os.environ.get('HOMECORE_TOKEN'), help="Token HomeCore (repair)")
+    parser.add_argument('--workers', type=int, default=None, help="Workers de hash (padrão: min(4, CPUs))")
+    args = parser.parse_args(argv)
+
+    scanner = IntegrityScanner(workers=args.workers)
+    if args.command == 'scan':
+        result = scanner.scan()
+    elif args.command == 'report':
+        result = scanner.last_report or {}
+    else:
+        from hct_updater import HCTUpdater
+        result = scanner.repair(HCTUpdater(args.token or ""))
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,57 +2,306 @@
 """
 HomeCore Tools - Sistema de Logs
 Gerenciamento de logs estruturados em JSON com rotação automática
+
+Cada módulo obtém seu logger com get_logger(nome); todos escrevem pelo mesmo
+LogWriter ($HCT_DATA_DIR/logs/hct.json.log + console). O writer agrupa
+avisos e erros idênticos (mesma mensagem e detalhes, fora contadores de
+tentativa e tempos) que chegam a menos de HCT_LOG_DEDUP_WINDOW segundos um
+do outro: o primeiro é escrito e um registro com "repeated" informa depois
+quantos foram omitidos. Ações DEBUG de alto volume podem ser amostradas (HCT_LOG_DEBUG_SAMPLING, ex.: "hct-molsmart.dedup=10,*=2":
+1 a cada N registros, marcados com "sampled").
 """
 
 import os
 import sys
 import json
+import time
+import atexit
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Dict, Tuple, List
 from logging.handlers import RotatingFileHandler
 
+from hct_metrics import registry as metrics
 
-class HCTLogger:
-    """Sistema de logs estruturados para HomeCore Tools."""
-    
-    def __init__(self, name: str = "hct", log_dir: str = "/data/logs"):
+LOG_WRITE_SECONDS = metrics.histogram(
+    "hct_log_write_seconds", "Latência de escrita de registros de log",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1))
+LOG_SUPPRESSED = metrics.counter(
+    "hct_log_suppressed_total", "Registros de log omitidos (repetidos ou amostrados)", labels=("reason",))
+
+_configure_lock = threading.Lock()
+
+# Nome do arquivo compartilhado pelos loggers de get_logger
+SHARED_LOG_NAME = "hct"
+
+# Janela de repetidos (segundos): padrão e limite, independentes do check_interval
+DEFAULT_DEDUP_WINDOW = 300.0
+MAX_DEDUP_WINDOW = 600.0
+
+# Detalhes que mudam a cada repetição e não distinguem registros
+VOLATILE_DETAILS = frozenset({'attempt', 'attempts', 'timestamp', 'generated_at', 'duration_ms', 'elapsed_ms'})
+
+# Só avisos e erros são agrupados (DEBUG de alto volume usa amostragem)
+DEDUP_MIN_LEVEL = logging.WARNING
+
+# Registros distintos acompanhados ao mesmo tempo pela supressão de repetidos
+MAX_TRACKED = 512
+
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    """"componente.ação=N,componente=N,*=N" -> {chave: N} (N >= 1)."""
+    rules = {}
+    for item in (spec or '').split(','):
+        key, _, rate = item.strip().partition('=')
+        try:
+            rate = int(rate)
+        except ValueError:
+            continue
+        if key and rate >= 1:
+            rules[key.strip()] = rate
+    return rules
+
+
+class DuplicateSuppressor:
+    """
+    Repetições de um registro (mesmo nível, componente, ação, mensagem e
+    detalhes, exceto VOLATILE_DETAILS como o número da tentativa): o primeiro
+    passa e os seguintes são contados enquanto chegarem a menos de `window` segundos um
+    do outro. A contagem sai num resumo quando as repetições param ou, se
+    continuarem, a cada `window` segundos.
+    """
+
+    def __init__(self, window: float, max_tracked: int = MAX_TRACKED):
+        self.window = window
+        self.max_tracked = max_tracked
+        # chave -> [última ocorrência, próximo resumo, omitidos, primeiro omitido (ISO), último registro]
+        self.tracked: Dict[tuple, list] = {}
+        self._next_sweep = 0.0
+
+    def check(self, key: tuple, record: tuple, now: float) -> Tuple[bool, List[tuple]]:
+        """(escrever?, resumos prontos)."""
+        summaries = self.poll(now)
+
+        state = self.tracked.get(key)
+        if state is not None and now - state[0] < self.window:
+            state[0] = now
+            if state[2] == 0:
+                state[3] = utc_timestamp()
+            state[2] += 1
+            state[4] = record
+            return False, summaries
+
+        if state is not None:
+            summaries.extend(self._summaries([self.tracked.pop(key)]))
+        elif len(self.tracked) >= self.max_tracked:
+            oldest = next(iter(self.tracked))
+            summaries.extend(self._summaries([self.tracked.pop(oldest)]))
+        self.tracked[key] = [now, now + self.window, 0, None, record]
+        return True, summaries
+
+    def poll(self, now: float) -> List[tuple]:
+        """Resumos prontos (varredura no máximo uma vez por segundo)."""
+        return self.sweep(now) if now >= self._next_sweep else []
+
+    def sweep(self, now: float) -> List[tuple]:
+        self._next_sweep = now + min(1.0, self.window)
+        ready = []
+        for key, state in list(self.tracked.items()):
+            if now - state[0] >= self.window:
+                # Repetições pararam
+                ready.append(self.tracked.pop(key))
+            elif state[2] and now >= state[1]:
+                # Ainda repetindo: resumo parcial e nova contagem
+                ready.append(list(state))
+                state[1], state[2], state[3] = now + self.window, 0, None
+        return self._summaries(ready)
+
+    def flush(self) -> List[tuple]:
+        states = list(self.tracked.values())
+        self.tracked.clear()
+        return self._summaries(states)
+
+    @staticmethod
+    def _summaries(states: List[list]) -> List[tuple]:
+        return [(state[4], state[2], state[3]) for state in states if state[2]]
+
+
+def default_dedup_window() -> float:
+    """HCT_LOG_DEDUP_WINDOW (padrão 300 s), limitada a MAX_DEDUP_WINDOW."""
+    try:
+        window = float(os.environ.get('HCT_LOG_DEDUP_WINDOW') or DEFAULT_DEDUP_WINDOW)
+    except ValueError:
+        return DEFAULT_DEDUP_WINDOW
+    return min(window, MAX_DEDUP_WINDOW)
+
+
+def dedup_key(levelno: int, entry: dict, message: str) -> tuple:
+    """Identidade de um registro para a supressão de repetidos."""
+    details = {k: v for k, v in entry["details"].items() if k not in VOLATILE_DETAILS}
+    return (levelno, entry["status"], entry["component"], entry["action"], message,
+            json.dumps(details, sort_keys=True, default=str))
+
+
+class LogWriter:
+    """Destino compartilhado: arquivo JSON rotativo e console (stderr)."""
+
+    def __init__(self, name: str = SHARED_LOG_NAME, log_dir: str = None, console: bool = True, level: str = None):
         self.name = name
+        self.level = level
+        if log_dir is None:
+            data_dir = os.environ.get('HCT_DATA_DIR', '/data')
+            log_dir = os.environ.get('HCT_LOG_DIR', os.path.join(data_dir, 'logs'))
         self.log_dir = Path(log_dir)
-        
-        # Configurar logger Python padrão
+        self.log_file = self.log_dir / f"{name}.json.log"
+        self.console_enabled = console
+
+        # JSON vai só para o arquivo; a linha legível só para o console
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(self._get_log_level())
-        
-        # Tentar criar diretório e adicionar handler de arquivo
-        # Se falhar, apenas usar console
-        try:
-            self.log_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Handler para arquivo JSON
-            json_log_file = self.log_dir / f"{name}.json.log"
-            json_handler = RotatingFileHandler(
-                json_log_file,
-                maxBytes=10 * 1024 * 1024,  # 10 MB
-                backupCount=5
-            )
-            json_handler.setFormatter(logging.Formatter('%(message)s'))
-            self.logger.addHandler(json_handler)
-        except (PermissionError, OSError) as e:
-            # Se não conseguir criar arquivo de log, apenas usar console
-            print(f"[WARNING] Não foi possível criar arquivo de log: {e}", file=sys.stderr)
-        
-        # Handler para console (compatível com HA) - sempre adicionar
-        console_handler = logging.StreamHandler(sys.stderr)
-        console_handler.setFormatter(
-            logging.Formatter('[%(levelname)s] %(message)s')
-        )
-        self.logger.addHandler(console_handler)
-    
+        self.logger.propagate = False
+        self.console = logging.getLogger(f"{name}.console")
+        self.console.propagate = False
+
+        window = default_dedup_window()
+        self.suppressor = DuplicateSuppressor(window) if window > 0 else None
+        self.sampling = parse_sampling(os.environ.get('HCT_LOG_DEBUG_SAMPLING', ''))
+        self._sample_counts: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+        # Diretório e handlers são criados no primeiro registro (sem efeitos no import)
+        self._configured = False
+
+    def _configure(self):
+        """Configura loggers Python padrão: arquivo JSON rotativo + console."""
+        with _configure_lock:
+            if self._configured:
+                return
+
+            level = self._get_log_level()
+            self.logger.setLevel(level)
+            self.console.setLevel(level)
+
+            # Tentar criar diretório e adicionar handler de arquivo
+            # Se falhar, apenas usar console
+            try:
+                self.log_dir.mkdir(parents=True, exist_ok=True)
+
+                # Handler para arquivo JSON
+                json_handler = RotatingFileHandler(
+                    self.log_file,
+                    maxBytes=10 * 1024 * 1024,  # 10 MB
+                    backupCount=5
+                )
+                json_handler.setFormatter(logging.Formatter('%(message)s'))
+                self.logger.addHandler(json_handler)
+            except (PermissionError, OSError) as e:
+                # Se não conseguir criar arquivo de log, apenas usar console
+                print(f"[WARNING] Não foi possível criar arquivo de log: {e}", file=sys.stderr)
+
+            # Handler para console (compatível com HA)
+            if self.console_enabled:
+                console_handler = logging.StreamHandler(sys.stderr)
+                console_handler.setFormatter(
+                    logging.Formatter('[%(levelname)s] %(message)s')
+                )
+                self.console.addHandler(console_handler)
+            else:
+                # Sem handler, o logging usaria o lastResort (stderr) para avisos
+                self.console.addHandler(logging.NullHandler())
+
+            if self.suppressor:
+                atexit.register(self.flush)
+            self._configured = True
+
     def _get_log_level(self) -> int:
         """Obtém nível de log da variável de ambiente."""
-        level_str = os.environ.get('HCT_LOG_LEVEL', 'INFO').upper()
+        level_str = (self.level or os.environ.get('HCT_LOG_LEVEL', 'INFO')).upper()
         return getattr(logging, level_str, logging.INFO)
+
+    def enabled(self, levelno: int) -> bool:
+        if not self._configured:
+            self._configure()
+        return self.logger.isEnabledFor(levelno)
+
+    def sample_rate(self, component: str, action: str) -> int:
+        """Taxa de amostragem de uma ação DEBUG (1 = todos os registros)."""
+        rules = self.sampling
+        return rules.get(f"{component}.{action}") or rules.get(component) or rules.get('*') or 1
+
+    def sampled_out(self, component: str, action: str, rate: int) -> bool:
+        """Mantém 1 a cada `rate` registros da ação (o primeiro sempre passa)."""
+        with self._lock:
+            count = self._sample_counts.get((component, action), 0)
+            self._sample_counts[(component, action)] = count + 1
+        if count % rate:
+            LOG_SUPPRESSED.inc(reason="sampled")
+            return True
+        return False
+
+    def write(self, levelno: int, entry: dict, message: str):
+        """Escreve um registro, a menos que repita um já escrito dentro da janela."""
+        if self.suppressor is not None:
+            write = True
+            with self._lock:
+                if levelno >= DEDUP_MIN_LEVEL:
+                    write, summaries = self.suppressor.check(dedup_key(levelno, entry, message),
+                                                             (levelno, entry, message), time.monotonic())
+                else:
+                    summaries = self.suppressor.poll(time.monotonic())
+            for summary in summaries:
+                self._emit_summary(*summary)
+            if not write:
+                LOG_SUPPRESSED.inc(reason="duplicate")
+                return
+        self._emit(levelno, entry, message)
+
+    def _emit(self, levelno: int, entry: dict, message: str):
+        self.logger.log(levelno, json.dumps(entry))
+
+        # Log legível para console
+        console_message = f"{entry['component']} - {entry['action']}: {message}"
+        if entry["details"]:
+            console_message += f" | {entry['details']}"
+        self.console.log(levelno, console_message)
+
+    def _emit_summary(self, record: tuple, repeated: int, first_seen: str):
+        """Último registro omitido (com seus detalhes) e a contagem de repetições."""
+        levelno, entry, message = record
+        summary = dict(entry, timestamp=utc_timestamp(), repeated=repeated, first_repeat=first_seen)
+        self._emit(levelno, summary, f"{message} (repetido {repeated}x desde {first_seen})")
+
+    def flush(self):
+        """Escreve os resumos pendentes (encerramento do processo)."""
+        if self.suppressor is None:
+            return
+        with self._lock:
+            summaries = self.suppressor.flush()
+        for summary in summaries:
+            self._emit_summary(*summary)
+
+
+def utc_timestamp() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class HCTLogger:
+    """Sistema de logs estruturados para HomeCore Tools."""
+    
+    def __init__(self, name: str = "hct", log_dir: str = None, writer: LogWriter = None, **writer_options):
+        self.name = name
+        # Sem writer compartilhado, o logger escreve no próprio arquivo (<name>.json.log)
+        self.writer = writer or LogWriter(name, log_dir, **writer_options)
+    
+    @property
+    def logger(self) -> logging.Logger:
+        """Logger Python do arquivo JSON."""
+        return self.writer.logger
+    
+    @property
+    def log_dir(self) -> Path:
+        return self.writer.log_dir
     
     def _create_log_entry(
         self,
@@ -64,7 +313,7 @@ class HCTLogger:
     ) -> dict:
         """Cria entrada de log estruturada."""
         return {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": utc_timestamp(),
             "level": level,
             "component": component,
             "action": action,
@@ -82,18 +331,23 @@ class HCTLogger:
         status: str = "info"
     ):
         """Registra log estruturado."""
-        entry = self._create_log_entry(level, component, action, details, status)
+        started = time.perf_counter()
+        levelno = logging.getLevelName(level)
+        if not isinstance(levelno, int):
+            levelno = logging.INFO
+        if not self.writer.enabled(levelno):
+            return
         
-        # Log JSON estruturado
-        json_message = json.dumps(entry)
-        log_method = getattr(self.logger, level.lower(), self.logger.info)
-        log_method(json_message)
+        rate = self.writer.sample_rate(component, action) if levelno == logging.DEBUG else 1
+        if rate > 1 and self.writer.sampled_out(component, action, rate):
+            return
         
-        # Log legível para console
-        console_message = f"{component} - {action}: {message}"
-        if details:
-            console_message += f" | {details}"
-        log_method(console_message)
+        entry = self._create_log_entry(level, component, action, details, status)
+        if rate > 1:
+            entry["sampled"] = rate
+        self.writer.write(levelno, entry, message)
+        
+        LOG_WRITE_SECONDS.observe(time.perf_counter() - started)
     
     def info(self, component: str, action: str, message: str, details: dict = None):
         """Log de informação."""
@@ -121,37 +375,76 @@ class HCTLogger:
         self.log("INFO", component, action, message, details, "success")
     
     def get_recent_logs(self, limit: int = 100) -> list:
-        """Obtém logs recentes."""
-        json_log_file = self.log_dir / f"{self.name}.json.log"
+        """
+        Obtém logs recentes (limit <= 0: todos). O arquivo é lido do fim para
+        o início, parando ao reunir `limit` registros JSON válidos.
+        """
+        json_log_file = self.writer.log_file
         
         if not json_log_file.exists():
             return []
         
         logs = []
         try:
-            with open(json_log_file, 'r') as f:
-                for line in f:
-                    try:
-                        logs.append(json.loads(line.strip()))
-                    except json.JSONDecodeError:
-                        continue
+            for line in reverse_lines(json_log_file):
+                try:
+                    logs.append(json.loads(line))
+                except ValueError:
+                    continue
+                if 0 < limit <= len(logs):
+                    break
         except Exception as e:
             self.error("hct-logger", "get_recent_logs", f"Erro ao ler logs: {e}")
         
-        # Retornar os últimos N logs
-        return logs[-limit:] if logs else []
+        logs.reverse()
+        return logs
+
+
+def reverse_lines(path: Path, block_size: int = 64 * 1024):
+    """Linhas não vazias do arquivo, da última para a primeira, lidas em blocos."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b'\n')
+            # A primeira linha do bloco pode continuar no bloco anterior
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        
+        if remainder.strip():
+            yield remainder
+
+
+# Writer compartilhado e loggers por componente
+_shared_writer: Optional[LogWriter] = None
+_loggers: Dict[str, HCTLogger] = {}
+_loggers_lock = threading.Lock()
 
 
-# Singleton global
-_logger_instance = None
+def get_writer() -> LogWriter:
+    """Writer do processo ($HCT_DATA_DIR/logs/hct.json.log)."""
+    global _shared_writer
+    with _loggers_lock:
+        if _shared_writer is None:
+            _shared_writer = LogWriter(SHARED_LOG_NAME)
+        return _shared_writer
 
 
 def get_logger(name: str = "hct") -> HCTLogger:
-    """Obtém instância singleton do logger."""
-    global _logger_instance
-    if _logger_instance is None:
-        _logger_instance = HCTLogger(name)
-    return _logger_instance
+    """Logger do componente `name`, escrevendo pelo writer compartilhado."""
+    logger = _loggers.get(name)
+    if logger is None:
+        writer = get_writer()
+        with _loggers_lock:
+            logger = _loggers.setdefault(name, HCTLogger(name, writer=writer))
+    return logger
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Métricas
+Contadores, gauges e histogramas em memória, exportados no formato texto do Prometheus
+"""
+
+import os
+import time
+import threading
+import functools
+from typing import Dict, Tuple, List, Callable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def metrics_enabled() -> bool:
+    """Métricas ficam ativas a menos que HCT_METRICS seja false/off/0."""
+    return os.environ.get('HCT_METRICS', 'true').lower() not in ('false', 'off', '0', 'no')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base das métricas; valores indexados pela tupla de labels."""
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def time(self, **labels) -> '_Timer':
+        """Context manager que observa a duração do bloco."""
+        return _Timer(self, labels)
+
+    def _render_sample(self, key, state) -> List[str]:
+        lines = []
+        for bound, count in zip(self.buckets, state["counts"]):
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {count}")
+        inf = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, inf)} {state['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state['count']}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class _NoopMetric:
+    """Métrica sem efeito (modo desabilitado)."""
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def time(self, **labels):
+        return _NOOP_TIMER
+
+    def render(self) -> List[str]:
+        return []
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP_TIMER = _NoopTimer()
+_NOOP_METRIC = _NoopMetric()
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, labels, **kwargs):
+        if not self.enabled:
+            return _NOOP_METRIC
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, tuple(labels), **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Exporta todas as métricas no formato texto do Prometheus (0.0.4)."""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro global
+registry = MetricsRegistry(enabled=metrics_enabled())
+
+# Métricas compartilhadas pelos módulos HCT
+OPERATION_SECONDS = registry.histogram(
+    "hct_operation_duration_seconds", "Duração das operações do updater", ("operation",))
+OPERATION_TOTAL = registry.counter(
+    "hct_operation_total", "Execuções das operações do updater por resultado", ("operation", "result"))
+
+
+def instrument(operation: str) -> Callable:
+    """
+    Decorator que mede duração e resultado (sucesso se o retorno for verdadeiro).
+
+    Com métricas desabilitadas, devolve a função original (custo zero).
+    """
+    def decorator(func):
+        if not registry.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - started, operation=operation)
+                OPERATION_TOTAL.inc(operation=operation, result="success" if result else "failure")
+        return wrapper
+    return decorator
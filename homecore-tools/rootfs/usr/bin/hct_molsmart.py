@@ -0,0 +1,800 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Pipeline MolSmart
+Sincronização em lote das placas detectadas, provisionamento MQTT paralelo,
+inventário persistente com re-scan incremental e descoberta de hosts
+(tabela ARP + varredura TCP) antes da consulta HTTP
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable
+from urllib.parse import urlencode
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError
+from concurrent.futures import ThreadPoolExecutor
+
+# Importar logger
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+
+logger = get_logger("hct-molsmart")
+
+DEFAULT_SYNC_URL = "https://homecore.com.br/api/sync/molsmart_sync.php"
+DEFAULT_ENDPOINT = "/relay_cgi_load.cgi"
+HISTORY_LIMIT = 500
+
+NEIGHBOR_TABLE = "/proc/net/arp"
+DISCOVERY_MODES = ('sweep', 'arp', 'none')
+ATF_COMPLETE = 0x2
+
+
+def utc_timestamp() -> str:
+    """Timestamp UTC no formato usado pela plataforma."""
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def board_key(board: Dict[str, Any]) -> str:
+    """
+    Chave de deduplicação: serial da placa, MAC (tabela ARP) ou, na falta
+    dos dois, o IP. O relay CGI não informa serial; o MAC é o que mantém a
+    identidade de uma placa que mudou de IP.
+    """
+    serial = str(board.get('serial') or '').strip()
+    if serial:
+        return f"serial:{serial}"
+    mac = str(board.get('mac') or '').strip().lower()
+    if mac:
+        return f"mac:{mac}"
+    return f"ip:{board.get('board_ip', '')}"
+
+
+def build_channel_config(count: int, states: List[int], label: str) -> List[Dict[str, Any]]:
+    """Monta configuração de canais (mesmo formato do molsmart_scanner.sh)."""
+    channels = []
+    for idx in range(1, count + 1):
+        state = 1 if idx <= len(states) and states[idx - 1] == 1 else 0
+        channels.append({
+            "channel": idx,
+            "name": f"{label} {idx}",
+            "state": state,
+            "enabled": True
+        })
+    return channels
+
+
+def build_board_entry(ip: str, relay_count: int, states: List[int],
+                      mqtt_config: Dict[str, Any], serial: str = None, mac: str = None) -> Dict[str, Any]:
+    """Cria entrada de placa no formato do payload de sincronização."""
+    entry = {
+        "board_ip": ip,
+        "board_model": f"molsmart_{relay_count}",
+        "relay_count": relay_count,
+        "input_count": relay_count,
+        "output_config": build_channel_config(relay_count, states, "Relay"),
+        "input_config": build_channel_config(relay_count, [], "Input"),
+        "states": states,
+        "mqtt_config": mqtt_config,
+        "last_seen": utc_timestamp()
+    }
+    if serial:
+        entry["serial"] = serial
+    if mac:
+        entry["mac"] = mac
+    return entry
+
+
+def parse_relay_response(body: str) -> Optional[Dict[str, Any]]:
+    """Interpreta resposta do relay_cgi_load.cgi (formato &0&<relés>&<estados>&)."""
+    if "&0&" not in body:
+        return None
+
+    fields = body.split('&')
+    if len(fields) < 3:
+        return None
+
+    relays = ''.join(ch for ch in fields[2] if ch.isdigit())
+    if not relays:
+        return None
+
+    states = []
+    if len(fields) > 3:
+        for raw in fields[3].split(','):
+            cleaned = ''.join(ch for ch in raw if ch.isdigit())
+            if cleaned:
+                states.append(1 if cleaned == '1' else 0)
+
+    return {"relay_count": int(relays), "states": states}
+
+
+def probe_board(ip: str, port: int = 80, endpoint: str = DEFAULT_ENDPOINT,
+                timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+    """Consulta uma placa; retorna quantidade/estados dos relés ou None."""
+    host = ip if port == 80 else f"{ip}:{port}"
+    try:
+        with urlopen(f"http://{host}{endpoint}", timeout=timeout) as response:
+            body = response.read(4096).decode('utf-8', errors='replace')
+    except Exception:
+        return None
+
+    detail = parse_relay_response(body)
+    if detail:
+        detail["ip"] = ip
+    return detail
+
+
+def neighbor_table(path: str = NEIGHBOR_TABLE) -> Dict[str, str]:
+    """IP -> MAC das entradas completas (MAC resolvido) da tabela ARP do kernel."""
+    table = {}
+    try:
+        with open(path, 'r') as f:
+            next(f, None)  # cabeçalho
+            for line in f:
+                fields = line.split()
+                if len(fields) < 4:
+                    continue
+                ip, flags, mac = fields[0], fields[2], fields[3]
+                try:
+                    complete = int(flags, 16) & ATF_COMPLETE
+                except ValueError:
+                    continue
+                if complete and mac != "00:00:00:00:00:00":
+                    table[ip] = mac.lower()
+    except OSError:
+        pass
+    return table
+
+
+def neighbor_hosts(path: str = NEIGHBOR_TABLE) -> set:
+    """IPs com entrada completa (MAC resolvido) na tabela ARP do kernel."""
+    return set(neighbor_table(path))
+
+
+def attach_macs(boards: List[Dict[str, Any]], table: Dict[str, str] = None) -> int:
+    """
+    Completa o MAC das placas sem serial nem MAC a partir da tabela ARP (a
+    consulta HTTP acabou de resolver o endereço). Retorna quantas foram completadas.
+    """
+    missing = [b for b in boards if not b.get('serial') and not b.get('mac') and b.get('board_ip')]
+    if not missing:
+        return 0
+    table = neighbor_table() if table is None else table
+    attached = 0
+    for board in missing:
+        mac = table.get(board['board_ip'])
+        if mac:
+            board['mac'] = mac
+            attached += 1
+    return attached
+
+
+def port_open(ip: str, port: int, timeout: float) -> bool:
+    """Conexão TCP aceita na porta (sem enviar nada)."""
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def tcp_sweep(ips: List[str], port: int, timeout: float = 0.3, workers: int = 64) -> set:
+    """Hosts com a porta aberta, testados em paralelo."""
+    if not ips:
+        return set()
+    with ThreadPoolExecutor(max_workers=min(workers, len(ips)), thread_name_prefix='hct-sweep') as executor:
+        results = executor.map(lambda ip: port_open(ip, port, timeout), ips)
+        return {ip for ip, is_open in zip(ips, results) if is_open}
+
+
+def discover_hosts(ips: List[str], port: int = 80, mode: str = 'sweep',
+                   connect_timeout: float = 0.3, workers: int = 64) -> tuple:
+    """
+    Filtra `ips` para os hosts vivos, na ordem original.
+
+    Modos: "arp" usa só a tabela de vizinhos do kernel; "sweep" soma uma
+    varredura TCP-connect na porta para os endereços fora da tabela; "none"
+    não filtra. Retorna (ips_vivos, estatísticas).
+    """
+    started = time.monotonic()
+    stats = {"mode": mode, "candidates": len(ips)}
+    if mode == 'none':
+        return list(ips), dict(stats, live=len(ips), duration_ms=0.0)
+
+    neighbors = neighbor_hosts() & set(ips)
+    live = set(neighbors)
+    stats["neighbors"] = len(neighbors)
+
+    if mode == 'sweep':
+        # Vizinhos já conhecidos vão direto para a consulta HTTP
+        rest = [ip for ip in ips if ip not in neighbors]
+        open_hosts = tcp_sweep(rest, port, connect_timeout, workers)
+        live |= open_hosts
+        stats["swept"] = len(rest)
+        stats["open"] = len(open_hosts)
+
+    result = [ip for ip in ips if ip in live]
+    stats["live"] = len(result)
+    stats["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return result, stats
+
+
+class MolSmartInventory:
+    """Inventário persistente das placas MolSmart encontradas nos scans."""
+
+    def __init__(self, path: Path = None):
+        data_dir = Path(os.environ.get('HCT_DATA_DIR', '/data'))
+        self.path = Path(path) if path else data_dir / 'molsmart_inventory.json'
+        self._lock = threading.Lock()
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self.history: List[Dict[str, Any]] = []
+        self.load()
+
+    def load(self):
+        """Carrega inventário do disco (vazio se inexistente ou corrompido)."""
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.devices = data.get('devices', {})
+            self.history = data.get('history', [])
+        except Exception as e:
+            logger.warning("hct-molsmart", "inventory", "Inventário ilegível, iniciando vazio", {
+                "path": str(self.path),
+                "error": str(e)
+            })
+            self.devices = {}
+            self.history = []
+
+    def save(self):
+        """Grava inventário de forma atômica."""
+        with self._lock:
+            data = {
+                "updated_at": utc_timestamp(),
+                "devices": self.devices,
+                "history": self.history[-HISTORY_LIMIT:]
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def known_ips(self) -> List[str]:
+        """IPs das placas conhecidas, das vistas mais recentemente para as mais antigas."""
+        devices = sorted(self.devices.values(), key=lambda d: d.get('last_seen', ''), reverse=True)
+        return [d['ip'] for d in devices if d.get('ip')]
+
+    def _event(self, event: str, key: str, **details):
+        self.history.append(dict({"time": utc_timestamp(), "event": event, "key": key}, **details))
+
+    def record(self, boards: List[Dict[str, Any]], scanned_ips: Iterable[str] = None) -> Dict[str, int]:
+        """
+        Atualiza o inventário com as placas encontradas.
+
+        Placas conhecidas cujo IP estava em `scanned_ips` e não responderam
+        são marcadas como offline.
+        """
+        now = utc_timestamp()
+        counters = {"added": 0, "updated": 0, "moved": 0, "offline": 0}
+        seen_keys = set()
+
+        with self._lock:
+            for board in boards:
+                key = board_key(board)
+                ip = board.get('board_ip')
+                seen_keys.add(key)
+                device = self.devices.get(key)
+
+                if device is None and not key.startswith("ip:"):
+                    # Entrada antiga, chaveada pelo IP antes de o MAC/serial ser conhecido
+                    device = self.devices.pop(f"ip:{ip}", None)
+                    if device is not None:
+                        device["key"] = key
+                        self.devices[key] = device
+
+                if device is None:
+                    device = {"key": key, "first_seen": now}
+                    self.devices[key] = device
+                    self._event("added", key, ip=ip)
+                    counters["added"] += 1
+                else:
+                    if device.get('ip') != ip:
+                        self._event("moved", key, ip=ip, previous_ip=device.get('ip'))
+                        counters["moved"] += 1
+                    elif not device.get('online', True):
+                        self._event("online", key, ip=ip)
+                    counters["updated"] += 1
+
+                device.update({
+                    "serial": board.get('serial'),
+                    "mac": board.get('mac'),
+                    "ip": ip,
+                    "relay_count": board.get('relay_count'),
+                    "states": board.get('states', []),
+                    "last_seen": now,
+                    "online": True
+                })
+
+            if scanned_ips is not None:
+                scanned = set(scanned_ips)
+                for key, device in self.devices.items():
+                    if key in seen_keys or not device.get('online', True):
+                        continue
+                    if device.get('ip') in scanned:
+                        device["online"] = False
+                        self._event("offline", key, ip=device.get('ip'))
+                        counters["offline"] += 1
+
+            del self.history[:-HISTORY_LIMIT]
+
+        self.save()
+        return counters
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação serializável (usada pela API)."""
+        with self._lock:
+            devices = list(self.devices.values())
+            return {
+                "count": len(devices),
+                "online": sum(1 for d in devices if d.get('online', True)),
+                "devices": devices,
+                "history": list(self.history)
+            }
+
+
+class MolSmartScanner:
+    """Varredura de placas em Python, com modo incremental baseado no inventário."""
+
+    def __init__(
+        self,
+        inventory: MolSmartInventory,
+        port: int = 80,
+        endpoint: str = DEFAULT_ENDPOINT,
+        timeout: float = 1.0,
+        max_workers: int = 8,
+        sweep_rate: float = 10.0,
+        discovery: str = 'sweep',
+        connect_timeout: float = 0.3
+    ):
+        self.inventory = inventory
+        self.port = port
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.sweep_rate = sweep_rate
+        self.discovery = discovery
+        self.connect_timeout = connect_timeout
+
+    def _probe(self, ip: str) -> Optional[Dict[str, Any]]:
+        return probe_board(ip, self.port, self.endpoint, self.timeout)
+
+    def _probe_many(self, ips: List[str], workers: int, rate: float = 0) -> List[Dict[str, Any]]:
+        """Consulta vários IPs em paralelo; `rate` limita consultas por segundo."""
+        if not ips:
+            return []
+
+        interval = 1.0 / rate if rate and rate > 0 else 0
+        with ThreadPoolExecutor(max_workers=min(workers, len(ips)), thread_name_prefix='hct-probe') as executor:
+            futures = []
+            for ip in ips:
+                futures.append(executor.submit(self._probe, ip))
+                if interval:
+                    time.sleep(interval)
+            return [f.result() for f in futures if f.result()]
+
+    def scan(self, ips: List[str], incremental: bool = False, known_only: bool = False) -> Dict[str, Any]:
+        """
+        Executa o scan. A consulta HTTP só vai para os hosts vivos segundo a
+        descoberta (`discovery`). No modo incremental, consulta primeiro as
+        placas do inventário e depois os endereços desconhecidos, em ritmo
+        reduzido (`sweep_rate`).
+
+        `probed_ips` lista só os endereços consultados por HTTP, usados pelo
+        inventário para marcar placas offline: um host descartado pela
+        descoberta (fora da tabela ARP, lento no connect) não prova que a
+        placa saiu da rede.
+        """
+        started = time.monotonic()
+        found: List[Dict[str, Any]] = []
+        covered: List[str] = []
+        probes = 0
+        discovery = None
+
+        if incremental:
+            known = self.inventory.known_ips()
+            found.extend(self._probe_many(known, self.max_workers))
+            covered.extend(known)
+            probes += len(known)
+
+            if not known_only:
+                found_ips = {board["ip"] for board in found}
+                skip = set(known) | found_ips
+                unknown = [ip for ip in ips if ip not in skip]
+                live, discovery = discover_hosts(unknown, self.port, self.discovery, self.connect_timeout)
+                found.extend(self._probe_many(live, max(1, self.max_workers // 2), self.sweep_rate))
+                covered.extend(live)
+                probes += len(live)
+        else:
+            live, discovery = discover_hosts(ips, self.port, self.discovery, self.connect_timeout)
+            found.extend(self._probe_many(live, self.max_workers))
+            covered.extend(live)
+            probes += len(live)
+
+        report = {
+            "mode": "incremental" if incremental else "full",
+            "probed": probes,
+            "found": found,
+            "probed_ips": covered,
+            "discovery": discovery,
+            "duration_ms": round((time.monotonic() - started) * 1000, 1)
+        }
+
+        logger.info("hct-molsmart", "scan", "Scan MolSmart concluído", {
+            "mode": report["mode"],
+            "covered": len(covered),
+            "probed": report["probed"],
+            "found": len(found),
+            "duration_ms": report["duration_ms"]
+        })
+        return report
+
+
+class MolSmartPipeline:
+    """Etapa pós-scan: deduplicação, sync em lote e provisionamento MQTT."""
+
+    def __init__(
+        self,
+        token: Optional[str],
+        sync_url: str = DEFAULT_SYNC_URL,
+        mqtt_server: str = "",
+        mqtt_port: int = 1883,
+        mqtt_user: str = "homeassistant",
+        mqtt_pass: str = "",
+        timeout: float = 2.0,
+        max_workers: int = 8,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+        dry_run: bool = False,
+        inventory: MolSmartInventory = None
+    ):
+        self.token = token
+        self.sync_url = sync_url
+        self.mqtt_server = mqtt_server
+        self.mqtt_port = mqtt_port
+        self.mqtt_user = mqtt_user
+        self.mqtt_pass = mqtt_pass
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(1, max_retries)
+        self.retry_delay = retry_delay
+        self.dry_run = dry_run
+        self.inventory = inventory
+
+    def dedup(self, boards: List[Dict[str, Any]]) -> tuple:
+        """Remove placas repetidas (por serial/IP), mantendo a primeira ocorrência."""
+        seen = set()
+        unique = []
+        duplicates = 0
+        for board in boards:
+            key = board_key(board)
+            if key in seen:
+                duplicates += 1
+                logger.debug("hct-molsmart", "dedup", "Placa duplicada ignorada", {"key": key})
+                continue
+            seen.add(key)
+            unique.append(board)
+        return unique, duplicates
+
+    def send_sync(self, boards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Envia todas as placas em uma única requisição para a plataforma."""
+        result = {"sent": False, "boards": len(boards), "http_status": None, "error": None}
+
+        if not boards:
+            result["error"] = "Nenhuma placa para sincronizar"
+            return result
+
+        if not self.token:
+            result["error"] = "Token do HomeCore não disponível"
+            logger.error("hct-molsmart", "sync", "Token do HomeCore não disponível; cancelando sincronização")
+            return result
+
+        payload = {"generated_at": utc_timestamp(), "relay_board": boards}
+
+        if self.dry_run:
+            logger.info("hct-molsmart", "sync", "Dry-run habilitado, payload não enviado", {
+                "boards": len(boards)
+            })
+            result["payload"] = payload
+            return result
+
+        request = Request(self.sync_url, method='POST')
+        request.add_header('User-Agent', 'HomeCore-Tools/1.0')
+        request.add_header('Authorization', f'Bearer {self.token}')
+        request.add_header('Content-Type', 'application/json')
+        request.data = json.dumps(payload).encode('utf-8')
+
+        try:
+            with urlopen(request, timeout=30) as response:
+                result["http_status"] = response.status
+                result["sent"] = 200 <= response.status < 300
+        except HTTPError as e:
+            result["http_status"] = e.code
+            result["error"] = f"HTTP {e.code}"
+        except Exception as e:
+            result["error"] = str(e)
+
+        if result["sent"]:
+            logger.success("hct-molsmart", "sync", "Registro das placas MolSmart concluído", {
+                "boards": len(boards),
+                "http_status": result["http_status"]
+            })
+        else:
+            logger.error("hct-molsmart", "sync", "Falha ao sincronizar placas", {
+                "boards": len(boards),
+                "error": result["error"]
+            })
+        return result
+
+    def _mqtt_url(self, ip: str) -> str:
+        query = urlencode({
+            "server": self.mqtt_server,
+            "port": self.mqtt_port,
+            "user": self.mqtt_user,
+            "pass": self.mqtt_pass
+        })
+        return f"http://{ip}/mqtt.cgi?{query}"
+
+    def configure_board_mqtt(self, ip: str) -> Dict[str, Any]:
+        """Configura MQTT em uma placa, com retries."""
+        result = {"ip": ip, "ok": False, "attempts": 0, "error": None}
+
+        if self.dry_run:
+            result["ok"] = True
+            return result
+
+        for attempt in range(1, self.max_retries + 1):
+            result["attempts"] = attempt
+            try:
+                with urlopen(self._mqtt_url(ip), timeout=self.timeout) as response:
+                    response.read()
+                result["ok"] = True
+                result["error"] = None
+                break
+            except Exception as e:
+                result["error"] = str(e)
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay * attempt)
+
+        if result["ok"]:
+            logger.debug("hct-molsmart", "mqtt", f"Configuração MQTT enviada para {ip}", {
+                "attempts": result["attempts"]
+            })
+        else:
+            logger.warning("hct-molsmart", "mqtt", f"Falha ao configurar MQTT em {ip}", {
+                "attempts": result["attempts"],
+                "error": result["error"]
+            })
+        return result
+
+    def provision_mqtt(self, boards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Provisiona MQTT em todas as placas com paralelismo limitado."""
+        report = {"configured": 0, "failed": 0, "results": []}
+
+        if not self.mqtt_server:
+            logger.warning("hct-molsmart", "mqtt", "Servidor MQTT não definido; provisionamento ignorado")
+            report["error"] = "Servidor MQTT não definido"
+            return report
+
+        ips = [board.get('board_ip') for board in boards if board.get('board_ip')]
+        if not ips:
+            return report
+
+        workers = min(self.max_workers, len(ips))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hct-mqtt') as executor:
+            results = list(executor.map(self.configure_board_mqtt, ips))
+
+        report["results"] = results
+        report["configured"] = sum(1 for r in results if r["ok"])
+        report["failed"] = len(results) - report["configured"]
+        return report
+
+    def run(self, boards: List[Dict[str, Any]], sync: bool = True, mqtt: bool = True,
+            scanned_ips: Iterable[str] = None) -> Dict[str, Any]:
+        """Executa o pipeline completo e retorna relatório estruturado."""
+        started = time.monotonic()
+        attach_macs(boards)
+        unique, duplicates = self.dedup(boards)
+
+        logger.info("hct-molsmart", "run", "Processando placas detectadas", {
+            "received": len(boards),
+            "unique": len(unique),
+            "duplicates": duplicates
+        })
+
+        report = {
+            "generated_at": utc_timestamp(),
+            "boards_received": len(boards),
+            "boards_unique": len(unique),
+            "duplicates": duplicates,
+            "sync": None,
+            "mqtt": None,
+            "inventory": None
+        }
+
+        if mqtt and unique:
+            report["mqtt"] = self.provision_mqtt(unique)
+        if sync and unique:
+            report["sync"] = self.send_sync(unique)
+        if self.inventory is not None:
+            try:
+                report["inventory"] = self.inventory.record(unique, scanned_ips)
+            except OSError as e:
+                logger.error("hct-molsmart", "inventory", "Erro ao gravar inventário", exception=e)
+
+        report["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+        logger.success("hct-molsmart", "run", "Pipeline MolSmart concluído", {
+            "boards": len(unique),
+            "mqtt_configured": report["mqtt"]["configured"] if report["mqtt"] else None,
+            "synced": report["sync"]["sent"] if report["sync"] else None,
+            "duration_ms": report["duration_ms"]
+        })
+        return report
+
+
+def load_boards(data: Any) -> List[Dict[str, Any]]:
+    """Aceita lista de placas ou objeto no formato {"relay_board": [...]}."""
+    if isinstance(data, dict):
+        data = data.get('relay_board') or data.get('boards') or []
+    if not isinstance(data, list):
+        return []
+    return [board for board in data if isinstance(board, dict)]
+
+
+def scan_range(prefix: str, start: int, end: int) -> List[str]:
+    """Lista de IPs de um range (ex.: 192.168.1. 1 254)."""
+    return [f"{prefix}{i}" for i in range(start, end + 1)]
+
+
+def main(argv: List[str] = None) -> int:
+    """Entrada de linha de comando (usada pelo molsmart_scanner.sh)."""
+    parser = argparse.ArgumentParser(description="Pipeline de sincronização MolSmart")
+    sub = parser.add_subparsers(dest='command')
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--token', default=os.environ.get('HOMECORE_TOKEN', ''))
+    common.add_argument('--sync-url', default=os.environ.get('HOMECORE_SYNC_URL', DEFAULT_SYNC_URL))
+    common.add_argument('--no-sync', action='store_true')
+    common.add_argument('--no-mqtt', action='store_true')
+    common.add_argument('--mqtt-server', default=os.environ.get('HOMECORE_MQTT_SERVER', ''))
+    common.add_argument('--mqtt-port', type=int, default=int(os.environ.get('HOMECORE_MQTT_PORT', '1883')))
+    common.add_argument('--mqtt-user', default=os.environ.get('HOMECORE_MQTT_USER', 'homeassistant'))
+    common.add_argument('--mqtt-pass', default=os.environ.get('HOMECORE_MQTT_PASS', 'ha123'))
+    common.add_argument('--timeout', type=float, default=2.0)
+    common.add_argument('--workers', type=int, default=8)
+    common.add_argument('--retries', type=int, default=3)
+    common.add_argument('--inventory', default=None, help="Caminho do inventário (padrão: $HCT_DATA_DIR/molsmart_inventory.json)")
+    common.add_argument('--no-inventory', action='store_true')
+    common.add_argument('--dry-run', action='store_true')
+
+    sync_parser = sub.add_parser('sync', parents=[common], help="Sincroniza placas recebidas em JSON")
+    sync_parser.add_argument('--input', default='-', help="Arquivo JSON com as placas ('-' para stdin)")
+    sync_parser.add_argument('--prefix', default=None, help="Prefixo do range varrido (marca placas ausentes como offline)")
+    sync_parser.add_argument('--from', dest='range_from', type=int, default=1)
+    sync_parser.add_argument('--to', dest='range_to', type=int, default=254)
+
+    scan_parser = sub.add_parser('scan', parents=[common], help="Varre a rede e sincroniza as placas encontradas")
+    scan_parser.add_argument('--prefix', required=True)
+    scan_parser.add_argument('--from', dest='range_from', type=int, default=1)
+    scan_parser.add_argument('--to', dest='range_to', type=int, default=254)
+    scan_parser.add_argument('--port', type=int, default=80)
+    scan_parser.add_argument('--endpoint', default=DEFAULT_ENDPOINT)
+    scan_parser.add_argument('--probe-timeout', type=float, default=1.0)
+    scan_parser.add_argument('--incremental', action='store_true', help="Placas conhecidas primeiro, depois varredura lenta")
+    scan_parser.add_argument('--known-only', action='store_true', help="No modo incremental, consulta apenas placas conhecidas")
+    scan_parser.add_argument('--rate', type=float, default=10.0, help="Consultas/s na varredura de endereços desconhecidos")
+    scan_parser.add_argument('--discover', choices=DISCOVERY_MODES, default='sweep',
+                             help="Descoberta de hosts antes da consulta HTTP: tabela ARP + TCP (sweep), só ARP ou nenhuma")
+    scan_parser.add_argument('--connect-timeout', type=float, default=0.3, help="Timeout da varredura TCP (s)")
+
+    discover_parser = sub.add_parser('discover', help="Lista os hosts vivos do range (um IP por linha)")
+    discover_parser.add_argument('--prefix', required=True)
+    discover_parser.add_argument('--from', dest='range_from', type=int, default=1)
+    discover_parser.add_argument('--to', dest='range_to', type=int, default=254)
+    discover_parser.add_argument('--port', type=int, default=80)
+    discover_parser.add_argument('--mode', choices=DISCOVERY_MODES, default='sweep')
+    discover_parser.add_argument('--connect-timeout', type=float, default=0.3)
+
+    inventory_parser = sub.add_parser('inventory', help="Exibe o inventário de placas")
+    inventory_parser.add_argument('--inventory', default=None)
+
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    if args.command == 'inventory':
+        print(json.dumps(MolSmartInventory(args.inventory).to_dict(), indent=2))
+        return 0
+
+    if args.command == 'discover':
+        live, stats = discover_hosts(scan_range(args.prefix, args.range_from, args.range_to),
+                                     args.port, args.mode, args.connect_timeout)
+        logger.info("hct-molsmart", "discover", "Descoberta de hosts concluída", stats)
+        for ip in live:
+            print(ip)
+        return 0
+
+    inventory = None if args.no_inventory or args.dry_run else MolSmartInventory(args.inventory)
+    scanned_ips = None
+
+    if args.command == 'scan':
+        scanner = MolSmartScanner(
+            inventory or MolSmartInventory(args.inventory),
+            port=args.port,
+            endpoint=args.endpoint,
+            timeout=args.probe_timeout,
+            max_workers=args.workers,
+            sweep_rate=args.rate,
+            discovery=args.discover,
+            connect_timeout=args.connect_timeout
+        )
+        scan_report = scanner.scan(
+            scan_range(args.prefix, args.range_from, args.range_to),
+            incremental=args.incremental,
+            known_only=args.known_only
+        )
+        scanned_ips = scan_report["probed_ips"]
+        mqtt_config = {"server": args.mqtt_server, "port": args.mqtt_port, "user": args.mqtt_user}
+        boards = [
+            build_board_entry(board["ip"], board["relay_count"], board["states"], mqtt_config)
+            for board in scan_report["found"]
+        ]
+    else:
+        try:
+            if args.input == '-':
+                boards = load_boards(json.load(sys.stdin))
+            else:
+                with open(args.input, 'r') as f:
+                    boards = load_boards(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error("hct-molsmart", "main", "Entrada JSON inválida", exception=e)
+            return 1
+        if args.prefix:
+            scanned_ips = scan_range(args.prefix, args.range_from, args.range_to)
+
+    pipeline = MolSmartPipeline(
+        token=args.token.strip() or None,
+        sync_url=args.sync_url,
+        mqtt_server=args.mqtt_server,
+        mqtt_port=args.mqtt_port,
+        mqtt_user=args.mqtt_user,
+        mqtt_pass=args.mqtt_pass,
+        timeout=args.timeout,
+        max_workers=args.workers,
+        max_retries=args.retries,
+        dry_run=args.dry_run,
+        inventory=inventory
+    )
+
+    report = pipeline.run(boards, sync=not args.no_sync, mqtt=not args.no_mqtt, scanned_ips=scanned_ips)
+    if args.command == 'scan':
+        report["scan"] = {k: v for k, v in scan_report.items() if k != "probed_ips"}
+    print(json.dumps(report, indent=2))
+
+    if report["sync"] and not report["sync"]["sent"] and not args.dry_run:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
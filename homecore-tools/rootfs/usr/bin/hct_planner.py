@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Planejamento de Atualizações (dry-run)
+Calcula, sem aplicar, o que uma atualização pendente vai fazer: arquivos
+adicionados/modificados, bytes a baixar e a copiar no backup, espaço livre
+necessário por sistema de arquivos e tempo estimado pela vazão recente
+
+O conteúdo do pacote vem do diretório central do ZIP: do pacote pré-baixado,
+do cache, ou do servidor via HTTP Range (só o fim do arquivo). Se o servidor
+não aceitar Range, o pacote é baixado (e fica no cache para a aplicação).
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import zipfile
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+from hct_integrity import package_members
+
+logger = get_logger("hct-planner")
+
+# Vazões assumidas sem histórico (bytes/s): link residencial e cartão SD
+DEFAULT_RATES = {
+    "download": 1024 * 1024,
+    "backup": 10 * 1024 * 1024,
+    # Backup feito pelo Supervisor (bytes do arquivo comprimido gerado)
+    "snapshot": 2 * 1024 * 1024,
+    "apply": 5 * 1024 * 1024
+}
+EWMA_ALPHA = 0.3
+MAX_LISTED = 500
+RANGE_TAIL = 64 * 1024
+
+
+class RangeNotSupported(Exception):
+    """Servidor respondeu sem suporte a HTTP Range."""
+
+
+class ThroughputHistory:
+    """Média móvel (EWMA) da vazão de download, backup e aplicação."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                self.rates: Dict[str, Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            self.rates = {}
+
+    def record(self, kind: str, nbytes: int, seconds: float):
+        # Medições muito curtas são dominadas por latência, não por vazão
+        if nbytes <= 0 or seconds <= 0.05:
+            return
+        rate = nbytes / seconds
+        with self._lock:
+            entry = self.rates.get(kind)
+            if entry:
+                rate = EWMA_ALPHA * rate + (1 - EWMA_ALPHA) * entry["bytes_per_s"]
+            self.rates[kind] = {
+                "bytes_per_s": round(rate, 1),
+                "samples": (entry or {}).get("samples", 0) + 1,
+                "updated_at": datetime.now().isoformat(timespec='seconds')
+            }
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.rates, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
+
+    def rate(self, kind: str) -> Tuple[float, str]:
+        """(bytes/s, origem) com origem "history" ou "default"."""
+        entry = self.rates.get(kind)
+        if entry:
+            return entry["bytes_per_s"], "history"
+        return float(DEFAULT_RATES[kind]), "default"
+
+
+class RangeFile(io.RawIOBase):
+    """Arquivo remoto somente leitura via HTTP Range (para ler o índice de um ZIP)."""
+
+    def __init__(self, http, url: str, headers: Dict[str, str] = None):
+        self.http = http
+        self.url = url
+        self.headers = headers or {}
+        self.position = 0
+        self.requests = 0
+        # O diretório central fica no fim: começar lendo a cauda do arquivo
+        start, data, self.size = self._fetch(f"bytes=-{RANGE_TAIL}")
+        self._buffer_start, self._buffer = start, data
+
+    def _fetch(self, byte_range: str) -> Tuple[int, bytes, int]:
+        self.requests += 1
+        with self.http.get(self.url, headers=dict(self.headers, Range=byte_range), timeout=30) as response:
+            content_range = response.headers.get('content-range', '')
+            if response.status != 206 or not content_range.startswith('bytes '):
+                raise RangeNotSupported(f"HTTP {response.status} sem Content-Range")
+            span, total = content_range[6:].split('/')
+            return int(span.split('-')[0]), response.read(), int(total)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self.size - self.position)
+        if size <= 0:
+            return 0
+        offset = self.position - self._buffer_start
+        if offset < 0 or offset + size > len(self._buffer):
+            end = min(self.size, self.position + max(size, RANGE_TAIL)) - 1
+            self._buffer_start, self._buffer, _ = self._fetch(f"bytes={self.position}-{end}")
+            offset = 0
+        buffer[:size] = self._buffer[offset:offset + size]
+        self.position += size
+        return size
+
+
+def file_crc32(path: Path) -> int:
+    crc = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def existing_ancestor(path: Path) -> Path:
+    """Primeiro diretório existente em `path` ou acima (para statvfs)."""
+    path = Path(path)
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return path
+
+
+def listed(items: List[str]) -> Dict[str, Any]:
+    return {"count": len(items), "paths": sorted(items)[:MAX_LISTED], "truncated": len(items) > MAX_LISTED}
+
+
+class UpdatePlanner:
+    """Dry-run das atualizações pendentes de um HCTUpdater."""
+
+    def __init__(self, updater):
+        self.updater = updater
+
+    # ─── Pacote ───────────────────────────────────────────────────────────
+
+    def open_package(self, update_info: Dict[str, Any], fetch: bool) -> Tuple[Optional[zipfile.ZipFile], str, int, Optional[Path]]:
+        """
+        (zip, origem, tamanho, arquivo temporário a descartar) do pacote.
+        Origem: staged, cache, remote (HTTP Range), download ou unavailable.
+        """
+        updater = self.updater
+        manifest = update_info['manifest']
+
+        staged = updater.prefetcher.staged(update_info)
+        if staged:
+            path = Path(staged['path'])
+            return zipfile.ZipFile(path), "staged", path.stat().st_size, None
+
+        cache = updater.package_cache
+        checksum = manifest.get('checksum')
+        digest = cache.lookup(checksum) if cache and checksum else None
+        if digest:
+            path = cache.root / f"{digest}.pkg"
+            return zipfile.ZipFile(path), "cache", path.stat().st_size, None
+
+        try:
+            remote = RangeFile(updater.http, updater.package_url(manifest))
+            return zipfile.ZipFile(remote), "remote", remote.size, None
+        except RangeNotSupported:
+            pass
+        except Exception as e:
+            logger.warning("hct-planner", "plan", "Falha ao ler índice remoto do pacote", {"error": str(e)})
+
+        if not fetch:
+            return None, "unavailable", manifest.get('size') or 0, None
+
+        # Sem Range: baixar (com cache ativo, a aplicação reaproveita o download)
+        path = updater.download_package(manifest)
+        if not path:
+            return None, "unavailable", manifest.get('size') or 0, None
+        return zipfile.ZipFile(path), "download", path.stat().st_size, path
+
+    # ─── Plano ────────────────────────────────────────────────────────────
+
+    def plan(self, update_info: Dict[str, Any], fetch: bool = True, checksums: bool = True) -> Dict[str, Any]:
+        """
+        Plano de uma atualização (não altera /config). Com checksums=False
+        (verificação de espaço antes da atualização) arquivos de mesmo tamanho
+        contam como inalterados, sem ler /config, e `stale` não é calculado.
+        """
+        started = time.perf_counter()
+        updater = self.updater
+        config_dir = updater.config_dir
+
+        zf, origin, package_size, temp_path = self.open_package(update_info, fetch)
+        added, modified = [], []
+        unchanged = 0
+        uncompressed = added_bytes = modified_bytes = growth = 0
+        members: Dict[str, zipfile.ZipInfo] = {}
+
+        try:
+            if zf is not None:
+                members = package_members(zf)
+                for rel, info in members.items():
+                    uncompressed += info.file_size
+                    target = config_dir / rel
+                    try:
+                        st = target.stat()
+                    except OSError:
+                        added.append(rel)
+                        added_bytes += info.file_size
+                        growth += info.file_size
+                        continue
+                    if st.st_size != info.file_size or (checksums and file_crc32(target) != info.CRC):
+                        modified.append(rel)
+                        modified_bytes += info.file_size
+                        growth += max(0, info.file_size - st.st_size)
+                    else:
+                        unchanged += 1
+                zf.close()
+        finally:
+            if temp_path:
+                updater.discard_package(temp_path)
+
+        # Instalados pela versão anterior e ausentes na nova: apply não remove
+        stale = []
+        source = update_info['manifest'].get('name', 'unknown').lower().replace(' ', '_')
+        if members and checksums:
+            try:
+                from hct_integrity import IntegrityScanner
+                index = IntegrityScanner(config_dir, updater.data_dir / 'integrity_index.json')
+                stale = [rel for rel, entry in index.files.items()
+                         if entry.get('source') == source and rel not in members]
+            except Exception:
+                pass
+
+        backup = os.environ.get('HCT_BACKUP_BEFORE_UPDATE', 'true').lower() == 'true'
+        snapshots = updater.snapshots.active
+        backup_bytes = snapshots.estimate_bytes() if backup else 0
+        download_bytes = 0 if origin in ("staged", "cache", "download") else package_size
+
+        disk = self.disk_requirements(origin, package_size, uncompressed, backup_bytes, growth)
+        estimate, rates = self.estimate(download_bytes, backup_bytes, uncompressed, snapshots.rate_kind)
+
+        return {
+            "type": update_info['type'],
+            "current": update_info.get('current'),
+            "available": update_info.get('available'),
+            "complete": zf is not None,
+            "backup_backend": snapshots.name if backup else None,
+            "compared": "crc32" if checksums else "size",
+            "package": {
+                "source": origin,
+                "size": package_size,
+                "uncompressed_bytes": uncompressed,
+                "files": len(members)
+            },
+            "files": {
+                "added": listed(added),
+                "modified": listed(modified),
+                # merge_tree não apaga arquivos: nada é removido pela atualização
+                "removed": listed([]),
+                "stale": listed(stale),
+                "unchanged": unchanged
+            },
+            "bytes": {
+                "download": download_bytes,
+                "backup": backup_bytes,
+                "added": added_bytes,
+                "modified": modified_bytes,
+                "config_growth": growth
+            },
+            "disk": disk,
+            "fits": all(d["fits"] for d in disk),
+            "estimate_s": estimate,
+            "rates": rates,
+            "planned_in_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def plan_all(self, updates: List[Dict[str, Any]], fetch: bool = True) -> List[Dict[str, Any]]:
+        return [self.plan(update_info, fetch) for update_info in updates]
+
+    def disk_requirements(self, origin: str, package_size: int, uncompressed: int,
+                          backup_bytes: int, growth: int) -> List[Dict[str, Any]]:
+        """Espaço necessário (mais a margem da área de staging) por sistema de arquivos."""
+        updater = self.updater
+        temp_dir = updater.staging.root
+        needs = [
+            # Cópia do cache ou download vão para um temporário; o pré-baixado é usado no lugar
+            (temp_dir, 0 if origin == "staged" else package_size),
+            (temp_dir, uncompressed),
+            (updater.snapshots.active.target_dir, backup_bytes),
+            (updater.config_dir, growth),
+        ]
+
+        mounts: Dict[int, Dict[str, Any]] = {}
+        for path, nbytes in needs:
+            anchor = existing_ancestor(path)
+            st = os.stat(anchor)
+            entry = mounts.setdefault(st.st_dev, {"path": str(anchor), "required": 0})
+            entry["required"] += nbytes
+
+        result = []
+        for entry in mounts.values():
+            free = shutil.disk_usage(entry["path"]).free
+            result.append(dict(entry, free=free, fits=entry["required"] + updater.staging.reserve < free))
+        return result
+
+    def estimate(self, download_bytes: int, backup_bytes: int, apply_bytes: int,
+                 backup_kind: str = "backup") -> Tuple[Dict[str, float], Dict[str, Any]]:
+        """Tempo por etapa; o backup usa a vazão do backend ativo (backup ou snapshot)."""
+        history = self.updater.throughput
+        rates = {}
+        for name, kind in (("download", "download"), ("backup", backup_kind), ("apply", "apply")):
+            rate, source = history.rate(kind)
+            rates[name] = {"bytes_per_s": rate, "source": source}
+
+        limiter = self.updater.download_limiter
+        if limiter and limiter.rate < rates["download"]["bytes_per_s"]:
+            rates["download"] = {"bytes_per_s": limiter.rate, "source": "rate_limit"}
+
+        estimate = {
+            "download": round(download_bytes / rates["download"]["bytes_per_s"], 1),
+            "backup": round(backup_bytes / rates["backup"]["bytes_per_s"], 1),
+            "apply": round(apply_bytes / rates["apply"]["bytes_per_s"], 1)
+        }
+        estimate["total"] = round(sum(estimate.values()), 1)
+        return estimate, rates
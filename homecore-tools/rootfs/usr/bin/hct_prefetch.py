@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Pré-download de Atualizações
+Baixa e verifica em segundo plano (baixa prioridade) os pacotes de
+atualizações pendentes quando auto_update está desabilitado, deixando-os
+prontos em /data/staged para que a aplicação manual custe só a cópia
+
+Pacotes são descartados quando ficam antigos (HCT_STAGED_MAX_AGE), quando
+uma versão mais nova os substitui ou quando deixam de estar pendentes. Uma
+aplicação manual espera no máximo TAKE_WAIT segundos por um pré-download em
+andamento; depois disso ele é cancelado e o pacote é baixado normalmente.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+
+logger = get_logger("hct-prefetch")
+
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+LOW_PRIORITY_NICE = 10
+# Espera máxima de take() por um pré-download em andamento (segundos)
+TAKE_WAIT = 15.0
+
+
+def prefetch_enabled() -> bool:
+    return os.environ.get('HCT_PREFETCH', 'true').lower() == 'true'
+
+
+def release_key(update_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Identifica o pacote de uma atualização (mudou qualquer campo = outro pacote)."""
+    manifest = update_info['manifest']
+    return {
+        "version": update_info.get('available'),
+        "checksum": manifest.get('checksum') or "",
+        "download_url": manifest.get('download_url') or ""
+    }
+
+
+def lower_thread_priority():
+    """Reduz a prioridade de CPU da thread atual (Linux: nice por thread)."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), LOW_PRIORITY_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+class UpdatePrefetcher:
+    """Área de pacotes pré-baixados e verificados, um por tipo de manifest."""
+
+    def __init__(self, updater, staged_dir: Path = None):
+        self.updater = updater
+        self.staged_dir = Path(staged_dir) if staged_dir else updater.data_dir / 'staged'
+        self.index_path = self.staged_dir / 'index.json'
+        self.max_age = int(os.environ.get('HCT_STAGED_MAX_AGE', DEFAULT_MAX_AGE))
+        self.take_wait = TAKE_WAIT
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    # ─── Índice ───────────────────────────────────────────────────────────
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.staged_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _drop(self, manifest_type: str, reason: str):
+        entry = self.entries.pop(manifest_type, None)
+        if not entry:
+            return
+        path = Path(entry['path'])
+        self.updater.forget_digest(path)
+        if path.exists():
+            path.unlink()
+        logger.info("hct-prefetch", "drop", f"Pacote pré-baixado descartado: {manifest_type}", {
+            "version": entry.get('version'),
+            "reason": reason
+        })
+
+    def _valid(self, manifest_type: str, update_info: Dict[str, Any]) -> bool:
+        """Entrada existe, corresponde à atualização e o arquivo não mudou desde a verificação."""
+        entry = self.entries.get(manifest_type)
+        if not entry:
+            return False
+        if {k: entry.get(k) for k in ("version", "checksum", "download_url")} != release_key(update_info):
+            return False
+        try:
+            st = Path(entry['path']).stat()
+        except OSError:
+            return False
+        return st.st_size == entry.get('size') and st.st_mtime_ns == entry.get('mtime_ns')
+
+    def status(self) -> Dict[str, Any]:
+        """Pacotes prontos para aplicação e estado do pré-download."""
+        with self._lock:
+            return {
+                "enabled": prefetch_enabled(),
+                "running": not self._idle.is_set(),
+                "staged": {
+                    t: {k: e.get(k) for k in ("version", "size", "staged_at", "verified")}
+                    for t, e in self.entries.items()
+                }
+            }
+
+    # ─── Limpeza ──────────────────────────────────────────────────────────
+
+    def prune(self, updates: List[Dict[str, Any]] = None):
+        """
+        Remove pacotes antigos, substituídos ou que não estão mais pendentes
+        (updates=None: só idade e arquivos corrompidos/ausentes).
+        """
+        pending = {u['type']: u for u in updates} if updates is not None else None
+        now = time.time()
+
+        with self._lock:
+            for manifest_type, entry in list(self.entries.items()):
+                if now - entry.get('staged_ts', 0) > self.max_age:
+                    self._drop(manifest_type, "stale")
+                elif pending is not None and manifest_type not in pending:
+                    self._drop(manifest_type, "not_pending")
+                elif pending is not None and not self._valid(manifest_type, pending[manifest_type]):
+                    self._drop(manifest_type, "superseded")
+                elif not Path(entry['path']).exists():
+                    self._drop(manifest_type, "missing")
+
+            # Arquivos órfãos (ex.: download interrompido)
+            known = {Path(e['path']).name for e in self.entries.values()}
+            if self.staged_dir.is_dir():
+                for item in self.staged_dir.iterdir():
+                    if item.is_file() and item.name != self.index_path.name and item.name not in known:
+                        item.unlink()
+            self._save()
+
+    # ─── Pré-download ─────────────────────────────────────────────────────
+
+    def stage(self, update_info: Dict[str, Any]) -> bool:
+        """Baixa e verifica o pacote de uma atualização (bloqueante)."""
+        manifest_type = update_info['type']
+        with self._lock:
+            if self._valid(manifest_type, update_info):
+                return True
+
+        self.staged_dir.mkdir(parents=True, exist_ok=True)
+        manifest = update_info['manifest']
+        logger.info("hct-prefetch", "stage", f"Pré-baixando atualização {manifest_type}", {
+            "version": update_info.get('available')
+        })
+
+        package_path = self.updater.download_package(manifest, directory=self.staged_dir, cancel=self._cancel)
+        if not package_path:
+            return False
+
+        checksum = manifest.get('checksum')
+        if checksum and not self.updater.verify_checksum(package_path, checksum):
+            self.updater.discard_package(package_path)
+            return False
+
+        target = self.staged_dir / f"{manifest_type}-{update_info.get('available')}.zip".replace('/', '_')
+        digest = self.updater.forget_digest(package_path)
+
+        with self._lock:
+            self._drop(manifest_type, "superseded")
+            os.replace(package_path, target)
+            st = target.stat()
+            self.entries[manifest_type] = dict(
+                release_key(update_info),
+                path=str(target),
+                size=st.st_size,
+                mtime_ns=st.st_mtime_ns,
+                sha256=digest,
+                verified=bool(checksum),
+                staged_ts=time.time(),
+                staged_at=datetime.now().isoformat(timespec='seconds')
+            )
+            self._save()
+
+        logger.success("hct-prefetch", "stage", f"Atualização {manifest_type} pronta para aplicar", {
+            "version": update_info.get('available'),
+            "size": st.st_size
+        })
+        return True
+
+    def _worker(self):
+        lower_thread_priority()
+        try:
+            while True:
+                with self._lock:
+                    updates, self._pending = self._pending, None
+                if updates is None:
+                    break
+                self.prune(updates)
+                for update_info in updates:
+                    if self._cancel.is_set():
+                        break
+                    try:
+                        self.stage(update_info)
+                    except Exception as e:
+                        logger.warning("hct-prefetch", "stage", f"Falha no pré-download de {update_info['type']}", {
+                            "error": str(e)
+                        })
+        finally:
+            with self._lock:
+                self._thread = None
+                self._cancel.clear()
+                self._idle.set()
+
+    def start(self, updates: List[Dict[str, Any]]):
+        """
+        Agenda o pré-download em thread de baixa prioridade. Se já houver um
+        em andamento, a lista mais recente é processada em seguida.
+        """
+        if not prefetch_enabled():
+            return
+        with self._lock:
+            self._pending = list(updates)
+            self._cancel.clear()
+            if self._thread is not None:
+                return
+            self._idle.clear()
+            self._thread = threading.Thread(target=self._worker, name="hct-prefetch", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._idle.wait(timeout)
+
+    def cancel(self):
+        """Interrompe o pré-download em andamento (a lista pendente é descartada)."""
+        with self._lock:
+            self._pending = None
+            self._cancel.set()
+
+    # ─── Consumo ──────────────────────────────────────────────────────────
+
+    def staged(self, update_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cópia da entrada pré-baixada válida para a atualização (sem consumi-la), ou None."""
+        with self._lock:
+            if not self._valid(update_info['type'], update_info):
+                return None
+            return dict(self.entries[update_info['type']])
+
+    def take(self, update_info: Dict[str, Any]) -> Optional[Path]:
+        """
+        Entrega o pacote pré-baixado da atualização (ou None). O arquivo passa
+        a pertencer ao chamador (removido por HCTUpdater.discard_package).
+        """
+        # Um pré-download quase pronto vale a espera; um lento (baixa prioridade,
+        # banda limitada) é cancelado e o chamador baixa normalmente
+        if not self._idle.is_set():
+            logger.info("hct-prefetch", "take", "Aguardando pré-download em andamento", {
+                "timeout_s": self.take_wait
+            })
+            if not self._idle.wait(self.take_wait):
+                logger.info("hct-prefetch", "take", "Pré-download cancelado para a aplicação")
+                self.cancel()
+
+        manifest_type = update_info['type']
+        with self._lock:
+            if not self._valid(manifest_type, update_info):
+                return None
+            entry = self.entries.pop(manifest_type)
+            self._save()
+
+        path = Path(entry['path'])
+        if entry.get('sha256'):
+            # Hash já verificado; verify_checksum não relê o arquivo
+            self.updater.remember_digest(path, entry['sha256'])
+        logger.info("hct-prefetch", "take", f"Usando pacote pré-baixado de {manifest_type}", {
+            "version": entry.get('version')
+        })
+        return path
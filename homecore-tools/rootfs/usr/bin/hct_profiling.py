@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Profiling Sob Demanda
+cProfile e tracemalloc armados pela API para o próximo ciclo de verificação,
+a próxima atualização ou uma janela de tempo
+
+Sem profiler armado, as funções instrumentadas (@profiled) custam uma única
+verificação de atributo (cProfile, pstats e tracemalloc só são importados
+ao armar). Resultados ficam em $HCT_DATA_DIR/profiles como
+<id>.json (resumo: funções mais caras e maiores alocações) e <id>.pstats.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+
+logger = get_logger("hct-profiler")
+
+TARGETS = ('check_and_update', 'update', 'window')
+MAX_WINDOW_SECONDS = 3600
+KEEP_RESULTS = 10
+
+
+class ProfileSession:
+    """Um pedido de profiling: armado, depois em execução, depois salvo."""
+
+    def __init__(self, target: str, seconds: Optional[float], top: int, memory: bool):
+        self.target = target
+        self.seconds = seconds
+        self.top = top
+        self.memory = memory
+        self.armed_at = datetime.now().isoformat(timespec='seconds')
+        self.started: Optional[float] = None
+        self.started_at: Optional[str] = None
+        self.stats = None  # pstats.Stats acumulado das chamadas
+        self.calls = 0
+        self.skipped = 0
+        self.owns_tracemalloc = False
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "target": self.target,
+            "seconds": self.seconds,
+            "memory": self.memory,
+            "armed_at": self.armed_at,
+            "running": self.started is not None,
+            "calls": self.calls
+        }
+
+
+class Profiler:
+    """Coordena a sessão armada e os resultados salvos."""
+
+    def __init__(self, results_dir: Path = None):
+        self.results_dir = Path(results_dir) if results_dir else \
+            Path(os.environ.get('HCT_DATA_DIR', '/data')) / 'profiles'
+        # Verificado no caminho rápido de @profiled: None = desarmado
+        self.session: Optional[ProfileSession] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._timer: Optional[threading.Timer] = None
+
+    # ─── Controle ─────────────────────────────────────────────────────────
+
+    def arm(self, target: str, seconds: float = None, top: int = 30, memory: bool = True) -> Dict[str, Any]:
+        """Arma o profiler; "window" começa já e termina após `seconds`."""
+        if target not in TARGETS:
+            raise ValueError(f"Alvo inválido: {target} (use {', '.join(TARGETS)})")
+        if target == 'window' and not (seconds and 0 < seconds <= MAX_WINDOW_SECONDS):
+            raise ValueError(f"Janela requer seconds entre 1 e {MAX_WINDOW_SECONDS}")
+
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError("Já existe um profiling armado ou em execução")
+            session = ProfileSession(target, seconds if target == 'window' else None, top, memory)
+            self.session = session
+
+        logger.info("hct-profiler", "arm", f"Profiling armado: {target}", session.describe())
+
+        if target == 'window':
+            self._start(session)
+            self._timer = threading.Timer(seconds, self.finish, args=(session,))
+            self._timer.daemon = True
+            self._timer.start()
+        return session.describe()
+
+    def disarm(self) -> Optional[Dict[str, Any]]:
+        """Cancela a sessão; uma sessão já em execução é finalizada e salva."""
+        with self._lock:
+            session = self.session
+        if session is None:
+            return None
+        if self._timer:
+            self._timer.cancel()
+        if session.started is not None:
+            return self.finish(session)
+        with self._lock:
+            self.session = None
+        logger.info("hct-profiler", "disarm", "Profiling desarmado")
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        session = self.session
+        return {
+            "armed": session.describe() if session else None,
+            "results": self.list_results()
+        }
+
+    # ─── Execução ─────────────────────────────────────────────────────────
+
+    def _start(self, session: ProfileSession):
+        import tracemalloc
+        session.started = time.perf_counter()
+        session.started_at = datetime.now().isoformat(timespec='seconds')
+        if session.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            session.owns_tracemalloc = True
+
+    def begin(self, target: str) -> Optional[ProfileSession]:
+        """Abre a sessão armada para `target` (ex.: ciclo assíncrono); None se não for o caso."""
+        session = self.session
+        if session is None or session.target != target or session.started is not None:
+            return None
+        with self._lock:
+            if session.started is not None:
+                return None
+            self._start(session)
+        return session
+
+    def end(self, session: Optional[ProfileSession]):
+        if session is not None:
+            self.finish(session)
+
+    def call(self, target: str, func: Callable, args: tuple, kwargs: dict):
+        """Executa `func` com cProfile se a sessão cobre esta chamada."""
+        # Chamada aninhada em thread que já está sendo perfilada
+        if getattr(self._local, 'active', False):
+            return func(*args, **kwargs)
+
+        owner = self.begin(target)
+        session = owner or self.session
+        if session is None or session.started is None:
+            return func(*args, **kwargs)
+
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: um profiler por vez no processo
+            session.skipped += 1
+            profile = None
+
+        self._local.active = profile is not None
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.active = False
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    session.calls += 1
+                    if session.stats is None:
+                        session.stats = pstats.Stats(profile)
+                    else:
+                        session.stats.add(profile)
+            if owner is not None:
+                self.finish(owner)
+
+    def finish(self, session: ProfileSession) -> Optional[Dict[str, Any]]:
+        """Encerra a sessão e grava os resultados (uma única vez)."""
+        with self._lock:
+            if self.session is not session:
+                return None
+            self.session = None
+        self._timer = None
+
+        result = self.summarize(session)
+        try:
+            self.save(session, result)
+        except Exception as e:
+            logger.error("hct-profiler", "save", "Erro ao salvar resultado de profiling", exception=e)
+
+        logger.success("hct-profiler", "finish", f"Profiling concluído: {session.target}", {
+            "id": result["id"],
+            "duration_ms": result["duration_ms"],
+            "calls": result["calls"]
+        })
+        return result
+
+    def summarize(self, session: ProfileSession) -> Dict[str, Any]:
+        import tracemalloc
+        started = session.started or time.perf_counter()
+        result = {
+            "id": f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')[:-3]}-{session.target}",
+            "target": session.target,
+            "started_at": session.started_at,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "calls": session.calls,
+            "skipped_calls": session.skipped,
+            "cpu": top_functions(session.stats, session.top) if session.stats else [],
+            "memory": None
+        }
+
+        if session.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if session.owns_tracemalloc:
+                tracemalloc.stop()
+            result["memory"] = {
+                "current_kb": round(current / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+                "top": top_allocations(snapshot, session.top)
+            }
+        return result
+
+    # ─── Resultados ───────────────────────────────────────────────────────
+
+    def save(self, session: ProfileSession, result: Dict[str, Any]):
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        base = self.results_dir / result["id"]
+        if session.stats is not None:
+            session.stats.dump_stats(str(base.with_suffix('.pstats')))
+        with open(base.with_suffix('.json'), 'w') as f:
+            json.dump(result, f, indent=2)
+
+        # Manter só os mais recentes
+        for old in self.list_results()[KEEP_RESULTS:]:
+            for suffix in ('.json', '.pstats'):
+                path = self.results_dir / f"{old['id']}{suffix}"
+                if path.exists():
+                    path.unlink()
+
+    def list_results(self) -> List[Dict[str, Any]]:
+        if not self.results_dir.is_dir():
+            return []
+        results = []
+        paths = sorted(self.results_dir.glob('*.json'), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+        for path in paths:
+            results.append({
+                "id": path.stem,
+                "pstats": path.with_suffix('.pstats').exists()
+            })
+        return results
+
+    def result_path(self, result_id: str, suffix: str = '.json') -> Optional[Path]:
+        """Arquivo de um resultado (id validado contra a listagem, sem path traversal)."""
+        if result_id not in {r["id"] for r in self.list_results()}:
+            return None
+        path = self.results_dir / f"{result_id}{suffix}"
+        return path if path.exists() else None
+
+
+def top_functions(stats, limit: int) -> List[Dict[str, Any]]:
+    """Funções com maior tempo acumulado."""
+    rows = []
+    for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": name,
+            "file": filename,
+            "line": line,
+            "ncalls": ncalls,
+            "tottime_ms": round(tottime * 1000, 2),
+            "cumtime_ms": round(cumtime * 1000, 2)
+        })
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+def top_allocations(snapshot, limit: int) -> List[Dict[str, Any]]:
+    """Linhas com mais memória alocada e ainda viva."""
+    import tracemalloc
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count
+        }
+        for stat in snapshot.statistics('lineno')[:limit]
+    ]
+
+
+# Profiler do processo
+profiler = Profiler()
+
+
+def profiled(target: str):
+    """Instrumenta uma função como alvo de profiling (custo zero se desarmado)."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if profiler.session is None:
+                return func(*args, **kwargs)
+            return profiler.call(target, func, args, kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Janelas de Manutenção
+Define em quais horários o trabalho pesado (download, backup e aplicação)
+pode rodar; verificações de manifest continuam a qualquer hora
+
+Formato (HCT_MAINTENANCE_WINDOW): "HH:MM-HH:MM", várias separadas por vírgula,
+no horário local. Janelas com fim <= início atravessam a meia-noite
+(ex.: "23:00-05:00"). Vazio = sem restrição.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+_RANGE = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)-([01]?\d|2[0-3]):([0-5]\d)$')
+
+
+class MaintenanceWindow:
+    """Conjunto de faixas horárias diárias (minutos desde a meia-noite)."""
+
+    def __init__(self, spec: str = ""):
+        self.spec = (spec or "").strip()
+        self.ranges: List[Tuple[int, int]] = []
+
+        for part in filter(None, (p.strip() for p in self.spec.split(','))):
+            match = _RANGE.match(part.replace(' ', ''))
+            if not match:
+                raise ValueError(f"Janela de manutenção inválida: {part!r} (use HH:MM-HH:MM)")
+            h1, m1, h2, m2 = (int(g) for g in match.groups())
+            self.ranges.append((h1 * 60 + m1, h2 * 60 + m2))
+
+    @classmethod
+    def from_env(cls) -> 'MaintenanceWindow':
+        return cls(os.environ.get('HCT_MAINTENANCE_WINDOW', ''))
+
+    @property
+    def restricted(self) -> bool:
+        return bool(self.ranges)
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        """Trabalho pesado permitido agora?"""
+        if not self.ranges:
+            return True
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+
+        for start, end in self.ranges:
+            if start < end:
+                if start <= minute < end:
+                    return True
+            elif minute >= start or minute < end:
+                return True
+        return False
+
+    def seconds_until_open(self, now: Optional[datetime] = None) -> float:
+        """Segundos até a próxima abertura (0 se já aberta)."""
+        now = now or datetime.now()
+        if self.is_open(now):
+            return 0.0
+
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        candidates = []
+        for start, _ in self.ranges:
+            opening = midnight + timedelta(minutes=start)
+            if opening <= now:
+                opening += timedelta(days=1)
+            candidates.append((opening - now).total_seconds())
+        return min(candidates)
+
+    def __str__(self) -> str:
+        return self.spec or "sempre"
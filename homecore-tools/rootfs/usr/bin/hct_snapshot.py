@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Snapshots de Atualização
+Backup antes de atualizar e restauração (rollback) atrás de uma interface comum
+
+Backends:
+- files: cópia de /config/hc-tools e dos YAML sensíveis para
+  $HCT_DATA_DIR/backups (comportamento original)
+- supervisor: backup parcial do Supervisor (configuração do Home Assistant,
+  sem o banco de dados) criado como job em segundo plano e acompanhado por
+  polling; aparece em Configurações > Sistema > Backups
+
+Com backup_backend: supervisor, falhas do Supervisor (sem token, API
+indisponível, job com erro ou tempo esgotado) caem na cópia de arquivos.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+
+logger = get_logger("hct-snapshot")
+
+# Arquivos da raiz de /config copiados junto com hc-tools
+BACKUP_FILES = ('configuration.yaml', 'automations.yaml', 'scripts.yaml', 'scenes.yaml')
+
+# Espera máxima por um job do Supervisor (backup ou restauração)
+JOB_TIMEOUT = 1800
+POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 5.0
+
+# Backups do Supervisor criados pelo add-on mantidos (os mais antigos são apagados)
+KEEP_SUPERVISOR_SNAPSHOTS = 3
+
+
+def tree_size(path: Path) -> int:
+    """Bytes de arquivos regulares sob `path` (sem seguir links)."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if not os.path.islink(os.path.join(root, name)):
+                total += st.st_size
+    return total
+
+
+def backup_size(info: Dict[str, Any]) -> int:
+    """Bytes de um backup na resposta do Supervisor (size_bytes, ou size em MB nas versões antigas)."""
+    if info.get('size_bytes'):
+        return int(info['size_bytes'])
+    return int(float(info.get('size') or 0) * 1024 * 1024)
+
+
+class SnapshotError(Exception):
+    """Falha ao criar ou restaurar um snapshot."""
+
+
+class Snapshot:
+    """Um backup criado antes da atualização: backend e referência (diretório ou slug)."""
+
+    def __init__(self, backend: str, ref: str, name: str, created_at: str = None):
+        self.backend = backend
+        self.ref = ref
+        self.name = name
+        self.created_at = created_at or datetime.now().isoformat(timespec='seconds')
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "ref": self.ref,
+            "name": self.name,
+            "created_at": self.created_at
+        }
+
+    def __str__(self) -> str:
+        return f"{self.backend}:{self.ref}"
+
+
+class SnapshotBackend:
+    """Interface comum: create() -> Snapshot e restore(snapshot)."""
+
+    name = ''
+    # Chave da vazão em ThroughputHistory (estimativa de tempo do planejador)
+    rate_kind = 'backup'
+
+    def __init__(self, updater):
+        self.updater = updater
+
+    def available(self) -> bool:
+        return True
+
+    @property
+    def target_dir(self) -> Path:
+        """Onde os snapshots são gravados (estimativa de espaço do planejador)."""
+        raise NotImplementedError
+
+    def estimate_bytes(self) -> int:
+        """Tamanho estimado do snapshot (espaço em target_dir e tempo, no planejador)."""
+        raise NotImplementedError
+
+    def create(self, label: str = None) -> Snapshot:
+        raise NotImplementedError
+
+    def restore(self, snapshot: Snapshot):
+        raise NotImplementedError
+
+
+class FileSnapshotBackend(SnapshotBackend):
+    """Cópia de hc-tools e dos YAML sensíveis para $HCT_DATA_DIR/backups."""
+
+    name = 'files'
+
+    @property
+    def target_dir(self) -> Path:
+        return self.updater.backups_dir
+
+    def estimate_bytes(self) -> int:
+        config_dir = self.updater.config_dir
+        total = tree_size(config_dir / 'hc-tools') if (config_dir / 'hc-tools').exists() else 0
+        for name in BACKUP_FILES:
+            try:
+                total += (config_dir / name).stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def reserve_dir(self) -> Path:
+        """Cria o diretório do backup; sufixo _2, _3... se já houver um no mesmo segundo."""
+        self.target_dir.mkdir(parents=True, exist_ok=True)
+        base = f"hc-tools_backup_{datetime.now().strftime('%Y%m%dT%H%M%S')}"
+        attempt = 1
+        while True:
+            backup_dir = self.target_dir / (base if attempt == 1 else f"{base}_{attempt}")
+            try:
+                backup_dir.mkdir()
+                return backup_dir
+            except FileExistsError:
+                attempt += 1
+
+    def create(self, label: str = None) -> Snapshot:
+        updater = self.updater
+        backup_dir = self.reserve_dir()
+
+        logger.info("hct-snapshot", "create_backup", "Criando backup", {
+            "backend": self.name,
+            "backup_dir": str(backup_dir)
+        })
+
+        copied = 0
+
+        def copy_counted(src, dst):
+            nonlocal copied
+            result = shutil.copy2(src, dst)
+            copied += os.path.getsize(src)
+            return result
+
+        try:
+            started = time.perf_counter()
+
+            # Backup do diretório hc-tools
+            source_dir = updater.config_dir / 'hc-tools'
+            if source_dir.exists():
+                shutil.copytree(source_dir, backup_dir, copy_function=copy_counted, dirs_exist_ok=True)
+
+            # Backup de arquivos sensíveis
+            for filename in BACKUP_FILES:
+                source_file = updater.config_dir / filename
+                if source_file.exists():
+                    copy_counted(source_file, backup_dir / filename)
+
+            updater.throughput.record(self.rate_kind, copied, time.perf_counter() - started)
+        except Exception:
+            shutil.rmtree(backup_dir, ignore_errors=True)
+            raise
+
+        return Snapshot(self.name, str(backup_dir), label or backup_dir.name)
+
+    def restore(self, snapshot: Snapshot):
+        backup_dir = Path(snapshot.ref)
+        if not backup_dir.is_dir():
+            raise SnapshotError(f"Backup não encontrado: {backup_dir}")
+
+        # Restaurar hc-tools
+        target_dir = self.updater.config_dir / 'hc-tools'
+        if target_dir.exists():
+            shutil.rmtree(target_dir)
+
+        shutil.copytree(backup_dir, target_dir)
+
+        # Restaurar arquivos sensíveis
+        for item in backup_dir.iterdir():
+            if item.is_file() and item.suffix == '.yaml':
+                shutil.copy2(item, self.updater.config_dir / item.name)
+
+
+class SupervisorSnapshotBackend(SnapshotBackend):
+    """Backup parcial do Supervisor (pasta de configuração do Home Assistant)."""
+
+    name = 'supervisor'
+    rate_kind = 'snapshot'
+
+    def __init__(self, updater, url: str = None, token: str = None):
+        super().__init__(updater)
+        self.url = (url or os.environ.get('HCT_SUPERVISOR_URL', 'http://supervisor')).rstrip('/')
+        self.token = token if token is not None else os.environ.get('SUPERVISOR_TOKEN')
+        self.job_timeout = JOB_TIMEOUT
+        self.poll_interval = POLL_INTERVAL
+        self.keep = KEEP_SUPERVISOR_SNAPSHOTS
+        self.state_file = updater.data_dir / 'snapshots.json'
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return bool(self.token)
+
+    @property
+    def target_dir(self) -> Path:
+        return Path('/backup')
+
+    def estimate_bytes(self) -> int:
+        """
+        Tamanho (comprimido) informado pelo Supervisor para o último backup do
+        add-on ou, sem ele, para o backup mais recente com a configuração do
+        Home Assistant. Sem varrer /config: 0 se nenhum tamanho for conhecido
+        (o próprio Supervisor recusa backups sem espaço, e o create() cai na
+        cópia de arquivos).
+        """
+        for entry in reversed(self.load_state()):
+            if entry.get('size'):
+                return int(entry['size'])
+        if not self.available():
+            return 0
+        try:
+            backups = self.call('GET', '/backups', timeout=10).get('backups') or []
+        except Exception:
+            return 0
+        backups = [b for b in backups if (b.get('content') or {}).get('homeassistant')]
+        if not backups:
+            return 0
+        return backup_size(max(backups, key=lambda b: b.get('date') or ''))
+
+    # ─── API do Supervisor ────────────────────────────────────────────────
+
+    def call(self, method: str, path: str, payload: Dict[str, Any] = None, timeout: float = 30) -> Dict[str, Any]:
+        """Chamada à API do Supervisor; devolve o campo "data" ou levanta SnapshotError."""
+        headers = {'Authorization': f'Bearer {self.token}'}
+        body = None
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(payload).encode('utf-8')
+
+        with self.updater.http.request(method, f"{self.url}{path}", headers=headers, data=body,
+                                       timeout=timeout, raise_for_status=False) as response:
+            try:
+                result = response.json()
+            except ValueError:
+                result = {}
+
+        if response.status >= 400 or result.get('result') != 'ok':
+            raise SnapshotError(f"Supervisor {method} {path}: HTTP {response.status} "
+                                f"{result.get('message') or ''}".strip())
+        return result.get('data') or {}
+
+    def wait_job(self, job_id: str) -> Dict[str, Any]:
+        """Acompanha um job em segundo plano até terminar (intervalo crescente até 5 s)."""
+        deadline = time.monotonic() + self.job_timeout
+        interval = self.poll_interval
+        while True:
+            job = self.call('GET', f"/jobs/{job_id}", timeout=10)
+            if job.get('done'):
+                errors = job.get('errors') or []
+                if errors:
+                    raise SnapshotError("; ".join(e.get('message', str(e)) for e in errors))
+                return job
+            if time.monotonic() > deadline:
+                raise SnapshotError(f"Job {job_id} não concluído em {self.job_timeout}s "
+                                    f"(progresso {job.get('progress', 0)}%)")
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    # ─── Snapshots ────────────────────────────────────────────────────────
+
+    def create(self, label: str = None) -> Snapshot:
+        if not self.available():
+            raise SnapshotError("SUPERVISOR_TOKEN não disponível")
+
+        name = f"HomeCore Tools - {label or 'antes da atualização'} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        logger.info("hct-snapshot", "create_backup", "Solicitando backup parcial ao Supervisor", {
+            "backend": self.name,
+            "name": name
+        })
+
+        started = time.perf_counter()
+        data = self.call('POST', '/backups/new/partial', {
+            "name": name,
+            "homeassistant": True,
+            "homeassistant_exclude_database": True,
+            "compressed": True,
+            "background": True
+        }, timeout=60)
+
+        # Com background o Supervisor devolve o job; versões antigas esperam e devolvem o slug
+        slug = data.get('slug')
+        if data.get('job_id'):
+            slug = self.wait_job(data['job_id']).get('reference') or slug
+        if not slug:
+            raise SnapshotError("Supervisor não informou o backup criado")
+        elapsed = time.perf_counter() - started
+
+        # Tamanho do backup criado: próxima estimativa de espaço e vazão do snapshot
+        try:
+            size = backup_size(self.call('GET', f"/backups/{slug}/info", timeout=10))
+        except Exception:
+            size = 0
+        if size:
+            self.updater.throughput.record(self.rate_kind, size, elapsed)
+
+        snapshot = Snapshot(self.name, slug, name)
+        self.remember(snapshot, size)
+        return snapshot
+
+    def restore(self, snapshot: Snapshot):
+        if not self.available():
+            raise SnapshotError("SUPERVISOR_TOKEN não disponível")
+
+        logger.info("hct-snapshot", "rollback", "Solicitando restauração ao Supervisor", {
+            "slug": snapshot.ref
+        })
+        data = self.call('POST', f"/backups/{snapshot.ref}/restore/partial", {
+            "homeassistant": True,
+            "background": True
+        }, timeout=60)
+        if data.get('job_id'):
+            self.wait_job(data['job_id'])
+
+    # ─── Retenção ─────────────────────────────────────────────────────────
+
+    def load_state(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f).get('supervisor', [])
+        except (OSError, ValueError):
+            return []
+
+    def remember(self, snapshot: Snapshot, size: int = 0):
+        """Registra o backup e apaga os mais antigos criados pelo add-on (nunca os do usuário)."""
+        with self._lock:
+            entries = self.load_state() + [dict(snapshot.describe(), size=size or None)]
+            expired, entries = entries[:-self.keep], entries[-self.keep:]
+
+            for entry in expired:
+                try:
+                    self.call('DELETE', f"/backups/{entry['ref']}", timeout=30)
+                except Exception as e:
+                    logger.warning("hct-snapshot", "cleanup", "Falha ao remover backup antigo do Supervisor", {
+                        "slug": entry['ref'],
+                        "error": str(e)
+                    })
+
+            try:
+                self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.state_file, 'w') as f:
+                    json.dump({"supervisor": entries}, f, indent=2)
+            except OSError as e:
+                logger.warning("hct-snapshot", "cleanup", "Falha ao salvar registro de backups", {
+                    "error": str(e)
+                })
+
+
+class SnapshotManager:
+    """Escolhe o backend configurado, com a cópia de arquivos como alternativa."""
+
+    def __init__(self, updater, backend: str = None):
+        self.files = FileSnapshotBackend(updater)
+        self.backends: Dict[str, SnapshotBackend] = {
+            'files': self.files,
+            'supervisor': SupervisorSnapshotBackend(updater)
+        }
+        configured = (backend or os.environ.get('HCT_BACKUP_BACKEND') or 'files').lower()
+        if configured not in self.backends:
+            logger.warning("hct-snapshot", "init", f"Backend de backup desconhecido: {configured}, usando files")
+            configured = 'files'
+        self.preferred = self.backends[configured]
+
+    @property
+    def active(self) -> SnapshotBackend:
+        """Backend que create() tenta primeiro (o configurado, se disponível)."""
+        return self.preferred if self.preferred.available() else self.files
+
+    def create(self, label: str = None) -> Optional[Snapshot]:
+        """Cria o snapshot no backend configurado; cai na cópia de arquivos se falhar."""
+        chain = [self.preferred] if self.preferred is self.files else [self.preferred, self.files]
+        for backend in chain:
+            started = time.perf_counter()
+            try:
+                snapshot = backend.create(label)
+            except Exception as e:
+                logger.error("hct-snapshot", "create_backup", f"Erro ao criar backup ({backend.name})", exception=e)
+                continue
+
+            if backend is not self.preferred:
+                logger.warning("hct-snapshot", "create_backup", "Backup criado pela cópia de arquivos (alternativa)", {
+                    "preferred": self.preferred.name
+                })
+            logger.success("hct-snapshot", "create_backup", "Backup criado com sucesso", dict(
+                snapshot.describe(), duration_ms=round((time.perf_counter() - started) * 1000, 1)
+            ))
+            return snapshot
+        return None
+
+    def restore(self, snapshot: Snapshot) -> bool:
+        """Restaura pelo mesmo backend que criou o snapshot."""
+        backend = self.backends.get(snapshot.backend)
+        if backend is None:
+            logger.error("hct-snapshot", "rollback", f"Backend desconhecido: {snapshot.backend}")
+            return False
+
+        logger.warning("hct-snapshot", "rollback", "Iniciando rollback", snapshot.describe())
+        try:
+            backend.restore(snapshot)
+        except Exception as e:
+            logger.error("hct-snapshot", "rollback", "Erro ao fazer rollback", exception=e)
+            return False
+
+        logger.success("hct-snapshot", "rollback", "Rollback concluído com sucesso", {
+            "backend": snapshot.backend
+        })
+        return True
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Área de Staging
+Diretório gerenciado para downloads e extrações temporárias, em disco
+(não no /tmp, que pode ser tmpfs em RAM) e com verificação de espaço livre
+antes de baixar ou extrair
+
+Local: HCT_STAGING_DIR, ou $HCT_DATA_DIR/staging. Os nomes levam o PID do
+processo (hct_dl_<pid>_*, hct_extract_<pid>_*): na inicialização do daemon,
+artefatos de processos que não existem mais são removidos, assim como os
+deixados no /tmp por versões anteriores.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+sys.path.insert(0, '/usr/bin')
+from hct_logger import get_logger
+
+logger = get_logger("hct-staging")
+
+DOWNLOAD_PREFIX = 'hct_dl_'
+EXTRACT_PREFIX = 'hct_extract_'
+
+# Margem mantida livre além do necessário (logs, banco do HA, etc.)
+RESERVE_BYTES = 32 * 1024 * 1024
+
+# Artefatos sem PID (versões anteriores, no /tmp) só são removidos após esse tempo
+LEGACY_MIN_AGE = 3600
+
+
+class InsufficientSpace(OSError):
+    """Espaço livre insuficiente na área de staging."""
+
+
+def default_staging_dir() -> Path:
+    configured = os.environ.get('HCT_STAGING_DIR')
+    if configured:
+        return Path(configured)
+    return Path(os.environ.get('HCT_DATA_DIR', '/data')) / 'staging'
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_pid(name: str) -> Optional[int]:
+    """PID no nome de um artefato (hct_dl_<pid>_*), ou None se não for nosso."""
+    for prefix in (DOWNLOAD_PREFIX, EXTRACT_PREFIX):
+        if name.startswith(prefix):
+            pid = name[len(prefix):].split('_', 1)[0]
+            return int(pid) if pid.isdigit() else 0
+    return None
+
+
+def is_tmpfs(path: Path) -> bool:
+    """O diretório está em tmpfs (RAM)? Ponto de montagem mais longo em /proc/mounts."""
+    try:
+        resolved = str(Path(path).resolve())
+        best, fstype = "", ""
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount = fields[1]
+                if (resolved == mount or resolved.startswith(mount.rstrip('/') + '/')) and len(mount) > len(best):
+                    best, fstype = mount, fields[2]
+        return fstype in ('tmpfs', 'ramfs')
+    except OSError:
+        return False
+
+
+def path_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class StagingArea:
+    """Temporários de download/extração com checagem de espaço e limpeza de órfãos."""
+
+    def __init__(self, root: Path = None, reserve: int = RESERVE_BYTES):
+        self.root = Path(root) if root else default_staging_dir()
+        self.reserve = reserve
+
+    def ensure_dir(self) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return self.root
+
+    # ─── Espaço ───────────────────────────────────────────────────────────
+
+    def free_bytes(self) -> int:
+        return shutil.disk_usage(self.ensure_dir()).free
+
+    def ensure_space(self, required: int, what: str, directory: Path = None):
+        """Levanta InsufficientSpace se `required` bytes (+ margem) não couberem."""
+        if not required:
+            return
+        target = Path(directory) if directory else self.ensure_dir()
+        free = shutil.disk_usage(target).free
+        if required + self.reserve > free:
+            logger.error("hct-staging", "preflight", f"Espaço insuficiente para {what}", {
+                "path": str(target),
+                "required": required,
+                "reserve": self.reserve,
+                "free": free
+            })
+            raise InsufficientSpace(
+                f"Espaço insuficiente em {target} para {what}: "
+                f"{required} bytes necessários (+{self.reserve} de margem), {free} livres"
+            )
+
+    # ─── Temporários ──────────────────────────────────────────────────────
+
+    def mkstemp(self, suffix: str = '', directory: Path = None) -> tuple:
+        """(fd, caminho) de um arquivo temporário de download."""
+        return tempfile.mkstemp(
+            prefix=f"{DOWNLOAD_PREFIX}{os.getpid()}_",
+            suffix=suffix,
+            dir=directory or self.ensure_dir()
+        )
+
+    def mkdtemp(self) -> Path:
+        """Diretório temporário de extração."""
+        return Path(tempfile.mkdtemp(prefix=f"{EXTRACT_PREFIX}{os.getpid()}_", dir=self.ensure_dir()))
+
+    # ─── Limpeza e uso ────────────────────────────────────────────────────
+
+    def orphans(self, include_own: bool = False):
+        """
+        Artefatos de processos encerrados (e os do /tmp de versões anteriores).
+        Com include_own, os que têm o PID deste processo também: após reiniciar
+        o container o daemon costuma receber o mesmo PID da execução anterior.
+        """
+        own_pid = os.getpid()
+        if self.root.is_dir():
+            for item in self.root.iterdir():
+                pid = owner_pid(item.name)
+                if pid is None:
+                    continue
+                if not (pid and pid_alive(pid)) or (include_own and pid == own_pid):
+                    yield item
+
+        # Versões anteriores extraíam e baixavam no /tmp sem marcar o processo
+        legacy = Path(tempfile.gettempdir())
+        if legacy != self.root and legacy.is_dir():
+            cutoff = time.time() - LEGACY_MIN_AGE
+            for item in legacy.iterdir():
+                extract_dir = item.name.startswith(EXTRACT_PREFIX) and owner_pid(item.name) == 0
+                package = item.name.startswith('tmp') and item.suffix == '.zip'
+                if not (extract_dir or package):
+                    continue
+                try:
+                    if item.stat().st_mtime < cutoff:
+                        yield item
+                except OSError:
+                    pass
+
+    def cleanup_orphans(self, include_own: bool = False) -> Dict[str, Any]:
+        """Remove artefatos órfãos (ver orphans)."""
+        removed, freed = 0, 0
+        for item in list(self.orphans(include_own)):
+            try:
+                size = path_size(item)
+                if item.is_dir():
+                    shutil.rmtree(item)
+                else:
+                    item.unlink()
+                removed += 1
+                freed += size
+            except OSError as e:
+                logger.warning("hct-staging", "cleanup", "Falha ao remover artefato órfão", {
+                    "path": str(item),
+                    "error": str(e)
+                })
+
+        if removed:
+            logger.info("hct-staging", "cleanup", "Artefatos órfãos removidos", {
+                "removed": removed,
+                "freed_bytes": freed
+            })
+        return {"removed": removed, "freed_bytes": freed}
+
+    def prepare(self) -> Dict[str, Any]:
+        """
+        Inicialização, antes de qualquer download deste processo: remove órfãos
+        (inclusive com o PID atual) e avisa se o staging estiver em RAM.
+        """
+        result = self.cleanup_orphans(include_own=True)
+        if is_tmpfs(self.ensure_dir()):
+            logger.warning("hct-staging", "startup", "Área de staging em tmpfs (RAM): pacotes grandes consomem memória", {
+                "path": str(self.root)
+            })
+        return result
+
+    def usage(self) -> Dict[str, Any]:
+        """Uso da área de staging e espaço do sistema de arquivos."""
+        entries, used = 0, 0
+        if self.root.is_dir():
+            for item in self.root.iterdir():
+                entries += 1
+                used += path_size(item)
+        anchor = self.root if self.root.is_dir() else self.root.parent
+        disk = shutil.disk_usage(anchor) if anchor.exists() else None
+        return {
+            "path": str(self.root),
+            "entries": entries,
+            "bytes": used,
+            "free": disk.free if disk else None,
+            "total": disk.total if disk else None,
+            "tmpfs": is_tmpfs(anchor) if anchor.exists() else False
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+HomeCore Tools - Perfil de Inicialização
+Mede as fases do boot do daemon e o custo dos imports até a primeira verificação
+
+Ativado com HCT_STARTUP_PROFILE=true ou `hct_daemon.py --startup-profile`; o
+resultado é um único registro de log estruturado (action "startup_profile").
+Este módulo só usa a stdlib leve para poder ser o primeiro import do daemon.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+def process_age_ms() -> Optional[float]:
+    """Tempo desde a criação do processo (Linux /proc; resolução de 1 tick)."""
+    try:
+        with open('/proc/self/stat') as f:
+            # Campos após "(comm)": o 1º é state (campo 3), starttime é o campo 22
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return round((uptime - started) * 1000, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """Cronômetro de fases e imports do boot."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # Interpretador + imports anteriores a este módulo
+        self.interpreter_ms = process_age_ms()
+        self.modules_at_start = len(sys.modules)
+        self.phases = {}
+        self.imports = {}
+        self.reported = False
+
+    @property
+    def enabled(self) -> bool:
+        return os.environ.get('HCT_STARTUP_PROFILE', 'false').lower() in ('1', 'true', 'yes', 'on')
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mede uma fase do boot (token, updater, API, primeira verificação...)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    @contextmanager
+    def importing(self, name: str):
+        """Mede o custo de um import (tempo e módulos carregados)."""
+        started = time.perf_counter()
+        modules = len(sys.modules)
+        try:
+            yield
+        finally:
+            # Mantém a primeira medição (reimport do mesmo módulo custa ~0)
+            self.imports.setdefault(name, {
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+                "modules": len(sys.modules) - modules
+            })
+
+    def report(self, logger, **details):
+        """Registra o perfil uma única vez (se habilitado)."""
+        if self.reported or not self.enabled:
+            return
+        self.reported = True
+
+        since_start = self.elapsed_ms()
+        logger.info("hct-daemon", "startup_profile", "Perfil de inicialização", {
+            "interpreter_ms": self.interpreter_ms,
+            "time_to_first_check_ms": round(since_start + (self.interpreter_ms or 0), 1),
+            "since_first_import_ms": since_start,
+            "phases_ms": self.phases,
+            "imports": self.imports,
+            "modules_loaded": len(sys.modules),
+            "modules_at_start": self.modules_at_start,
+            **details
+        })
+
+
+# Perfil do processo (criado no primeiro import)
+profile = StartupProfile()
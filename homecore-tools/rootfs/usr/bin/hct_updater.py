@@ -7,43 +7,78 @@ Gerenciamento de atualizações automáticas via manifests
 import os
 import sys
 import json
+import time
 import shutil
+import threading
 import hashlib
-import tempfile
-import subprocess
+import zipfile
 from pathlib import Path
-from datetime import datetime
 from typing import Optional, Dict, Any
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
 
 # Importar logger
 sys.path.insert(0, '/usr/bin')
 from hct_logger import get_logger
+from hct_http import get_http_client, HTTPStatusError, TokenBucket, DownloadCancelled
+from hct_metrics import registry as metrics, instrument
+from hct_profiling import profiled
+from hct_staging import StagingArea, InsufficientSpace
+from hct_snapshot import SnapshotManager, Snapshot
 
 logger = get_logger("hct-updater")
 
+DOWNLOAD_BYTES = metrics.counter(
+    "hct_download_bytes_total", "Bytes baixados de pacotes de atualização")
+DOWNLOAD_THROUGHPUT = metrics.gauge(
+    "hct_download_throughput_bytes_per_second", "Vazão do último download concluído")
+
 
 class HCTUpdater:
     """Sistema de atualização automática para HomeCore Tools."""
     
+    manifest_types = ('core', 'hcc', 'molsmart')
+    
     def __init__(self, token: str):
         self.token = token
-        self.api_base = "https://homecore.com.br/api"
+        self.api_base = os.environ.get('HCT_API_BASE', "https://homecore.com.br/api")
         self.config_dir = Path(os.environ.get('HCT_CONFIG_DIR', '/config'))
         self.data_dir = Path(os.environ.get('HCT_DATA_DIR', '/data'))
         self.manifests_dir = self.data_dir / 'manifests'
         self.backups_dir = self.data_dir / 'backups'
+        self.staging = StagingArea()
+        self.snapshots = SnapshotManager(self)
         self.max_retries = 3
         self.retry_delay = 5
+        self.http = get_http_client()
         
-        # Criar diretórios
-        self.manifests_dir.mkdir(parents=True, exist_ok=True)
-        self.backups_dir.mkdir(parents=True, exist_ok=True)
+        # Inatividade máxima do socket em downloads (não limita a duração total)
+        self.download_timeout = 300
+        
+        # Limite de banda para pacotes (bytes/s, 0 = sem limite), compartilhado
+        # entre downloads simultâneos (pré-download, aplicação, reparo)
+        rate_limit = int(os.environ.get('HCT_DOWNLOAD_RATE_LIMIT', '0') or 0)
+        self.download_limiter = TokenBucket(rate_limit) if rate_limit > 0 else None
+        
+        # SHA-256 calculado durante o download, por arquivo
+        self._digests: Dict[Path, str] = {}
+        
+        # Handlers de componentes (core, hcc, api, mushroom...)
+        self.components: Dict[str, Any] = {}
+        
+        # Pacotes pré-baixados (hct_prefetch), criado sob demanda
+        self._prefetcher = None
+        
+        # Cache de pacotes (hct_cache); False = ainda não carregado
+        self._package_cache = False
+        
+        # Vazão recente de download/backup/aplicação (hct_planner), sob demanda
+        self._throughput = None
+        
+        # Diretórios em /data são criados sob demanda (manifests, backups)
     
+    @instrument("fetch_manifest")
     def fetch_remote_manifest(self, manifest_type: str) -> Optional[Dict[str, Any]]:
         """Busca manifest remoto da API."""
-        url = f"{self.api_base}/manifests/{self.token}/{manifest_type}_manifest.json"
+        url = self.manifest_url(manifest_type)
         
         logger.info("hct-updater", "fetch_manifest", f"Buscando manifest {manifest_type}", {
             "url": url,
@@ -51,23 +86,10 @@ class HCTUpdater:
         })
         
         try:
-            request = Request(url)
-            request.add_header('User-Agent', 'HomeCore-Tools/1.0')
-            
-            with urlopen(request, timeout=30) as response:
+            with self.http.get(url, timeout=30) as response:
                 if response.status == 200:
-                    data = json.loads(response.read().decode('utf-8'))
-                    
-                    # Salvar cache local
-                    cache_file = self.manifests_dir / f"{manifest_type}_manifest.json"
-                    with open(cache_file, 'w') as f:
-                        json.dump(data, f, indent=2)
-                    
-                    logger.success("hct-updater", "fetch_manifest", f"Manifest {manifest_type} obtido", {
-                        "version": data.get('version'),
-                        "name": data.get('name')
-                    })
-                    
+                    data = response.json()
+                    self.store_remote_manifest(manifest_type, data)
                     return data
                 else:
                     logger.warning("hct-updater", "fetch_manifest", f"HTTP {response.status}", {
@@ -75,17 +97,33 @@ class HCTUpdater:
                     })
                     return None
         
-        except HTTPError as e:
+        except HTTPStatusError as e:
             if e.code == 404:
                 logger.info("hct-updater", "fetch_manifest", f"Manifest {manifest_type} não disponível")
             else:
                 logger.error("hct-updater", "fetch_manifest", f"Erro HTTP {e.code}", exception=e)
             return None
         
-        except (URLError, Exception) as e:
+        except Exception as e:
             logger.error("hct-updater", "fetch_manifest", "Erro ao buscar manifest", exception=e)
             return None
     
+    def manifest_url(self, manifest_type: str) -> str:
+        """URL do manifest remoto de um tipo."""
+        return f"{self.api_base}/manifests/{self.token}/{manifest_type}_manifest.json"
+    
+    def store_remote_manifest(self, manifest_type: str, data: Dict[str, Any]):
+        """Salva cache local do manifest remoto obtido."""
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        cache_file = self.manifests_dir / f"{manifest_type}_manifest.json"
+        with open(cache_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        
+        logger.success("hct-updater", "fetch_manifest", f"Manifest {manifest_type} obtido", {
+            "version": data.get('version'),
+            "name": data.get('name')
+        })
+    
     def load_local_manifest(self, manifest_type: str) -> Optional[Dict[str, Any]]:
         """Carrega manifest local instalado."""
         manifest_file = self.config_dir / 'hc-tools' / 'manifest_files' / f"{manifest_type}_manifest.json"
@@ -108,6 +146,15 @@ class HCTUpdater:
             logger.error("hct-updater", "load_local_manifest", "Erro ao ler manifest local", exception=e)
             return None
     
+    @staticmethod
+    def load_json_file(path: Path) -> Optional[Dict[str, Any]]:
+        """Lê arquivo JSON (None se ausente ou inválido)."""
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
     def compare_versions(self, local_version: str, remote_version: str) -> bool:
         """Compara versões (retorna True se remote > local)."""
         try:
@@ -117,130 +164,199 @@ class HCTUpdater:
         except Exception:
             return False
     
+    def evaluate_update(self, manifest_type: str, remote: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Compara manifest remoto com o instalado; retorna update_info ou None."""
+        if not remote:
+            return None
+        
+        local = self.load_local_manifest(manifest_type)
+        local_version = local.get('version', '0.0.0') if local else '0.0.0'
+        remote_version = remote.get('version', '0.0.0')
+        
+        if not self.compare_versions(local_version, remote_version):
+            return None
+        
+        logger.info("hct-updater", "check_updates", f"Atualização disponível: {manifest_type}", {
+            "current": local_version,
+            "available": remote_version
+        })
+        
+        return {
+            'type': manifest_type,
+            'current': local_version,
+            'available': remote_version,
+            'manifest': remote
+        }
+    
     def check_updates(self) -> list:
         """Verifica atualizações disponíveis para todos os manifests."""
-        manifest_types = ['core', 'hcc', 'molsmart']
         updates = []
         
         logger.info("hct-updater", "check_updates", "Verificando atualizações disponíveis")
         
-        for manifest_type in manifest_types:
-            remote = self.fetch_remote_manifest(manifest_type)
-            if not remote:
-                continue
-            
-            local = self.load_local_manifest(manifest_type)
-            local_version = local.get('version', '0.0.0') if local else '0.0.0'
-            remote_version = remote.get('version', '0.0.0')
-            
-            if self.compare_versions(local_version, remote_version):
-                update_info = {
-                    'type': manifest_type,
-                    'current': local_version,
-                    'available': remote_version,
-                    'manifest': remote
-                }
+        for manifest_type in self.manifest_types:
+            update_info = self.evaluate_update(manifest_type, self.fetch_remote_manifest(manifest_type))
+            if update_info:
                 updates.append(update_info)
-                
-                logger.info("hct-updater", "check_updates", f"Atualização disponível: {manifest_type}", {
-                    "current": local_version,
-                    "available": remote_version
-                })
         
         if not updates:
             logger.info("hct-updater", "check_updates", "Nenhuma atualização disponível")
         
         return updates
     
-    def create_backup(self) -> Optional[Path]:
-        """Cria backup antes da atualização."""
-        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
-        backup_dir = self.backups_dir / f"hc-tools_backup_{timestamp}"
-        
-        logger.info("hct-updater", "create_backup", "Criando backup", {
-            "backup_dir": str(backup_dir)
-        })
-        
-        try:
-            # Backup do diretório hc-tools
-            source_dir = self.config_dir / 'hc-tools'
-            if source_dir.exists():
-                shutil.copytree(source_dir, backup_dir)
-            
-            # Backup de arquivos sensíveis
-            sensitive_files = ['configuration.yaml', 'automations.yaml', 'scripts.yaml', 'scenes.yaml']
-            for filename in sensitive_files:
-                source_file = self.config_dir / filename
-                if source_file.exists():
-                    shutil.copy2(source_file, backup_dir / filename)
-            
-            logger.success("hct-updater", "create_backup", "Backup criado com sucesso", {
-                "backup_dir": str(backup_dir)
-            })
-            
-            return backup_dir
-        
-        except Exception as e:
-            logger.error("hct-updater", "create_backup", "Erro ao criar backup", exception=e)
-            return None
+    @instrument("create_backup")
+    def create_backup(self, label: str = None) -> Optional[Snapshot]:
+        """Cria backup antes da atualização (ver hct_snapshot)."""
+        return self.snapshots.create(label)
     
-    def download_package(self, manifest: Dict[str, Any]) -> Optional[Path]:
-        """Baixa pacote de atualização."""
+    @instrument("download_package")
+    def download_package(self, manifest: Dict[str, Any], directory: Path = None,
+                         cancel: threading.Event = None) -> Optional[Path]:
+        """Baixa pacote de atualização (`cancel` interrompe, ver download_file)."""
         manifest_type = manifest.get('name', 'unknown')
-        download_url = manifest.get('download_url', f"{self.api_base}/hcc_update.php")
-        
-        # Adicionar client_id à URL
-        if '?' in download_url:
-            download_url += f"&client_id={self.token}"
-        else:
-            download_url += f"?client_id={self.token}"
+        download_url = self.package_url(manifest)
         
         logger.info("hct-updater", "download_package", f"Baixando pacote {manifest_type}", {
             "url": download_url
         })
         
-        # Criar arquivo temporário
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        temp_path = Path(temp_file.name)
+        try:
+            self.staging.ensure_space(manifest.get('size') or 0, "o download do pacote", directory)
+            return self.download_file(download_url, directory=directory, checksum=manifest.get('checksum'),
+                                      cancel=cancel)
+        except (HTTPStatusError, InsufficientSpace):
+            return None
+    
+    def package_url(self, manifest: Dict[str, Any]) -> str:
+        """URL do pacote de um manifest, com o client_id."""
+        download_url = manifest.get('download_url', f"{self.api_base}/hcc_update.php")
+        separator = '&' if '?' in download_url else '?'
+        return f"{download_url}{separator}client_id={self.token}"
+    
+    def download_file(
+        self,
+        url: str,
+        headers: Dict[str, str] = None,
+        suffix: str = '.zip',
+        raise_not_found: bool = False,
+        directory: Path = None,
+        checksum: str = None,
+        cancel: threading.Event = None
+    ) -> Optional[Path]:
+        """
+        Baixa arquivo em streaming para um temporário, com retries.
+        
+        O SHA-256 é calculado durante a transferência e reaproveitado por
+        verify_checksum. HTTP 404 não é repetido; com raise_not_found=True a
+        HTTPStatusError é propagada (usado pelos componentes para "sem update").
+        
+        Com o cache de pacotes ativo, um `checksum` já em cache não vai à rede;
+        sem checksum, a URL em cache é revalidada com If-None-Match (ETag).
+        
+        Se o evento `cancel` for definido, o download para sem novas tentativas
+        e None é devolvido.
+        """
+        cache = self.package_cache
+        cached = None
+        if cache and checksum:
+            digest = cache.lookup(checksum)
+            if digest:
+                copied = self.copy_from_cache(digest, suffix, directory)
+                if copied:
+                    return copied
+        elif cache:
+            cached = cache.lookup_url(url)
+            if cached:
+                headers = dict(headers or {}, **{'If-None-Match': cached['etag']})
         
         for attempt in range(1, self.max_retries + 1):
+            fd, temp_name = self.staging.mkstemp(suffix, directory)
+            temp_path = Path(temp_name)
+            
             try:
-                logger.debug("hct-updater", "download_package", f"Tentativa {attempt}/{self.max_retries}")
+                logger.debug("hct-updater", "download_package", "Tentativa de download", {
+                    "attempt": attempt,
+                    "max_retries": self.max_retries
+                })
                 
-                request = Request(download_url)
-                request.add_header('User-Agent', 'HomeCore-Tools/1.0')
+                started = time.perf_counter()
+                with os.fdopen(fd, 'wb') as f:
+                    result = self.http.download(url, f, headers=headers, timeout=self.download_timeout,
+                                                limiter=self.download_limiter, cancel=cancel)
+                elapsed = time.perf_counter() - started
                 
-                with urlopen(request, timeout=300) as response:
-                    if response.status == 200:
-                        with open(temp_path, 'wb') as f:
-                            f.write(response.read())
-                        
-                        # Verificar se arquivo não está vazio
-                        if temp_path.stat().st_size == 0:
-                            logger.error("hct-updater", "download_package", "Arquivo baixado está vazio")
-                            continue
-                        
-                        logger.success("hct-updater", "download_package", "Download concluído", {
-                            "size": temp_path.stat().st_size,
-                            "attempt": attempt
-                        })
-                        
-                        return temp_path
+                if result["status"] == 304 and cached:
+                    temp_path.unlink()
+                    cache.touch(cached['sha256'])
+                    copied = self.copy_from_cache(cached['sha256'], suffix, directory)
+                    if copied:
+                        return copied
+                    # Objeto em cache corrompido: baixar de novo, sem If-None-Match
+                    cached = None
+                    headers = {k: v for k, v in headers.items() if k != 'If-None-Match'}
+                    continue
                 
-            except Exception as e:
-                logger.warning("hct-updater", "download_package", f"Falha na tentativa {attempt}", exception=e)
+                # Arquivo vazio: falha como as demais (nova tentativa após o intervalo)
+                if result["size"] == 0:
+                    raise IOError("Arquivo baixado está vazio")
                 
-                if attempt < self.max_retries:
-                    import time
-                    time.sleep(self.retry_delay)
-        
-        # Limpar arquivo temporário em caso de falha
-        if temp_path.exists():
-            temp_path.unlink()
+                self._digests[temp_path] = result["sha256"]
+                
+                DOWNLOAD_BYTES.inc(result["size"])
+                if elapsed > 0:
+                    DOWNLOAD_THROUGHPUT.set(round(result["size"] / elapsed, 1))
+                    # Downloads limitados medem o limite, não o link
+                    if not self.download_limiter:
+                        self.throughput.record("download", result["size"], elapsed)
+                
+                logger.success("hct-updater", "download_package", "Download concluído", {
+                    "size": result["size"],
+                    "attempt": attempt,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "rate_limit": int(self.download_limiter.rate) if self.download_limiter else None
+                })
+                
+                if cache:
+                    self.store_in_cache(cache, temp_path, result, url)
+                
+                return temp_path
+            
+            except DownloadCancelled:
+                temp_path.unlink(missing_ok=True)
+                logger.info("hct-updater", "download_package", "Download cancelado", {"url": url})
+                return None
+            
+            except HTTPStatusError as e:
+                if temp_path.exists():
+                    temp_path.unlink()
+                if e.code == 404:
+                    logger.info("hct-updater", "download_package", "Pacote não disponível (HTTP 404)", {
+                        "url": url
+                    })
+                    if raise_not_found:
+                        raise
+                    return None
+                logger.warning("hct-updater", "download_package", "Falha na tentativa de download", {
+                    "attempt": attempt,
+                    "http_status": e.code
+                })
+            
+            except Exception as e:
+                if temp_path.exists():
+                    temp_path.unlink()
+                logger.warning("hct-updater", "download_package", "Falha na tentativa de download", {
+                    "attempt": attempt,
+                    "exception": str(e),
+                    "exception_type": type(e).__name__
+                })
+            
+            if attempt < self.max_retries:
+                time.sleep(self.retry_delay)
         
         logger.error("hct-updater", "download_package", "Falha no download após todas as tentativas")
         return None
     
+    @instrument("verify_checksum")
     def verify_checksum(self, file_path: Path, expected_checksum: str) -> bool:
         """Verifica checksum do arquivo."""
         if not expected_checksum:
@@ -250,13 +366,16 @@ class HCTUpdater:
         logger.info("hct-updater", "verify_checksum", "Verificando integridade do arquivo")
         
         try:
-            sha256_hash = hashlib.sha256()
-            with open(file_path, 'rb') as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
+            # Reaproveitar hash calculado durante o download, se houver
+            calculated = self._digests.get(Path(file_path))
+            if calculated is None:
+                sha256_hash = hashlib.sha256()
+                with open(file_path, 'rb') as f:
+                    for byte_block in iter(lambda: f.read(1024 * 1024), b""):
+                        sha256_hash.update(byte_block)
+                calculated = sha256_hash.hexdigest()
             
-            calculated = sha256_hash.hexdigest()
-            expected = expected_checksum.replace('sha256:', '')
+            expected = expected_checksum.replace('sha256:', '').strip().lower()
             
             if calculated == expected:
                 logger.success("hct-updater", "verify_checksum", "Checksum válido")
@@ -272,62 +391,96 @@ class HCTUpdater:
             logger.error("hct-updater", "verify_checksum", "Erro ao verificar checksum", exception=e)
             return False
     
+    def extract_package(self, package_path: Path) -> tuple:
+        """
+        Extrai ZIP em diretório temporário da área de staging (em processo,
+        sem `unzip`), após verificar o espaço livre para o conteúdo extraído.
+        
+        Retorna (temp_dir, staging_dir), onde staging_dir é o diretório raiz
+        único do pacote, se houver, ou o próprio temp_dir.
+        """
+        with zipfile.ZipFile(package_path) as zf:
+            self.staging.ensure_space(sum(info.file_size for info in zf.infolist()), "a extração do pacote")
+        
+        temp_dir = self.staging.mkdtemp()
+        
+        try:
+            root = temp_dir.resolve()
+            with zipfile.ZipFile(package_path) as zf:
+                for info in zf.infolist():
+                    target = (temp_dir / info.filename).resolve()
+                    # Proteção contra zip-slip
+                    if target != root and root not in target.parents:
+                        raise ValueError(f"Caminho inválido no pacote: {info.filename}")
+                    zf.extract(info, temp_dir)
+                    
+                    # Preservar permissões (ex.: scripts executáveis)
+                    mode = (info.external_attr >> 16) & 0o777
+                    if mode and not info.is_dir():
+                        os.chmod(target, mode)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        
+        # Detectar diretório raiz (se houver)
+        extracted_items = list(temp_dir.iterdir())
+        if len(extracted_items) == 1 and extracted_items[0].is_dir():
+            staging_dir = extracted_items[0]
+            logger.debug("hct-updater", "apply_update", "Diretório raiz detectado", {
+                "staging_dir": str(staging_dir)
+            })
+        else:
+            staging_dir = temp_dir
+        
+        return temp_dir, staging_dir
+    
+    @staticmethod
+    def merge_tree(source_dir: Path, target_dir: Path):
+        """Mescla conteúdo de source_dir em target_dir (equivalente a `cp -r src/. dst`)."""
+        target_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copytree(source_dir, target_dir, dirs_exist_ok=True)
+    
+    @instrument("apply_update")
     def apply_update(self, package_path: Path, manifest: Dict[str, Any]) -> bool:
         """Aplica atualização extraindo e copiando arquivos."""
         logger.info("hct-updater", "apply_update", "Aplicando atualização")
         
         temp_dir = None
+        started = time.perf_counter()
         try:
-            # Criar diretório temporário para extração
-            temp_dir = Path(tempfile.mkdtemp(prefix='hct_extract_'))
-            
             # Extrair ZIP
             logger.debug("hct-updater", "apply_update", "Extraindo pacote")
-            result = subprocess.run(
-                ['unzip', '-oq', str(package_path), '-d', str(temp_dir)],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                logger.error("hct-updater", "apply_update", "Erro ao extrair pacote", {
-                    "stderr": result.stderr
-                })
+            try:
+                temp_dir, staging_dir = self.extract_package(package_path)
+            except (zipfile.BadZipFile, ValueError, OSError) as e:
+                logger.error("hct-updater", "apply_update", "Erro ao extrair pacote", exception=e)
                 return False
             
-            # Detectar diretório raiz (se houver)
-            extracted_items = list(temp_dir.iterdir())
-            if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                staging_dir = extracted_items[0]
-                logger.debug("hct-updater", "apply_update", "Diretório raiz detectado", {
-                    "staging_dir": str(staging_dir)
-                })
-            else:
-                staging_dir = temp_dir
-            
             # Copiar arquivos para /config
             logger.info("hct-updater", "apply_update", "Copiando arquivos para /config")
             
-            result = subprocess.run(
-                ['cp', '-r', f"{staging_dir}/.", str(self.config_dir)],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                logger.error("hct-updater", "apply_update", "Erro ao copiar arquivos", {
-                    "stderr": result.stderr
-                })
+            try:
+                self.merge_tree(staging_dir, self.config_dir)
+            except (shutil.Error, OSError) as e:
+                logger.error("hct-updater", "apply_update", "Erro ao copiar arquivos", exception=e)
                 return False
             
             # Atualizar manifest local
             manifest_type = manifest.get('name', 'unknown').lower().replace(' ', '_')
+            self.record_integrity(staging_dir, self.config_dir, manifest_type, {
+                "kind": "manifest",
+                "manifest": manifest
+            })
             local_manifest_file = self.config_dir / 'hc-tools' / 'manifest_files' / f"{manifest_type}_manifest.json"
             local_manifest_file.parent.mkdir(parents=True, exist_ok=True)
             
             with open(local_manifest_file, 'w') as f:
                 json.dump(manifest, f, indent=2)
             
+            with zipfile.ZipFile(package_path) as zf:
+                applied = sum(info.file_size for info in zf.infolist())
+            self.throughput.record("apply", applied, time.perf_counter() - started)
+            
             logger.success("hct-updater", "apply_update", "Atualização aplicada com sucesso", {
                 "version": manifest.get('version')
             })
@@ -343,32 +496,25 @@ class HCTUpdater:
             if temp_dir and temp_dir.exists():
                 shutil.rmtree(temp_dir, ignore_errors=True)
     
-    def rollback(self, backup_dir: Path) -> bool:
-        """Restaura backup em caso de falha."""
-        logger.warning("hct-updater", "rollback", "Iniciando rollback", {
-            "backup_dir": str(backup_dir)
-        })
-        
+    def record_integrity(self, source_dir: Path, target_dir: Path, source: str, origin: Dict[str, Any]):
+        """Registra baseline de integridade dos arquivos instalados (falhas não abortam a atualização)."""
         try:
-            # Restaurar hc-tools
-            target_dir = self.config_dir / 'hc-tools'
-            if target_dir.exists():
-                shutil.rmtree(target_dir)
-            
-            shutil.copytree(backup_dir, target_dir)
-            
-            # Restaurar arquivos sensíveis
-            for item in backup_dir.iterdir():
-                if item.is_file() and item.suffix == '.yaml':
-                    shutil.copy2(item, self.config_dir / item.name)
-            
-            logger.success("hct-updater", "rollback", "Rollback concluído com sucesso")
-            return True
-        
+            from hct_integrity import IntegrityScanner
+            scanner = IntegrityScanner(self.config_dir, self.data_dir / 'integrity_index.json')
+            scanner.record_install(source_dir, target_dir, source, origin)
         except Exception as e:
-            logger.error("hct-updater", "rollback", "Erro ao fazer rollback", exception=e)
-            return False
+            logger.warning("hct-updater", "record_integrity", "Falha ao registrar baseline de integridade", {
+                "error": str(e)
+            })
+    
+    @instrument("rollback")
+    def rollback(self, backup) -> bool:
+        """Restaura backup em caso de falha (Snapshot, ou diretório de backup em arquivos)."""
+        if not isinstance(backup, Snapshot):
+            backup = Snapshot('files', str(backup), Path(backup).name)
+        return self.snapshots.restore(backup)
     
+    @profiled("update")
     def update(self, update_info: Dict[str, Any]) -> bool:
         """Executa processo completo de atualização."""
         manifest = update_info['manifest']
@@ -382,16 +528,20 @@ class HCTUpdater:
         backup_dir = None
         package_path = None
         
+        # 0. Recusar atualizações que encheriam o disco
+        if not self.preflight(update_info):
+            return False
+        
         try:
             # 1. Criar backup
             if os.environ.get('HCT_BACKUP_BEFORE_UPDATE', 'true').lower() == 'true':
-                backup_dir = self.create_backup()
+                backup_dir = self.create_backup(f"{manifest_type} {update_info['available']}")
                 if not backup_dir:
                     logger.error("hct-updater", "update", "Falha ao criar backup, abortando")
                     return False
             
-            # 2. Baixar pacote
-            package_path = self.download_package(manifest)
+            # 2. Baixar pacote (ou usar o pré-baixado e já verificado)
+            package_path = self.prefetcher.take(update_info) or self.download_package(manifest)
             if not package_path:
                 logger.error("hct-updater", "update", "Falha no download, abortando")
                 return False
@@ -429,16 +579,201 @@ class HCTUpdater:
         
         finally:
             # Limpar arquivo temporário
-            if package_path and package_path.exists():
-                package_path.unlink()
+            if package_path:
+                self.discard_package(package_path)
+    
+    def plan_update(self, update_info: Dict[str, Any], fetch: bool = True, checksums: bool = True) -> Dict[str, Any]:
+        """Dry-run de uma atualização (ver hct_planner.UpdatePlanner.plan)."""
+        from hct_planner import UpdatePlanner
+        return UpdatePlanner(self).plan(update_info, fetch=fetch, checksums=checksums)
+    
+    def preflight(self, update_info: Dict[str, Any]) -> bool:
+        """
+        Verifica se a atualização cabe no disco. Só recusa quando o plano diz
+        que não cabe; falhas do planejamento não bloqueiam a atualização.
+        O plano usa só os tamanhos do índice do ZIP (sem CRC32 de /config).
+        """
+        try:
+            plan = self.plan_update(update_info, fetch=False, checksums=False)
+        except Exception as e:
+            logger.warning("hct-updater", "preflight", "Falha ao planejar atualização", {
+                "error": str(e)
+            })
+            return True
+        
+        if not plan["fits"]:
+            logger.error("hct-updater", "preflight", "Espaço em disco insuficiente, atualização recusada", {
+                "type": update_info['type'],
+                "disk": [d for d in plan["disk"] if not d["fits"]]
+            })
+            return False
+        
+        logger.info("hct-updater", "preflight", f"Plano da atualização {update_info['type']}", {
+            "added": plan["files"]["added"]["count"],
+            "modified": plan["files"]["modified"]["count"],
+            "download_bytes": plan["bytes"]["download"],
+            "estimate_s": plan["estimate_s"]["total"]
+        })
+        return True
+    
+    @property
+    def throughput(self):
+        """Histórico de vazão (hct_planner.ThroughputHistory)."""
+        if self._throughput is None:
+            from hct_planner import ThroughputHistory
+            self._throughput = ThroughputHistory(self.data_dir / 'throughput.json')
+        return self._throughput
+    
+    @property
+    def prefetcher(self):
+        """Área de pacotes pré-baixados (ver hct_prefetch.UpdatePrefetcher)."""
+        if self._prefetcher is None:
+            from hct_prefetch import UpdatePrefetcher
+            self._prefetcher = UpdatePrefetcher(self)
+        return self._prefetcher
+    
+    @property
+    def package_cache(self):
+        """Cache de pacotes (hct_cache.PackageCache), ou None se desabilitado."""
+        if self._package_cache is False:
+            from hct_cache import PackageCache
+            try:
+                self._package_cache = PackageCache.from_env()
+            except Exception as e:
+                logger.warning("hct-updater", "package_cache", "Cache de pacotes indisponível", {
+                    "error": str(e)
+                })
+                self._package_cache = None
+        return self._package_cache
+    
+    def copy_from_cache(self, digest: str, suffix: str = '.zip', directory: Path = None) -> Optional[Path]:
+        """
+        Cópia temporária de um pacote em cache (descartável como um download).
+        O SHA-256 é calculado durante a cópia; se não conferir, o objeto sai do
+        cache e None é devolvido (o chamador baixa da rede).
+        """
+        fd, temp_name = self.staging.mkstemp(suffix, directory)
+        os.close(fd)
+        temp_path = Path(temp_name)
+        try:
+            calculated = self.package_cache.copy_to(digest, temp_path)
+        except OSError as e:
+            logger.warning("hct-updater", "package_cache", "Falha ao copiar pacote do cache", {
+                "sha256": digest,
+                "error": str(e)
+            })
+            temp_path.unlink(missing_ok=True)
+            self.package_cache.invalidate(digest)
+            return None
+        
+        if calculated != digest:
+            temp_path.unlink()
+            self.package_cache.invalidate(digest)
+            return None
+        
+        # Hash da própria cópia: verify_checksum não relê o arquivo
+        self._digests[temp_path] = calculated
+        
+        logger.success("hct-updater", "download_package", "Pacote obtido do cache", {
+            "sha256": digest,
+            "size": temp_path.stat().st_size
+        })
+        return temp_path
+    
+    def store_in_cache(self, cache, package_path: Path, result: Dict[str, Any], url: str):
+        """Guarda download no cache; falhas (ex.: /share cheio) não afetam a atualização."""
+        try:
+            cache.store(package_path, result["sha256"], url=url, etag=result["headers"].get('etag'))
+        except Exception as e:
+            logger.warning("hct-updater", "package_cache", "Falha ao armazenar pacote em cache", {
+                "error": str(e)
+            })
+    
+    def discard_package(self, package_path: Path):
+        """Remove pacote temporário e seu hash em cache."""
+        self.forget_digest(package_path)
+        if package_path.exists():
+            package_path.unlink()
+    
+    def remember_digest(self, path: Path, sha256: str):
+        """Registra o SHA-256 já conhecido de um arquivo (verify_checksum não o relê)."""
+        self._digests[Path(path)] = sha256
+    
+    def forget_digest(self, path: Path) -> Optional[str]:
+        """Esquece o SHA-256 registrado de um arquivo e o devolve (None se não havia)."""
+        return self._digests.pop(Path(path), None)
+    
+    def register_component(self, handler) -> None:
+        """Registra handler de componente (ver hct_components.ComponentHandler)."""
+        self.components[handler.name] = handler
+    
+    def load_default_components(self) -> None:
+        """Registra os handlers padrão (core, hcc, api, hacs, mushroom)."""
+        from hct_components import DEFAULT_COMPONENTS
+        for handler_cls in DEFAULT_COMPONENTS:
+            if handler_cls.name not in self.components:
+                self.register_component(handler_cls(self))
+    
+    def run_component(self, name: str) -> str:
+        """
+        Executa atualização de um componente.
+        
+        Retorna "updated", "no_update" ou "failed".
+        """
+        if not self.components:
+            self.load_default_components()
+        
+        handler = self.components.get(name)
+        if handler is None:
+            logger.error("hct-updater", "run_component", f"Componente desconhecido: {name}", {
+                "available": sorted(self.components)
+            })
+            return "failed"
+        
+        return handler.run()
+
+
+def run_component_cli(argv: list) -> int:
+    """CLI dos componentes: hct_updater.py component <nome> [--token T]."""
+    import argparse
+    from hct_components import DEFAULT_COMPONENTS
+    
+    handlers = {cls.name: cls for cls in DEFAULT_COMPONENTS}
+    
+    parser = argparse.ArgumentParser(prog="hct_updater.py component",
+                                     description="Atualiza um componente HomeCore")
+    parser.add_argument('name', choices=sorted(handlers))
+    parser.add_argument('--token', default=None, help="Token HomeCore (padrão: HOMECORE_TOKEN)")
+    args = parser.parse_args(argv)
+    
+    handler_cls = handlers[args.name]
+    config_dir = Path(os.environ.get('HCT_CONFIG_DIR', '/config'))
+    token = handler_cls.find_token(config_dir, args.token) or ""
+    
+    if handler_cls.requires_token and not token:
+        logger.error("hct-updater", "run_component", "Token HomeCore não encontrado (defina HOMECORE_TOKEN)")
+        return 1
+    
+    updater = HCTUpdater(token)
+    updater.register_component(handler_cls(updater))
+    status = updater.run_component(args.name)
+    
+    if status == "updated" and args.name != "mushroom":
+        print("\n⚠️ Reinicie o Home Assistant para aplicar as configurações.")
+    
+    return 0 if status in ("updated", "no_update") else 1
 
 
 if __name__ == "__main__":
-    # Teste do updater
+    # Teste do updater / execução de componentes
     import sys
     
+    if len(sys.argv) >= 2 and sys.argv[1] == 'component':
+        sys.exit(run_component_cli(sys.argv[2:]))
+    
     if len(sys.argv) < 2:
         print("Uso: hct-updater.py <token>")
+        print("     hct-updater.py component <core|hcc|api|hacs|mushroom> [--token TOKEN]")
         sys.exit(1)
     
     token = sys.argv[1]
@@ -15,6 +15,17 @@ CHECK_INTERVAL=$(bashio::config 'check_interval' '3600')
 AUTO_UPDATE=$(bashio::config 'auto_update' 'true')
 BACKUP_BEFORE_UPDATE=$(bashio::config 'backup_before_update' 'true')
 NOTIFY_ON_UPDATE=$(bashio::config 'notify_on_update' 'true')
+METRICS=$(bashio::config 'metrics' 'true')
+RUNTIME=$(bashio::config 'runtime' 'threaded')
+STARTUP_PROFILE=$(bashio::config 'startup_profile' 'false')
+PREFETCH_UPDATES=$(bashio::config 'prefetch_updates' 'true')
+DOWNLOAD_RATE_LIMIT=$(bashio::config 'download_rate_limit' '0')
+MAINTENANCE_WINDOW=$(bashio::config 'maintenance_window' '')
+PACKAGE_CACHE_SIZE=$(bashio::config 'package_cache_size' '256')
+STAGING_DIR=$(bashio::config 'staging_dir' '')
+BACKUP_BACKEND=$(bashio::config 'backup_backend' 'files')
+LOG_DEDUP_WINDOW=$(bashio::config 'log_dedup_window' '300')
+LOG_DEBUG_SAMPLING=$(bashio::config 'log_debug_sampling' '')
 
 bashio::log.info "Configurações carregadas:"
 bashio::log.info "  - Log Level: ${LOG_LEVEL}"
@@ -22,6 +33,17 @@ bashio::log.info "  - Check Interval: ${CHECK_INTERVAL}s"
 bashio::log.info "  - Auto Update: ${AUTO_UPDATE}"
 bashio::log.info "  - Backup Before Update: ${BACKUP_BEFORE_UPDATE}"
 bashio::log.info "  - Notify On Update: ${NOTIFY_ON_UPDATE}"
+bashio::log.info "  - Metrics: ${METRICS}"
+bashio::log.info "  - Runtime: ${RUNTIME}"
+bashio::log.info "  - Startup Profile: ${STARTUP_PROFILE}"
+bashio::log.info "  - Prefetch Updates: ${PREFETCH_UPDATES}"
+bashio::log.info "  - Download Rate Limit: ${DOWNLOAD_RATE_LIMIT} B/s"
+bashio::log.info "  - Maintenance Window: ${MAINTENANCE_WINDOW:-sempre}"
+bashio::log.info "  - Package Cache Size: ${PACKAGE_CACHE_SIZE} MB"
+bashio::log.info "  - Staging Dir: ${STAGING_DIR:-/data/staging}"
+bashio::log.info "  - Backup Backend: ${BACKUP_BACKEND}"
+bashio::log.info "  - Log Dedup Window: ${LOG_DEDUP_WINDOW}s"
+bashio::log.info "  - Log Debug Sampling: ${LOG_DEBUG_SAMPLING:-nenhuma}"
 
 # Verificar se o Supervisor está disponível
 if ! bashio::supervisor.ping; then
@@ -49,6 +71,17 @@ export HCT_CHECK_INTERVAL="${CHECK_INTERVAL}"
 export HCT_AUTO_UPDATE="${AUTO_UPDATE}"
 export HCT_BACKUP_BEFORE_UPDATE="${BACKUP_BEFORE_UPDATE}"
 export HCT_NOTIFY_ON_UPDATE="${NOTIFY_ON_UPDATE}"
+export HCT_METRICS="${METRICS}"
+export HCT_RUNTIME="${RUNTIME}"
+export HCT_STARTUP_PROFILE="${STARTUP_PROFILE}"
+export HCT_PREFETCH="${PREFETCH_UPDATES}"
+export HCT_DOWNLOAD_RATE_LIMIT="${DOWNLOAD_RATE_LIMIT}"
+export HCT_MAINTENANCE_WINDOW="${MAINTENANCE_WINDOW}"
+export HCT_PACKAGE_CACHE_MB="${PACKAGE_CACHE_SIZE}"
+export HCT_STAGING_DIR="${STAGING_DIR}"
+export HCT_BACKUP_BACKEND="${BACKUP_BACKEND}"
+export HCT_LOG_DEDUP_WINDOW="${LOG_DEDUP_WINDOW}"
+export HCT_LOG_DEBUG_SAMPLING="${LOG_DEBUG_SAMPLING}"
 
 # Daemon é iniciado automaticamente pelo S6 Overlay via services.d/hct-daemon/run
 bashio::log.info "Inicialização concluída. Aguardando serviços..."
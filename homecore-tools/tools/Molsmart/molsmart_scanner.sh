@@ -21,8 +21,16 @@
 #   --endpoint EP     Caminho do endpoint de detalhes (padrão: /relay_cgi_load.cgi)
 #   --format FMT      Saída: json|table|visual (padrão: visual)
 #   --no-progress     Desabilita barra de progresso (útil para redirecionamento)
+#   --workers N       Placas configuradas em paralelo no pipeline MQTT (padrão: 8)
+#   --incremental     Re-scan via inventário (/data/molsmart_inventory.json): placas
+#                     conhecidas primeiro, depois só endereços desconhecidos (requer python3)
+#   --known-only      Com --incremental, consulta apenas as placas do inventário
+#   --rate N          Consultas/s na varredura de endereços desconhecidos (padrão: 10)
+#   --discover MODE   Descoberta de hosts antes da consulta HTTP: sweep (tabela ARP +
+#                     conexão TCP na --port; sem python3 consulta todos), arp (só a
+#                     tabela ARP) ou none (consulta todos os endereços). Padrão: sweep
 #
-# Dependências: bash, curl
+# Dependências: bash, curl (python3 opcional para o pipeline de sync/MQTT em lote)
 
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURAÇÕES PADRÃO
@@ -58,7 +66,14 @@ MQTT_PASS="${HOMECORE_MQTT_PASS:-ha123}"
 LOG_DIR="${CONFIG_DIR}/hc-tools/logs"
 LOG_FILE="${LOG_DIR}/board_scanner.log"
 
-SYNC_SERIALS_SEEN_LIST=""
+# Pipeline Python (dedup por serial/MAC, sync em lote e MQTT paralelo)
+PIPELINE_PY="${HCT_MOLSMART_PIPELINE:-/usr/bin/hct_molsmart.py}"
+PIPELINE_WORKERS=8
+INCREMENTAL=false
+KNOWN_ONLY=false
+SWEEP_RATE=10
+DISCOVERY="sweep"
+
 JSON_VALIDATOR_WARNING_SHOWN=false
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -199,6 +214,7 @@ print_config() {
     printf "%b\n" "${CYAN}│${RESET} ${BOLD}Timeout:${RESET}  ${TIMEOUT}s"
     printf "%b\n" "${CYAN}│${RESET} ${BOLD}Delay:${RESET}    ${DELAY}s"
     printf "%b\n" "${CYAN}│${RESET} ${BOLD}Endpoint:${RESET} ${ENDPOINT}"
+    printf "%b\n" "${CYAN}│${RESET} ${BOLD}Descoberta:${RESET} ${DISCOVERY}"
     printf "%b\n" "${CYAN}│${RESET} ${BOLD}MQTT:${RESET}     ${mqtt_display}"
     printf "%b\n" "${CYAN}│${RESET} ${BOLD}Sync:${RESET}     ${sync_display}"
     printf "%b\n" "${BCYAN}└────────────────────────────────────────────────────────────────────────────┘${RESET}"
@@ -350,7 +366,7 @@ add_sync_entry() {
   local states_csv="$3"
 
   local qty_clean states_clean states_json now_utc board_json
-  local output_config_json input_config_json board_model input_count dedup_key
+  local output_config_json input_config_json board_model input_count
   local mqtt_config_json mqtt_server_value mqtt_port_clean
 
   qty_clean=$(echo "$qty" | tr -cd '0-9')
@@ -367,13 +383,6 @@ add_sync_entry() {
     states_json="[]"
   fi
 
-  dedup_key="ip:${ip}"
-  if printf '%s' "$SYNC_SERIALS_SEEN_LIST" | grep -Fxq "$dedup_key"; then
-    log_debug "Dispositivo em $ip já registrado na sessão; ignorando duplicata"
-    return
-  fi
-  SYNC_SERIALS_SEEN_LIST="${SYNC_SERIALS_SEEN_LIST}${dedup_key}"$'\n'
-
   output_config_json=$(build_channel_config "$qty_clean" "$states_clean" "Relay")
   input_config_json=$(build_channel_config "$qty_clean" "" "Input")
 
@@ -563,6 +572,77 @@ send_sync_payload() {
   return 1
 }
 
+pipeline_available() {
+  command -v python3 >/dev/null 2>&1 && [ -f "$PIPELINE_PY" ]
+}
+
+# Hosts vivos do range, um por linha. Com python3: tabela ARP + varredura TCP
+# paralela na porta. Sem python3, "sweep" consulta o range inteiro (como antes)
+# e "arp" usa só a tabela ARP lida aqui.
+discover_targets() {
+  local mode="$DISCOVERY"
+  if [ "$mode" != "none" ] && [ "$USE_PIPELINE" = true ]; then
+    python3 "$PIPELINE_PY" discover --prefix "$PREFIX" --from "$FROM" --to "$TO" \
+      --port "$PORT" --mode "$mode" 2>/dev/null && return
+  fi
+  if [ "$mode" != "arp" ] || [ ! -r /proc/net/arp ]; then
+    seq "$FROM" "$TO" | sed "s/^/${PREFIX}/"
+    return
+  fi
+  awk -v pfx="$PREFIX" -v from="$FROM" -v to="$TO" '
+    NR > 1 && $3 != "0x0" && $4 != "00:00:00:00:00:00" && index($1, pfx) == 1 {
+      host = substr($1, length(pfx) + 1)
+      if (host ~ /^[0-9]+$/ && host + 0 >= from && host + 0 <= to) print $1
+    }' /proc/net/arp | sort -t. -k4,4n
+}
+
+# Executa o pipeline Python: deduplica por serial/MAC, envia um único payload de
+# sync e provisiona MQTT nas placas em paralelo (com retries por placa).
+run_pipeline() {
+  local do_sync="$1"
+  local args=(
+    sync
+    --prefix "$PREFIX"
+    --from "$FROM"
+    --to "$TO"
+    --sync-url "$SYNC_URL"
+    --mqtt-server "$MQTT_SERVER"
+    --mqtt-port "$MQTT_PORT"
+    --mqtt-user "$MQTT_USER"
+    --mqtt-pass "$MQTT_PASS"
+    --timeout "$PIPELINE_TIMEOUT"
+    --workers "$PIPELINE_WORKERS"
+  )
+  if [ "$do_sync" = true ]; then
+    args+=(--token "$TOKEN")
+  else
+    args+=(--no-sync)
+  fi
+  if [ "$DRY_RUN" = true ]; then
+    args+=(--dry-run)
+  fi
+
+  local payload report status
+  payload=$(printf '{"relay_board":[%s]}' "$SYNC_ENTRIES")
+  if [ "$DEBUG" = true ]; then
+    log_debug "Payload preparado: $payload"
+  fi
+  report=$(printf '%s' "$payload" | python3 "$PIPELINE_PY" "${args[@]}" 2>/dev/null)
+  status=$?
+
+  log_to_file "INFO" "Relatório do pipeline: $(printf '%s' "$report" | tr -d '\n ')"
+  if [ "$DEBUG" = true ] || [ "$DRY_RUN" = true ]; then
+    printf "%s\n" "$report" >&2
+  fi
+
+  if [ $status -eq 0 ]; then
+    log_success "Pipeline MolSmart concluído (${SYNC_COUNT} placas)"
+    return 0
+  fi
+  log_error "Pipeline MolSmart retornou código $status"
+  return 1
+}
+
 # ═══════════════════════════════════════════════════════════════════════════
 # BARRA DE PROGRESSO
 # ═══════════════════════════════════════════════════════════════════════════
@@ -724,6 +804,11 @@ while [ $# -gt 0 ]; do
     --token-file) TOKEN_FILE="$2"; shift 2;;
     --config-dir) CONFIG_DIR="$2"; shift 2;;
     --dry-run) DRY_RUN=true; shift;;
+    --workers) PIPELINE_WORKERS="$2"; shift 2;;
+    --incremental) INCREMENTAL=true; shift;;
+    --known-only) KNOWN_ONLY=true; shift;;
+    --rate) SWEEP_RATE="$2"; shift 2;;
+    --discover) DISCOVERY="$2"; shift 2;;
     -h|--help)
       head -n 30 "$0" 2>/dev/null || sed -n '1,30p' "$0"; exit 0;;
     *) 
@@ -739,6 +824,43 @@ ensure_log_ready
 log_to_file "INFO" "Iniciando HomeCore Board Scanner"
 resolve_mqtt_server || true
 
+# As placas respondem devagar ao mqtt.cgi; o timeout de varredura é curto demais
+PIPELINE_TIMEOUT=$(awk -v t="$TIMEOUT" 'BEGIN { print (t < 2 ? 2 : t) }')
+
+USE_PIPELINE=false
+if pipeline_available; then
+  USE_PIPELINE=true
+fi
+
+# Modo incremental: o scan inteiro é feito pelo pipeline Python
+if [ "$INCREMENTAL" = true ]; then
+  if [ "$USE_PIPELINE" = false ]; then
+    log_error "--incremental requer python3 e $PIPELINE_PY"
+    exit 1
+  fi
+  print_header
+  print_config
+  scan_args=(
+    scan --incremental
+    --prefix "$PREFIX" --from "$FROM" --to "$TO"
+    --port "$PORT" --endpoint "$ENDPOINT"
+    --probe-timeout "$TIMEOUT" --rate "$SWEEP_RATE" --discover "$DISCOVERY"
+    --sync-url "$SYNC_URL"
+    --mqtt-server "$MQTT_SERVER" --mqtt-port "$MQTT_PORT"
+    --mqtt-user "$MQTT_USER" --mqtt-pass "$MQTT_PASS"
+    --timeout "$PIPELINE_TIMEOUT" --workers "$PIPELINE_WORKERS"
+  )
+  if [ "$KNOWN_ONLY" = true ]; then scan_args+=(--known-only); fi
+  if [ "$DRY_RUN" = true ]; then scan_args+=(--dry-run); fi
+  if [ "$SYNC_ENABLED" = true ] && resolve_homecore_token; then
+    scan_args+=(--token "$TOKEN")
+  else
+    scan_args+=(--no-sync)
+  fi
+  log "Re-scan incremental a partir do inventário..."
+  exec python3 "$PIPELINE_PY" "${scan_args[@]}"
+fi
+
 # Fallback para HAOS: desabilitar barra de progresso se o ambiente não renderiza \r
 #if command -v ha >/dev/null 2>&1; then
 #  SHOW_PROGRESS=false
@@ -751,7 +873,9 @@ resolve_mqtt_server || true
 print_header
 print_config
 
-TOTAL=$((TO - FROM + 1))
+RANGE_TOTAL=$((TO - FROM + 1))
+TARGETS=$(discover_targets)
+TOTAL=$(printf '%s\n' "$TARGETS" | grep -c .)
 CURRENT=0
 FOUND=0
 FOUND_MESSAGES=""
@@ -764,14 +888,13 @@ if [ "$FORMAT" = "json" ]; then
 elif [ "$FORMAT" = "table" ]; then
   print_table_header
 elif [ "$FORMAT" = "visual" ]; then
-  log "Iniciando escaneamento de ${BWHITE}${TOTAL}${RESET} endereços..."
+  log "Consultando ${BWHITE}${TOTAL}${RESET} de ${RANGE_TOTAL} endereços (descoberta: ${DISCOVERY})..."
   echo ""
 fi
 
 first=true
 
-for i in $(seq $FROM $TO); do
-  ip="${PREFIX}${i}"
+for ip in $TARGETS; do
   CURRENT=$((CURRENT + 1))
   
   # Opcional: barra de progresso (desativada automaticamente em HAOS)
@@ -794,7 +917,9 @@ for i in $(seq $FROM $TO); do
       else
         states_json="[]"
       fi
-      configure_board_mqtt "$ip" || true
+      if [ "$USE_PIPELINE" = false ]; then
+        configure_board_mqtt "$ip" || true
+      fi
       log "MolSmart detectada em $ip com ${relays} relés"
       add_sync_entry "$ip" "$relays" "$states_raw"
       FOUND=$((FOUND + 1))
@@ -832,12 +957,23 @@ elif [ "$FORMAT" = "visual" ]; then
   fi
   log_success "Escaneamento concluído!"
   printf "%b\n" "${BCYAN}┌─ Resumo ───────────────────────────────────────────────────────────────────┐${RESET}"
-  printf "%b\n" "${CYAN}│${RESET} ${BOLD}Total escaneado:${RESET}      ${BWHITE}${TOTAL}${RESET} endereços"
+  printf "%b\n" "${CYAN}│${RESET} ${BOLD}Total escaneado:${RESET}      ${BWHITE}${RANGE_TOTAL}${RESET} endereços (${TOTAL} consultados)"
   printf "%b\n" "${CYAN}│${RESET} ${BOLD}Dispositivos encontrados:${RESET} ${BGREEN}${FOUND}${RESET} dispositivos"
   printf "%b\n" "${BCYAN}└────────────────────────────────────────────────────────────────────────────┘${RESET}"
 fi
 
-if [ "$SYNC_ENABLED" = true ] && [ "$SYNC_COUNT" -gt 0 ]; then
+if [ "$USE_PIPELINE" = true ]; then
+  PIPELINE_SYNC=false
+  if [ "$SYNC_ENABLED" = true ] && [ "$SYNC_COUNT" -gt 0 ]; then
+    if resolve_homecore_token; then
+      PIPELINE_SYNC=true
+    else
+      log_warning "Token do HomeCore não encontrado; use --token ou --token-file"
+      printf "[WARN] Token do HomeCore não encontrado; sincronização ignorada.\n" >&2
+    fi
+  fi
+  run_pipeline "$PIPELINE_SYNC"
+elif [ "$SYNC_ENABLED" = true ] && [ "$SYNC_COUNT" -gt 0 ]; then
   if resolve_homecore_token; then
     payload=$(printf '{"generated_at":"%s","relay_board":[%s]}' "$(date -u +"%Y-%m-%dT%H:%M:%SZ")" "$SYNC_ENTRIES")
     if [ "$DEBUG" = true ]; then
@@ -1,6 +1,13 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
+# Motor Python unificado (hct_updater.py). O fluxo em bash abaixo é mantido
+# como fallback quando o motor não está disponível ou HCT_LEGACY_UPDATE=1.
+HCT_UPDATER_PY="${HCT_UPDATER_PY:-/usr/bin/hct_updater.py}"
+if [ -z "${HCT_LEGACY_UPDATE:-}" ] && command -v python3 >/dev/null 2>&1 && [ -f "$HCT_UPDATER_PY" ]; then
+    HCT_CONFIG_DIR="${CONFIG_DIR:-${HCT_CONFIG_DIR:-/config}}" exec python3 "$HCT_UPDATER_PY" component api "$@"
+fi
+
 LOG_TAG="homecore-api-update"
 
 log() {
@@ -6,6 +6,13 @@
 
 set -euo pipefail
 
+# Motor Python unificado (hct_updater.py). O fluxo em bash abaixo é mantido
+# como fallback quando o motor não está disponível ou HCT_LEGACY_UPDATE=1.
+HCT_UPDATER_PY="${HCT_UPDATER_PY:-/usr/bin/hct_updater.py}"
+if [ -z "${HCT_LEGACY_UPDATE:-}" ] && command -v python3 >/dev/null 2>&1 && [ -f "$HCT_UPDATER_PY" ]; then
+    exec python3 "$HCT_UPDATER_PY" component core "$@"
+fi
+
 SCRIPT_VERSION="1.0.0"
 CONFIG_DIR="${HOMECORE_CONFIG_DIR:-/config/custom_components}"
 LOG_DIR="${CONFIG_DIR}/homecore/logs"
@@ -2,12 +2,21 @@
 # ========================================
 # Neurollar - Instalação do HACS no HAOS
 # ========================================
-# Este script instala o HACS (Home Assistant Community Store)
-# em um dispositivo Home Assistant OS (HAOS), utilizando o
-# script oficial do HACS e um fallback manual caso necessário.
+# Este script instala/atualiza o HACS (Home Assistant Community Store)
+# em um dispositivo Home Assistant OS (HAOS) a partir do hacs.zip da
+# última release no GitHub.
 # ========================================
 set -e
 
+# Motor Python unificado (hct_updater.py): compara a última release com a
+# versão instalada e não baixa nada quando já está atualizado. O fluxo em
+# bash abaixo é mantido como fallback quando o motor não está disponível ou
+# HCT_LEGACY_UPDATE=1.
+HCT_UPDATER_PY="${HCT_UPDATER_PY:-/usr/bin/hct_updater.py}"
+if [ -z "${HCT_LEGACY_UPDATE:-}" ] && command -v python3 >/dev/null 2>&1 && [ -f "$HCT_UPDATER_PY" ]; then
+    exec python3 "$HCT_UPDATER_PY" component hacs "$@"
+fi
+
 # ========================================
 # CONFIGURAÇÕES
 # ========================================
@@ -44,63 +53,38 @@ rm -rf "$TMP_DIR"
 mkdir -p "$TMP_DIR"
 
 # ========================================
-# TENTATIVA 1: Script oficial HACS
+# Instalação manual (hacs.zip da última release)
 # ========================================
-log "Executando script oficial de instalação do HACS (hacs.xyz) ..."
-if command -v curl >/dev/null 2>&1; then
-  if bash -c "curl -sSL https://hacs.xyz/install | bash -" >> "$LOG_FILE" 2>&1; then
-    log "✓ Script oficial executado"
-  else
-    log "⚠️ Falha ao executar via curl, tentando fallback manual"
-  fi
-elif command -v wget >/dev/null 2>&1; then
-  if bash -c "wget -q -O - https://hacs.xyz/install | bash -" >> "$LOG_FILE" 2>&1; then
-    log "✓ Script oficial executado"
+command -v wget >/dev/null 2>&1 || error "O comando 'wget' não está disponível."
+
+HACS_ZIP_URL="https://github.com/hacs/integration/releases/latest/download/hacs.zip"
+HACS_ZIP_FILE="$TMP_DIR/hacs.zip"
+log "Baixando pacote do HACS em $HACS_ZIP_URL ..."
+wget -q -O "$HACS_ZIP_FILE" "$HACS_ZIP_URL" || error "Falha ao baixar o pacote do HACS."
+
+log "Extraindo pacote do HACS para $CUSTOM_DIR ..."
+mkdir -p "$HACS_DIR"
+
+if command -v unzip >/dev/null 2>&1; then
+  # Extrai primeiro para um diretório temporário para verificar a estrutura
+  EXTRACT_TMP="$TMP_DIR/extract"
+  mkdir -p "$EXTRACT_TMP"
+  unzip -o -q "$HACS_ZIP_FILE" -d "$EXTRACT_TMP" || error "Falha ao extrair com unzip."
+  
+  # Verifica se existe uma pasta 'hacs' dentro do ZIP ou se os arquivos estão na raiz
+  if [ -d "$EXTRACT_TMP/hacs" ]; then
+    log "Movendo conteúdo de hacs/ para $HACS_DIR ..."
+    cp -r "$EXTRACT_TMP/hacs/"* "$HACS_DIR/" || error "Falha ao mover arquivos do HACS."
+  elif [ -f "$EXTRACT_TMP/__init__.py" ]; then
+    log "Movendo arquivos da raiz para $HACS_DIR ..."
+    cp -r "$EXTRACT_TMP/"* "$HACS_DIR/" || error "Falha ao mover arquivos do HACS."
   else
-    log "⚠️ Falha ao executar via wget, tentando fallback manual"
+    log "Estrutura do ZIP:"
+    ls -la "$EXTRACT_TMP/" | tee -a "$LOG_FILE"
+    error "Estrutura do ZIP não reconhecida."
   fi
-else
-  log "⚠️ Nem curl nem wget disponíveis, seguindo para fallback manual"
-fi
-
-# Se HACS foi instalado pelo script oficial, finalize
-if [ -d "$HACS_DIR" ] && [ -f "$HACS_DIR/__init__.py" ]; then
-  log "✓ HACS instalado com sucesso (script oficial)."
-else
-  # ========================================
-  # TENTATIVA 2: Fallback manual
-  # ========================================
-  log "Iniciando fallback manual para instalação do HACS ..."
-  command -v wget >/dev/null 2>&1 || error "O comando 'wget' não está disponível para fallback manual."
-
-  HACS_ZIP_URL="https://github.com/hacs/integration/releases/latest/download/hacs.zip"
-  HACS_ZIP_FILE="$TMP_DIR/hacs.zip"
-  log "Baixando pacote do HACS em $HACS_ZIP_URL ..."
-  wget -q -O "$HACS_ZIP_FILE" "$HACS_ZIP_URL" || error "Falha ao baixar o pacote do HACS."
-
-  log "Extraindo pacote do HACS para $CUSTOM_DIR ..."
-  mkdir -p "$HACS_DIR"
-
-  if command -v unzip >/dev/null 2>&1; then
-    # Extrai primeiro para um diretório temporário para verificar a estrutura
-    EXTRACT_TMP="$TMP_DIR/extract"
-    mkdir -p "$EXTRACT_TMP"
-    unzip -o -q "$HACS_ZIP_FILE" -d "$EXTRACT_TMP" || error "Falha ao extrair com unzip."
-    
-    # Verifica se existe uma pasta 'hacs' dentro do ZIP ou se os arquivos estão na raiz
-    if [ -d "$EXTRACT_TMP/hacs" ]; then
-      log "Movendo conteúdo de hacs/ para $HACS_DIR ..."
-      cp -r "$EXTRACT_TMP/hacs/"* "$HACS_DIR/" || error "Falha ao mover arquivos do HACS."
-    elif [ -f "$EXTRACT_TMP/__init__.py" ]; then
-      log "Movendo arquivos da raiz para $HACS_DIR ..."
-      cp -r "$EXTRACT_TMP/"* "$HACS_DIR/" || error "Falha ao mover arquivos do HACS."
-    else
-      log "Estrutura do ZIP:"
-      ls -la "$EXTRACT_TMP/" | tee -a "$LOG_FILE"
-      error "Estrutura do ZIP não reconhecida."
-    fi
-  elif command -v python3 >/dev/null 2>&1; then
-    python3 - "$HACS_ZIP_FILE" "$CUSTOM_DIR" "$HACS_DIR" <<'PYCODE'
+elif command -v python3 >/dev/null 2>&1; then
+  python3 - "$HACS_ZIP_FILE" "$CUSTOM_DIR" "$HACS_DIR" <<'PYCODE'
 import sys, zipfile, os, shutil
 from pathlib import Path
 
@@ -138,27 +122,26 @@ else:
 # Limpa temporário
 shutil.rmtree(extract_tmp, ignore_errors=True)
 PYCODE
-    if [ $? -ne 0 ]; then
-      error "Falha ao extrair com Python (zipfile)."
-    fi
-  else
-    error "Nem 'unzip' nem 'python3' disponíveis para extrair o pacote do HACS."
+  if [ $? -ne 0 ]; then
+    error "Falha ao extrair com Python (zipfile)."
   fi
+else
+  error "Nem 'unzip' nem 'python3' disponíveis para extrair o pacote do HACS."
+fi
 
-  # Validação final mais robusta
-  if [ -d "$HACS_DIR" ] && [ -f "$HACS_DIR/__init__.py" ]; then
-    log "✓ HACS instalado com sucesso (fallback manual)."
-    log "Arquivos principais encontrados:"
-    ls -la "$HACS_DIR/" | head -10 | tee -a "$LOG_FILE"
-  else
-    log "Conteúdo de $CUSTOM_DIR:"
-    ls -la "$CUSTOM_DIR/" | tee -a "$LOG_FILE"
-    if [ -d "$HACS_DIR" ]; then
-      log "Conteúdo de $HACS_DIR:"
-      ls -la "$HACS_DIR/" | tee -a "$LOG_FILE"
-    fi
-    error "A instalação do HACS não foi concluída corretamente."
+# Validação final mais robusta
+if [ -d "$HACS_DIR" ] && [ -f "$HACS_DIR/__init__.py" ]; then
+  log "✓ HACS instalado com sucesso."
+  log "Arquivos principais encontrados:"
+  ls -la "$HACS_DIR/" | head -10 | tee -a "$LOG_FILE"
+else
+  log "Conteúdo de $CUSTOM_DIR:"
+  ls -la "$CUSTOM_DIR/" | tee -a "$LOG_FILE"
+  if [ -d "$HACS_DIR" ]; then
+    log "Conteúdo de $HACS_DIR:"
+    ls -la "$HACS_DIR/" | tee -a "$LOG_FILE"
   fi
+  error "A instalação do HACS não foi concluída corretamente."
 fi
 
 # ========================================
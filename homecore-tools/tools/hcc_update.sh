@@ -14,6 +14,13 @@
 # - Sempre baixa a versão mais recente sem verificação de versão.
 # ==============================================================================
 
+# Motor Python unificado (hct_updater.py). O fluxo em bash abaixo é mantido
+# como fallback quando o motor não está disponível ou HCT_LEGACY_UPDATE=1.
+HCT_UPDATER_PY="${HCT_UPDATER_PY:-/usr/bin/hct_updater.py}"
+if [ -z "${HCT_LEGACY_UPDATE:-}" ] && command -v python3 >/dev/null 2>&1 && [ -f "$HCT_UPDATER_PY" ]; then
+    HCT_CONFIG_DIR="${HOMECORE_CONFIG_DIR:-${HCT_CONFIG_DIR:-/config}}" exec python3 "$HCT_UPDATER_PY" component hcc "$@"
+fi
+
 # --- Configurações e Variáveis Globais ---
 SCRIPT_VERSION="1.0.1"
 API_URL="homecore.com.br/api/hcc_update.php"
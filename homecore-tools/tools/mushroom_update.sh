@@ -2,15 +2,24 @@
 # ========================================
 # Instalação/Atualização do Lovelace Mushroom
 # ========================================
-# Verifique novas versões no repositório oficial e atualize 
-# a variável MUSHROOM_VERSION conforme necessário.
-# Link: https://github.com/piitaya/lovelace-mushroom/tags
+# Instala a última release do repositório oficial; defina
+# MUSHROOM_VERSION (ex.: v5.0.8) para fixar uma versão.
+# Link: https://github.com/piitaya/lovelace-mushroom/releases
 # ========================================
 
 set -e
 
+# Motor Python unificado (hct_updater.py): compara a última release com a
+# versão instalada e não baixa nada quando já está atualizado. O fluxo em
+# bash abaixo é mantido como fallback quando o motor não está disponível ou
+# HCT_LEGACY_UPDATE=1 (sem MUSHROOM_VERSION, usa a versão abaixo).
+HCT_UPDATER_PY="${HCT_UPDATER_PY:-/usr/bin/hct_updater.py}"
+if [ -z "${HCT_LEGACY_UPDATE:-}" ] && command -v python3 >/dev/null 2>&1 && [ -f "$HCT_UPDATER_PY" ]; then
+    exec python3 "$HCT_UPDATER_PY" component mushroom "$@"
+fi
+
 MUSHROOM_DIR="/config/www/lovelace-mushroom"
-MUSHROOM_VERSION="v5.0.8"  # 🟢 Altere aqui para atualizar manualmente
+MUSHROOM_VERSION="${MUSHROOM_VERSION:-v5.0.8}"
 MUSHROOM_REPO="piitaya/lovelace-mushroom"
 
 echo ""